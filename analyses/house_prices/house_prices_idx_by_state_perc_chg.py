@@ -2,122 +2,125 @@ from dash import dcc, html
 import dash
 from dash.dependencies import Input, Output
 import pandas as pd
-import psycopg2
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
+import threading
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.data_source import connection
+from common.figure_cache import FigureCache
+
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
-
-conn = psycopg2.connect(
-    dbname=dbname,
-    user=user,
-    password=password,
-    host=host,
-    port=port
-)
+# How often the app checks state_house_prices for new data, 0 turns the background refresh off
+refresh_seconds = int(os.getenv("HOUSE_PRICES_REFRESH_SECONDS", 300))
+
+# The app reads the small materialized views house_prices_state_idx.py refreshes, never state_house_prices itself
 
-# Query to get the most recent data for the percentage change chart
+# Most recent data for the percentage change chart
 query_percentage = """
     SELECT state, house_price, "4_years", "4_years_percent", 
            "10_years", "10_years_percent", "25_years", 
            "25_years_percent", "all_time", "all_time_percent", 
            president, president_amt, president_percent, date
-    FROM state_house_prices
-    WHERE date = (SELECT MAX(date) FROM state_house_prices)
+    FROM state_house_prices_latest
 """
 
-df_percentage = pd.read_sql(query_percentage, conn)
-
-# Query to get all data for the president-specific chart
+# One row per president and state for the president-specific chart
 query_president = """
-    SELECT state, house_price, "4_years", "4_years_percent", 
-           "10_years", "10_years_percent", "25_years", 
-           "25_years_percent", "all_time", "all_time_percent", 
-           president, president_amt, president_percent, date
-    FROM state_house_prices
+    SELECT president, state, house_price, president_amt, president_percent, first_date, last_date
+    FROM state_house_prices_by_president
 """
 
-df_president = pd.read_sql(query_president, conn)
+# Presidents and the years covered, rows without a president are the NULL row
+query_presidents = """
+    SELECT president, first_date, last_date
+    FROM state_house_prices_presidents
+    ORDER BY first_date
+"""
 
-# Ensure 'date' column is in datetime format
-df_percentage['date'] = pd.to_datetime(df_percentage['date'])
-df_president['date'] = pd.to_datetime(df_president['date'])
+# Row count and max(when_updated) of state_house_prices as of the last view refresh, the data version
+query_version = """
+    SELECT SUM(row_count)::bigint, MAX(max_when_updated)::text
+    FROM state_house_prices_presidents
+"""
 
-# Extract year from 'date' column
-df_percentage['year'] = df_percentage['date'].dt.year
-df_president['year'] = df_president['date'].dt.year
+def read_version(conn):
+    with conn.cursor() as cur:
+        cur.execute(query_version)
+        return tuple(cur.fetchone())
 
-# Get min and max years for "All Time" title
-min_year_query = """
-    SELECT EXTRACT(YEAR FROM MIN(date)) AS min_year
-    FROM state_house_prices
-"""
-max_year_query = """
-    SELECT EXTRACT(YEAR FROM MAX(date)) AS max_year
-    FROM state_house_prices
-"""
+def load_frames():
+    """Everything the app shows, read from the views in one snapshot so a concurrent refresh can't mix versions."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        version = read_version(conn)
+        df_percentage = pd.read_sql(query_percentage, conn)
+        df_president = pd.read_sql(query_president, conn)
+        df_presidents = pd.read_sql(query_presidents, conn)
 
-min_year = pd.read_sql(min_year_query, conn).iloc[0]['min_year']
-max_year = pd.read_sql(max_year_query, conn).iloc[0]['max_year']
+    # Ensure 'date' column is in datetime format
+    df_percentage['date'] = pd.to_datetime(df_percentage['date'])
+    return {
+        'version': version,
+        'percentage': df_percentage,
+        'president': df_president,
+        # Min and max years for "All Time" title
+        'min_year': pd.to_datetime(df_presidents['first_date']).min().year,
+        'max_year': pd.to_datetime(df_presidents['last_date']).max().year,
+        # President names for dropdown, in the order they served
+        'presidents': df_presidents['president'].dropna().tolist(),
+    }
 
-# Convert years to integers
-min_year = int(min_year)
-max_year = int(max_year)
+frames = load_frames()
 
-# Get unique president names for dropdown, filtered by date
-presidents_query = """
-    SELECT DISTINCT president
-    FROM state_house_prices
-    WHERE president IS NOT NULL
-"""
-df_presidents = pd.read_sql(presidents_query, conn)['president'].dropna().unique()
-conn.close()
+# Percentage dropdown value -> (label, years back from the latest date, None for all time)
+HORIZONS = {
+    '4_years_percent': ('4 Years Percent Change', 4),
+    '10_years_percent': ('10 Years Percent Change', 10),
+    '25_years_percent': ('25 Years Percent Change', 25),
+    'all_time_percent': ('All Time Percent Change', None),
+}
 
 # Create Dash app
 app = dash.Dash(__name__)
 
-# Layout
-app.layout = html.Div([
-    # Top
-    html.Div([
-        html.H1("House Price Changes by State"),
-        html.Div([
-            html.H2("Percentage Change Chart"),
-            dcc.Dropdown(
-                id='percentage-dropdown',
-                options=[
-                    {'label': '4 Years Percent Change', 'value': '4_years_percent'},
-                    {'label': '10 Years Percent Change', 'value': '10_years_percent'},
-                    {'label': '25 Years Percent Change', 'value': '25_years_percent'},
-                    {'label': 'All Time Percent Change', 'value': 'all_time_percent'}
-                ],
-                value='4_years_percent'  # Default
-            ),
-            dcc.Graph(id='percentage-heatmap')
-        ], style={'margin-bottom': '40px'}),  # Add margin between sections
-
-        html.Hr(),  # Horizontal div
-
-        # Bottom 
+# Layout, served per page load so the president dropdown lists presidents added by a refresh
+def serve_layout():
+    return html.Div([
+        # Top
         html.Div([
-            html.H2("President Data Chart"),
-            dcc.Dropdown(
-                id='president-dropdown',
-                options=[{'label': 'Select President', 'value': ''}] + [{'label': name, 'value': name} for name in df_presidents],
-                value=''  # Default value for dropdown (no president selected)
-            ),
-            dcc.Graph(id='president-heatmap')
+            html.H1("House Price Changes by State"),
+            html.Div([
+                html.H2("Percentage Change Chart"),
+                dcc.Dropdown(
+                    id='percentage-dropdown',
+                    options=[{'label': label, 'value': value} for value, (label, _) in HORIZONS.items()],
+                    value='4_years_percent'  # Default
+                ),
+                dcc.Graph(id='percentage-heatmap')
+            ], style={'margin-bottom': '40px'}),  # Add margin between sections
+
+            html.Hr(),  # Horizontal div
+
+            # Bottom 
+            html.Div([
+                html.H2("President Data Chart"),
+                dcc.Dropdown(
+                    id='president-dropdown',
+                    options=[{'label': 'Select President', 'value': ''}] + [{'label': name, 'value': name} for name in frames['presidents']],
+                    value=''  # Default value for dropdown (no president selected)
+                ),
+                dcc.Graph(id='president-heatmap')
+            ])
         ])
     ])
-])
+
+app.layout = serve_layout
 
 def get_text_color(value):
     if value is None:
@@ -127,137 +130,147 @@ def get_text_color(value):
     else:
         return 'black'
 
+def add_state_labels(fig, df_filtered, color_column):
+    # One text trace for every state instead of a trace per state, keeps the figure JSON small
+    values = df_filtered[color_column]
+    fig.add_trace(go.Scattergeo(
+        locations=df_filtered['state'],
+        locationmode="USA-states",
+        text=[f"{x:.2f}%" if pd.notna(x) else 'N/A' for x in values],
+        mode='text',
+        showlegend=False,
+        hoverinfo='skip',
+        textfont=dict(size=16, color=[get_text_color(x) for x in values]),
+        textposition='middle center'  # Adjust text position to reduce overlap
+    ))
+
+def style_choropleth(fig, title_text, df_filtered, color_column):
+    min_value = df_filtered[color_column].min()
+    max_value = df_filtered[color_column].max()
+
+    tickvals = [min_value, 0, max_value]
+    ticktext = [f"{min_value:.2f}%", '0%', f"{max_value:.2f}%"]
+
+    fig.update_layout(
+        title_text=title_text,
+        geo=dict(showcoastlines=True),
+        coloraxis_colorbar=dict(
+            title='Percentage Change',
+            tickvals=tickvals,
+            ticktext=ticktext,
+            len=0.8,  # Set length of color bar (fraction of plot height)
+            thickness=20  # Fixed thickness of color bar
+        ),
+        margin=dict(l=0, r=100, t=40, b=0),  # Adjust margins to accommodate the color bar
+        width=2350,
+        height=1850,
+        #plot_bgcolor='lightgray',  # Change plotting area background
+        #paper_bgcolor='lightgray'  
+    )
+
+def build_percentage_figure(percentage_selection, frames):
+    df_percentage = frames['percentage']
+    label, years = HORIZONS[percentage_selection]
+    end_date = df_percentage['date'].max()
+    if years is None:
+        title_text = f'House Price Change - {label} ({frames["min_year"]} to {frames["max_year"]})'
+        df_filtered = df_percentage  # No date filtering needed for all-time data
+    else:
+        start_date = end_date - pd.DateOffset(years=years)
+        title_text = f'House Price Change - {label} ({start_date.year} to {end_date.year})'
+        df_filtered = df_percentage[(df_percentage['date'] >= start_date) & (df_percentage['date'] <= end_date)]
+
+    color_column = percentage_selection  # Use the selected percentage column for color
+
+    fig_percentage = px.choropleth(
+        df_filtered,
+        locations="state",
+        locationmode="USA-states",
+        color=color_column,
+        scope="usa",
+        color_continuous_scale='Blues',  # Change this to 'Cividis', 'Plasma', 'Inferno', or 'Blues' if preferred
+        labels={color_column: f'House Price Change ({color_column.replace("_", " ").title()})'}
+    )
+    add_state_labels(fig_percentage, df_filtered, color_column)
+    style_choropleth(fig_percentage, title_text, df_filtered, color_column)
+    return fig_percentage
+
+def build_president_figure(president_selection, frames):
+    df_president = frames['president']
+    df_filtered = df_president[df_president['president'] == president_selection]
+
+    fig_president = px.choropleth(
+        df_filtered,
+        locations="state",
+        locationmode="USA-states",
+        color="president_percent",
+        scope="usa",
+        color_continuous_scale='Blues',  # Change this to 'Cividis', 'Plasma', 'Inferno', or 'Blues' if preferred
+        labels={"president_percent": f'{president_selection} Percent Change'}
+    )
+    add_state_labels(fig_president, df_filtered, 'president_percent')
+    style_choropleth(fig_president, f'House Price Change During {president_selection}\'s Term', df_filtered, 'president_percent')
+    return fig_president
+
+# Every horizon and president is built once at start, the callbacks then only look figures up
+percentage_figures = FigureCache(build_percentage_figure)
+president_figures = FigureCache(build_president_figure)
+
+def warm_figures(frames):
+    percentage_figures.warm(HORIZONS, frames['version'], frames)
+    president_figures.warm(frames['presidents'], frames['version'], frames)
+
+warm_figures(frames)
+
+def refresh_frames():
+    """
+    Swaps in new frames when state_house_prices changed since they were read. Their figures are built before the
+    swap, so callbacks keep serving the old ones until then, and the old version's figures are dropped after it.
+    """
+    global frames
+    current = frames
+    with connection() as conn:
+        version = read_version(conn)
+    if version == current['version']:
+        return False
+    new_frames = load_frames()
+    warm_figures(new_frames)
+    frames = new_frames
+    percentage_figures.invalidate(current['version'])
+    president_figures.invalidate(current['version'])
+    return True
+
+def refresh_loop(stop):
+    while not stop.wait(refresh_seconds):
+        try:
+            if refresh_frames():
+                print(f"Refreshed house price frames to {frames['version']}.")
+        except Exception as e:
+            print(f"Error refreshing house price frames, serving the previous data: {e}")
+
+stop_refresh = threading.Event()
+if refresh_seconds > 0:
+    threading.Thread(target=refresh_loop, args=(stop_refresh,), daemon=True, name='house-prices-refresh').start()
+
+@app.callback(
+    Output('percentage-heatmap', 'figure'),
+    Input('percentage-dropdown', 'value')
+)
+def update_percentage_chart(percentage_selection):
+    if percentage_selection not in HORIZONS:
+        return go.Figure()
+    current = frames
+    return percentage_figures.get(percentage_selection, current['version'], current)
+
 @app.callback(
-    [Output('percentage-heatmap', 'figure'),
-     Output('president-heatmap', 'figure')],
-    [Input('percentage-dropdown', 'value'),
-     Input('president-dropdown', 'value')]
+    Output('president-heatmap', 'figure'),
+    Input('president-dropdown', 'value')
 )
-def update_charts(percentage_selection, president_selection):
-    fig_percentage = go.Figure()
-    fig_president = go.Figure()
-
-    # Update Percentage Change Chart
-    if percentage_selection in ['4_years_percent', '10_years_percent', '25_years_percent', 'all_time_percent']:
-        if percentage_selection == '4_years_percent':
-            end_date = df_percentage['date'].max()
-            start_date = end_date - pd.DateOffset(years=4)
-            title_text = f'House Price Change - 4 Years Percent Change ({start_date.year} to {end_date.year})'
-            df_filtered = df_percentage[(df_percentage['date'] >= start_date) & (df_percentage['date'] <= end_date)]
-        elif percentage_selection == '10_years_percent':
-            end_date = df_percentage['date'].max()
-            start_date = end_date - pd.DateOffset(years=10)
-            title_text = f'House Price Change - 10 Years Percent Change ({start_date.year} to {end_date.year})'
-            df_filtered = df_percentage[(df_percentage['date'] >= start_date) & (df_percentage['date'] <= end_date)]
-        elif percentage_selection == '25_years_percent':
-            end_date = df_percentage['date'].max()
-            start_date = end_date - pd.DateOffset(years=25)
-            title_text = f'House Price Change - 25 Years Percent Change ({start_date.year} to {end_date.year})'
-            df_filtered = df_percentage[(df_percentage['date'] >= start_date) & (df_percentage['date'] <= end_date)]
-        elif percentage_selection == 'all_time_percent':
-            start_date = df_percentage['date'].min()
-            end_date = df_percentage['date'].max()
-            title_text = f'House Price Change - All Time Percent Change ({min_year} to {max_year})'
-            df_filtered = df_percentage  # No date filtering needed for all-time data
-        
-        color_column = percentage_selection  # Use the selected percentage column for color
-        
-        min_value = df_filtered[color_column].min()
-        max_value = df_filtered[color_column].max()
-        
-        tickvals = [min_value, 0, max_value]
-        ticktext = [f"{min_value:.2f}%", '0%', f"{max_value:.2f}%"]
-        
-        fig_percentage = px.choropleth(
-            df_filtered,
-            locations="state",
-            locationmode="USA-states",
-            color=color_column,
-            scope="usa",
-            color_continuous_scale='Blues',  # Change this to 'Cividis', 'Plasma', 'Inferno', or 'Blues' if preferred
-            labels={color_column: f'House Price Change ({color_column.replace("_", " ").title()})'}
-        )
-        
-        text_labels = df_filtered[color_column].apply(lambda x: f"{x:.2f}%" if x is not None else 'N/A')
-        for i, state in enumerate(df_filtered['state']):
-            value = df_filtered[color_column].iloc[i]
-            text_color = get_text_color(value)
-            fig_percentage.add_trace(go.Scattergeo(
-                locations=[state],
-                locationmode="USA-states",
-                text=[text_labels.iloc[i]],
-                mode='text',
-                showlegend=False,
-                textfont=dict(size=16, color=text_color),
-                textposition='middle center'  # Adjust text position to reduce overlap
-            ))
-        
-        fig_percentage.update_layout(
-            title_text=title_text,
-            geo=dict(showcoastlines=True),
-            coloraxis_colorbar=dict(
-                title='Percentage Change',
-                tickvals=tickvals,
-                ticktext=ticktext,
-                len=0.8,  # Set length of color bar (fraction of plot height)
-                thickness=20  # Fixed thickness of color bar
-            ),
-            margin=dict(l=0, r=100, t=40, b=0),  # Adjust margins to accommodate the color bar
-            width=2350,
-            height=1850,
-            #plot_bgcolor='lightgray',  # Change plotting area background
-            #paper_bgcolor='lightgray'  
-        )
-    
-    if president_selection:
-        df_filtered = df_president[df_president['president'] == president_selection]
-        
-        min_value = df_filtered["president_percent"].min()
-        max_value = df_filtered["president_percent"].max()
-        
-        tickvals = [min_value, 0, max_value]
-        ticktext = [f"{min_value:.2f}%", '0%', f"{max_value:.2f}%"]
-        
-        fig_president = px.choropleth(
-            df_filtered,
-            locations="state",
-            locationmode="USA-states",
-            color="president_percent",
-            scope="usa",
-            color_continuous_scale='Blues',  # Change this to 'Cividis', 'Plasma', 'Inferno', or 'Blues' if preferred
-            labels={"president_percent": f'{president_selection} Percent Change'}
-        )
-        
-        text_labels = df_filtered['president_percent'].apply(lambda x: f"{x:.2f}%" if x is not None else 'N/A')
-        for i, state in enumerate(df_filtered['state']):
-            value = df_filtered['president_percent'].iloc[i]
-            text_color = get_text_color(value)
-            fig_president.add_trace(go.Scattergeo(
-                locations=[state],
-                locationmode="USA-states",
-                text=[text_labels.iloc[i]],
-                mode='text',
-                showlegend=False,
-                textfont=dict(size=16, color=text_color),
-                textposition='middle center'  # Adjust text position to reduce overlap
-            ))
-        
-        fig_president.update_layout(
-            title_text=f'House Price Change During {president_selection}\'s Term',
-            geo=dict(showcoastlines=True),
-            coloraxis_colorbar=dict(
-                title='Percentage Change',
-                tickvals=tickvals,
-                ticktext=ticktext,
-                len=0.8,  # Set length of color bar (fraction of plot height)
-                thickness=20  # Fixed thickness of color bar
-            ),
-            margin=dict(l=0, r=100, t=40, b=0),  # Adjust margins to accommodate the color bar
-            width=2350,
-            height=1850
-        )
-    
-    return fig_percentage, fig_president
+def update_president_chart(president_selection):
+    if not president_selection:
+        return go.Figure()
+    current = frames
+    return president_figures.get(president_selection, current['version'], current)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,43 +1,17 @@
 import os
-from dotenv import load_dotenv
-import psycopg2
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.data_source import read_table
 
-DB_NAME = os.getenv('DB_NAME')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
+migration_df = read_table('us_ill_migration', ['year', 'number'])
+migration_df = migration_df[migration_df['year'].between(2014, 2024)]
 
-conn = psycopg2.connect(
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASSWORD,
-    host=DB_HOST,
-    port=DB_PORT
-)
+cpi_df = read_table('cpi', ['date', 'cpi'], '2014-01-01', '2024-12-31')
 
-migration_query = """
-SELECT year, number
-FROM us_ill_migration
-WHERE year BETWEEN 2014 AND 2024;
-"""
-migration_df = pd.read_sql(migration_query, conn)
-
-cpi_query = """
-SELECT date, cpi
-FROM cpi
-WHERE date >= '2014-01-01' AND date <= '2024-12-31';
-"""
-cpi_df = pd.read_sql(cpi_query, conn)
-
-conn.close()
-
-# Convert 'date' to datetime and extract year for CPI data
-cpi_df['date'] = pd.to_datetime(cpi_df['date'])
+# Extract year for CPI data
 cpi_df['year'] = cpi_df['date'].dt.year
 
 # Aggregate CPI data by year
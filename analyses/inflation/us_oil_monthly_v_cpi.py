@@ -1,40 +1,16 @@
 import os
+import sys
 import pandas as pd
-import psycopg2
 import matplotlib.pyplot as plt
-from dotenv import load_dotenv
 
-load_dotenv()
-
-conn = psycopg2.connect(
-    host=os.getenv("DB_HOST"),
-    database=os.getenv("DB_NAME"),
-    user=os.getenv("DB_USER"),
-    password=os.getenv("DB_PASSWORD")
-)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.data_source import read_table
 
 start_date = '2000-01-01'
 end_date = '2024-08-01'
 
-oil_query = """
-SELECT date, production
-FROM us_oil_production_monthly_mil_bar_pd
-WHERE date >= '2020-05-01'
-ORDER BY date;
-"""
-
-cpi_query = """
-SELECT date, inflation_rate
-FROM cpi
-WHERE date >= '2020-05-01'
-ORDER BY date;
-"""
-
-oil_df = pd.read_sql(oil_query, conn)
-cpi_df = pd.read_sql(cpi_query, conn)
-
-
-conn.close()
+oil_df = read_table('us_oil_production_monthly_mil_bar_pd', ['date', 'production'], start='2020-05-01')
+cpi_df = read_table('cpi', ['date', 'inflation_rate'], start='2020-05-01')
 
 merged_df = pd.merge(oil_df, cpi_df, on='date', how='outer')
 
@@ -1,38 +1,14 @@
 import os
+import sys
 import pandas as pd
-import psycopg2
-from dotenv import load_dotenv
 import plotly.graph_objs as go
 import plotly.offline as pyo
 
-load_dotenv()
-
-db_name = os.getenv('DB_NAME')
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-
-conn = psycopg2.connect(
-    dbname=db_name,
-    user=db_user,
-    password=db_password,
-    host=db_host,
-    port=db_port
-)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.data_source import read_table
 
 # TODO: Update this to end date now that Trump is POTUS 47
-query = """
-    SELECT date, job_type, job_count
-    FROM employment_jobs
-    WHERE date >= '2021-02-01'
-    AND date <= CURRENT_DATE
-    ORDER BY date;
-"""
-
-df = pd.read_sql_query(query, conn)
-
-conn.close()
+df = read_table('employment_jobs', ['date', 'job_type', 'job_count'], '2021-02-01', pd.Timestamp.today())
 
 df_pivot = df.pivot(index='date', columns='job_type', values='job_count').reset_index()
 
@@ -1,70 +1,17 @@
-import pandas as pd
-import psycopg2
-from psycopg2 import sql
 import os
-from dotenv import load_dotenv
+import sys
 import plotly.graph_objects as go
 
-load_dotenv()
-
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.term_windows import term_windows
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    print("Successfully connected to the database.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    exit()
-
-# Query to get Biden's term dates
-biden_term_query = """
-    SELECT start_date, end_date
-    FROM presidential_terms
-    WHERE president_name = 'Joe Biden'
-"""
-try:
-    biden_term_df = pd.read_sql_query(biden_term_query, conn)
-    # Extract start and end dates
-    biden_start_date = biden_term_df['start_date'].values[0]
-    biden_end_date = biden_term_df['end_date'].values[0]
-except Exception as e:
-    print(f"Error fetching Biden's term dates: {e}")
-    conn.close()
-    exit()
-
-cpi_query = """
-    SELECT Date, cpi
-    FROM cpi
-    WHERE Date BETWEEN %s AND %s
-"""
-try:
-    with conn.cursor() as cur:
-        cur.execute(cpi_query, (biden_start_date, biden_end_date))
-        cpi_data = cur.fetchall()
-    
-
-    cpi_df = pd.DataFrame(cpi_data, columns=['Date', 'CPI'])
+    cpi_df = term_windows().series('cpi', 'cpi', 'Joe Biden')
+    cpi_df = cpi_df.rename(columns={'date': 'Date', 'cpi': 'CPI'})
 except Exception as e:
     print(f"Error fetching CPI data: {e}")
-    conn.close()
     exit()
 
-conn.close()
-
-cpi_df['Date'] = pd.to_datetime(cpi_df['Date'])
-
-cpi_df.sort_values('Date', inplace=True)
-
 fig = go.Figure()
 
 fig.add_trace(go.Scatter(
@@ -1,72 +1,17 @@
-import pandas as pd
-import psycopg2
-from psycopg2 import sql
 import os
-from dotenv import load_dotenv
+import sys
 import plotly.graph_objects as go
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.term_windows import term_windows
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    print("Successfully connected to the database.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    exit()
-
-# Query to get Biden's term dates
-biden_term_query = """
-    SELECT start_date, end_date
-    FROM presidential_terms
-    WHERE president_name = 'Joe Biden'
-"""
-try:
-    biden_term_df = pd.read_sql_query(biden_term_query, conn)
-    # Extract start and end dates
-    biden_start_date = biden_term_df['start_date'].values[0]
-    biden_end_date = biden_term_df['end_date'].values[0]
-except Exception as e:
-    print(f"Error fetching Biden's term dates: {e}")
-    conn.close()
-    exit()
-
-# Query to get DJI data for Biden's term
-dji_query = """
-    SELECT Date, dji
-    FROM dji
-    WHERE Date BETWEEN %s AND %s
-"""
 try:
-    with conn.cursor() as cur:
-        cur.execute(dji_query, (biden_start_date, biden_end_date))
-        dji_data = cur.fetchall()
-    
-    # Convert to DataFrame
-    dji_df = pd.DataFrame(dji_data, columns=['Date', 'DJI'])
+    dji_df = term_windows().series('dji', 'dji', 'Joe Biden')
+    dji_df = dji_df.rename(columns={'date': 'Date', 'dji': 'DJI'})
 except Exception as e:
     print(f"Error fetching DJI data: {e}")
-    conn.close()
     exit()
 
-conn.close()
-
-# Convert 'Date' column to datetime
-dji_df['Date'] = pd.to_datetime(dji_df['Date'])
-
-dji_df.sort_values('Date', inplace=True)
-
 fig = go.Figure()
 
 # Add DJI trace
@@ -1,70 +1,17 @@
-import pandas as pd
-import psycopg2
-from psycopg2 import sql
 import os
-from dotenv import load_dotenv
+import sys
 import plotly.graph_objects as go
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.term_windows import term_windows
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    print("Successfully connected to the database.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    exit()
-
-# Query to get Trump's term dates
-trump_term_query = """
-    SELECT start_date, end_date
-    FROM presidential_terms
-    WHERE president_name = 'Donald Trump'
-"""
-try:
-    trump_term_df = pd.read_sql_query(trump_term_query, conn)
-    # Extract start and end dates
-    trump_start_date = trump_term_df['start_date'].values[0]
-    trump_end_date = trump_term_df['end_date'].values[0]
-except Exception as e:
-    print(f"Error fetching Trump's term dates: {e}")
-    conn.close()
-    exit()
-
-# Query to get S&P 500 data for Trump's term
-sp500_query = """
-    SELECT Date, sp500
-    FROM sp500
-    WHERE Date BETWEEN %s AND %s
-"""
 try:
-    with conn.cursor() as cur:
-        cur.execute(sp500_query, (trump_start_date, trump_end_date))
-        sp500_data = cur.fetchall()
-    
-    sp500_df = pd.DataFrame(sp500_data, columns=['Date', 'S&P 500'])
+    sp500_df = term_windows().series('sp500', 'sp500', 'Donald Trump')
+    sp500_df = sp500_df.rename(columns={'date': 'Date', 'sp500': 'S&P 500'})
 except Exception as e:
     print(f"Error fetching S&P 500 data: {e}")
-    conn.close()
     exit()
 
-conn.close()
-
-sp500_df['Date'] = pd.to_datetime(sp500_df['Date'])
-
-sp500_df.sort_values('Date', inplace=True)
-
 fig = go.Figure()
 
 # Add S&P 500 trace
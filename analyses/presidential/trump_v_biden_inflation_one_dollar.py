@@ -1,69 +1,21 @@
 import pandas as pd
-import psycopg2
 import os
-from dotenv import load_dotenv
+import sys
 import plotly.graph_objects as go
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.term_windows import term_windows
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
+PRESIDENTS = ['Joe Biden', 'Donald Trump']
+
+# One read per series for both terms, every fetch_data call below is sliced from memory
+windows = term_windows()
+for series in ('cpi', 'dji', 'sp500'):
+    windows.prefetch(series, series, PRESIDENTS)
 
 def fetch_data(president_name, index):
     """Fetch data for a given president and index."""
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    
-    # Query to get president's term dates
-    term_query = f"""
-        SELECT start_date, end_date
-        FROM presidential_terms
-        WHERE president_name = '{president_name}'
-    """
-    term_df = pd.read_sql_query(term_query, conn)
-    start_date = term_df['start_date'].values[0]
-    end_date = term_df['end_date'].values[0]
-    
-    # Query to get CPI data
-    cpi_query = """
-        SELECT date, cpi
-        FROM cpi
-        WHERE date BETWEEN %s AND %s
-    """
-    cpi_df = pd.read_sql_query(cpi_query, conn, params=(start_date, end_date))
-    
-    # Query to get index data
-    index_query = f"""
-        SELECT date, {index}
-        FROM {index}
-        WHERE date BETWEEN %s AND %s
-    """
-    index_df = pd.read_sql_query(index_query, conn, params=(start_date, end_date))
-    
-    conn.close()
-    
-    if 'date' in cpi_df.columns:
-        cpi_df['date'] = pd.to_datetime(cpi_df['date'])
-    else:
-        raise KeyError("The 'date' column is missing from CPI data.")
-    
-    if 'date' in index_df.columns:
-        index_df['date'] = pd.to_datetime(index_df['date'])
-    else:
-        raise KeyError(f"The 'date' column is missing from {index} data.")
-    
-    cpi_df.sort_values('date', inplace=True)
-    index_df.sort_values('date', inplace=True)
-    
-    return cpi_df, index_df
+    return windows.series('cpi', 'cpi', president_name), windows.series(index, index, president_name)
 
 def plot_investment_growth(president_name, index_df, cpi_df, index_name):
     """Plot growth of $1 investment for a given president and index."""
@@ -0,0 +1,76 @@
+# Compares the grouped president change calculation against the per-(state, president) boolean-mask loop it replaced
+# in house_prices_state_idx.py. Synthetic data only, no database or API keys needed.
+# Usage: python benchmarks/president_changes.py [rows]
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.presidents import calculate_president_changes
+
+
+def legacy_calculate_president_changes(df):
+    for state in df['State'].unique():
+        state_df = df[df['State'] == state]
+
+        for president in state_df['president'].unique():
+            pres_df = state_df[state_df['president'] == president]
+
+            if not pres_df.empty:
+                start_date = pres_df['Date'].min()
+                end_date = pres_df['Date'].max()
+
+                if pd.notna(start_date) and pd.notna(end_date):
+                    start_price = pres_df[pres_df['Date'] == start_date]['House_Price'].values[0]
+                    end_price = pres_df[pres_df['Date'] == end_date]['House_Price'].values[0]
+
+                    amt_change = end_price - start_price
+                    percent_change = (amt_change / start_price) * 100
+
+                    mask = (
+                        (df['State'] == state) &
+                        (df['president'] == president) &
+                        (df['Date'] >= start_date) &
+                        (df['Date'] <= end_date)
+                    )
+                    df.loc[mask, 'president_amt'] = amt_change
+                    df.loc[mask, 'president_percent'] = percent_change
+
+
+def build_synthetic(rows):
+    # 50 states, weekly dates, a new "president" every 4 years
+    states = [f'S{i:02d}' for i in range(50)]
+    periods = max(rows // len(states), 1)
+    dates = pd.date_range('1900-01-01', periods=periods, freq='W')
+    df = pd.DataFrame({
+        'Date': np.tile(dates, len(states)),
+        'State': np.repeat(states, periods),
+    })
+    df['House_Price'] = np.random.default_rng(0).uniform(50, 500, len(df))
+    df['president'] = 'P' + (df['Date'].dt.year // 4).astype(str)
+    return df
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = build_synthetic(rows)
+    print(f"{len(df):,} rows, {df.groupby(['State', 'president']).ngroups:,} (state, president) groups")
+
+    legacy_df = df.copy()
+    start = time.perf_counter()
+    legacy_calculate_president_changes(legacy_df)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    changes = calculate_president_changes(df, 'House_Price', 'Date', ['State'])
+    grouped_seconds = time.perf_counter() - start
+
+    assert np.allclose(legacy_df['president_amt'], changes['amt_change'], equal_nan=True)
+    assert np.allclose(legacy_df['president_percent'], changes['percent_change'], equal_nan=True)
+
+    print(f"Legacy loop:  {legacy_seconds:8.3f}s")
+    print(f"Grouped pass: {grouped_seconds:8.3f}s")
+    print(f"Speedup:      {legacy_seconds / grouped_seconds:8.1f}x")
@@ -0,0 +1,106 @@
+# Compares the vectorized trailing return calculation against the per-ticker, per-threshold loop it replaced
+# in integrations/markets/yfinance_main.py. Synthetic data only, no database or network needed.
+# Usage: python benchmarks/trailing_returns.py [tickers]
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.trailing_returns import trailing_returns
+
+
+def legacy_fetch_data(hist, now):
+    # fetch_data() from yfinance_main.py after the download, datetime.now() replaced by now
+    if len(hist) < 2:
+        return None
+
+    today = hist.iloc[-1]
+    current_price = today['Close']
+
+    start_of_year = datetime(now.year, 1, 1)
+
+    thresholds = {
+        '1w': pd.DateOffset(weeks=1),
+        '1m': pd.DateOffset(months=1),
+        '3m': pd.DateOffset(months=3),
+        '6m': pd.DateOffset(months=6),
+        '1y': pd.DateOffset(years=1),
+        '18m': pd.DateOffset(months=18),
+        '2y': pd.DateOffset(years=2),
+        'ytd': start_of_year
+    }
+
+    changes = {}
+    for key, offset in thresholds.items():
+        if key == 'ytd':
+            date_threshold = start_of_year
+        else:
+            date_threshold = now - offset
+
+        threshold_data = hist[hist.index >= date_threshold]
+        if not threshold_data.empty:
+            threshold_close = threshold_data.iloc[0]['Close']
+            change = current_price - threshold_close
+            change_pct = (change / threshold_close) * 100
+            changes[f'{key}_price'] = change
+            changes[f'{key}_pct'] = change_pct
+        else:
+            changes[f'{key}_price'] = np.nan
+            changes[f'{key}_pct'] = np.nan
+
+    yesterday = hist.iloc[-2]
+    previous_close = yesterday['Close']
+    change = current_price - previous_close
+    change_pct = (change / previous_close) * 100
+
+    return {'last': current_price, 'chg': change, 'chg_pct': change_pct, **changes}
+
+
+def build_synthetic(tickers, now):
+    # Two years of calendar days. Every 10th ticker trades on weekends (crypto), the rest only on weekdays,
+    # and a few start late or have fewer than two bars.
+    dates = pd.date_range(now.normalize() - pd.DateOffset(years=2), now.normalize(), freq='D')
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), tickers)), axis=0)),
+        index=dates,
+        columns=[f'T{i:04d}' for i in range(tickers)]
+    )
+    weekend = prices.index.dayofweek >= 5
+    for i, column in enumerate(prices.columns):
+        if i % 10:
+            prices.loc[weekend, column] = np.nan
+        if i % 37 == 0:
+            prices.iloc[:len(dates) // 2, i] = np.nan
+    prices.iloc[:-1, -1] = np.nan
+    return prices
+
+
+if __name__ == '__main__':
+    tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    now = pd.Timestamp.now()
+    prices = build_synthetic(tickers, now)
+    print(f"{tickers} tickers x {len(prices)} days")
+
+    start = time.perf_counter()
+    legacy = {}
+    for ticker in prices.columns:
+        hist = prices[[ticker]].dropna().rename(columns={ticker: 'Close'})
+        legacy[ticker] = legacy_fetch_data(hist, now)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = trailing_returns(prices, as_of=now)
+    vectorized_seconds = time.perf_counter() - start
+
+    legacy_df = pd.DataFrame({ticker: row for ticker, row in legacy.items() if row is not None}).T
+    assert vectorized.loc[[ticker for ticker, row in legacy.items() if row is None]].isna().all().all()
+    assert np.allclose(legacy_df.to_numpy(dtype=float), vectorized.loc[legacy_df.index, legacy_df.columns].to_numpy(), equal_nan=True)
+
+    print(f"Per-threshold loop: {legacy_seconds:8.3f}s")
+    print(f"Vectorized:         {vectorized_seconds:8.3f}s")
+    print(f"Speedup:            {legacy_seconds / vectorized_seconds:8.1f}x")
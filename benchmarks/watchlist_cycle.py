@@ -0,0 +1,72 @@
+# Runs watchlist cycles against FakeQuoteProvider and checks the delta UPDATE: the first cycle writes only the
+# tickers whose quote or status changed, a second cycle on the same quotes writes nothing.
+# Needs the Postgres connection from .env but no network. watchlist, engines and engine_runs are shadowed by
+# temporary tables for the session, so nothing is written to the real ones.
+# Usage: python benchmarks/watchlist_cycle.py [tickers] [latency seconds]
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.data_source import get_connection, release_connection
+from integrations.watchlist_engine import WatchlistEngine, FakeQuoteProvider
+
+
+def build_synthetic(tickers):
+    """Stored rows and fake quotes: a quarter of the tickers moved, every tenth fails, the rest are unchanged."""
+    stored, quotes, expected = [], {}, {}
+    for i in range(tickers):
+        ticker = f"T{i:05d}"
+        row = {'open': 100.0 + i, 'close': 101.0 + i, 'percent_chg': 1.0, 'status': 'Success'}
+        stored.append((ticker, row['open'], row['close'], row['percent_chg'], '2024-01-01', row['status']))
+        if i % 10 == 0:
+            quotes[ticker] = ConnectionError("quote failed")
+            expected[ticker] = (row['open'], row['close'], row['percent_chg'], 'Error', '2024-01-01')
+        elif i % 4 == 0:
+            quotes[ticker] = {'open': row['open'], 'close': row['close'] + 0.5, 'percent_chg': 1.5, 'date': '2024-01-02'}
+            expected[ticker] = (row['open'], row['close'] + 0.5, 1.5, 'Success', '2024-01-02')
+        else:
+            quotes[ticker] = {'open': row['open'], 'close': row['close'], 'percent_chg': row['percent_chg'], 'date': '2024-01-02'}
+            expected[ticker] = (row['open'], row['close'], row['percent_chg'], 'Success', '2024-01-01')
+    return stored, quotes, expected
+
+
+if __name__ == '__main__':
+    tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    stored, quotes, expected = build_synthetic(tickers)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    # Temporary tables come first on the search_path, the engine's unqualified statements hit them
+    for table in ('watchlist', 'engines', 'engine_runs'):
+        cur.execute(f"CREATE TEMP TABLE {table} (LIKE {table} INCLUDING DEFAULTS)")
+    cur.execute("ALTER TABLE pg_temp.watchlist ADD PRIMARY KEY (ticker)")
+    cur.executemany("INSERT INTO watchlist (ticker, open, close, percent_chg, date, status) VALUES (%s, %s, %s, %s, %s, %s)", stored)
+    conn.commit()
+
+    provider = FakeQuoteProvider(quotes, latency)
+    engine = WatchlistEngine(conn, provider)
+    start = time.perf_counter()
+    asyncio.run(engine.run_cycle())
+    first_seconds = time.perf_counter() - start
+    asyncio.run(engine.run_cycle())
+
+    cur.execute("SELECT ticker, open, close, percent_chg, status, date FROM watchlist")
+    written = {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+    assert written == expected, "watchlist rows differ from the quotes"
+
+    first, second = engine.metrics[0], engine.metrics[1]
+    changed = sum(1 for i in range(tickers) if i % 10 == 0 or i % 4 == 0)
+    assert first['changed'] == changed, f"first cycle wrote {first['changed']} rows, expected {changed}"
+    assert second['changed'] == 0, f"second cycle wrote {second['changed']} rows, expected none"
+    assert provider.requests == 2 * tickers
+
+    print(f"{tickers} tickers, {latency:.3f}s per quote")
+    print(f"First cycle:  {first['changed']:6d} rows written in {first_seconds:.3f}s")
+    print(f"Second cycle: {second['changed']:6d} rows written")
+
+    cur.close()
+    release_connection(conn, close=True)
@@ -0,0 +1 @@
+# Shared helpers used by the integration, analysis and prediction scripts.
@@ -0,0 +1,94 @@
+import itertools
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from common.forecasts import WINDOWS, arima_model, format_order, window_frame
+
+# Forecast horizons (months) every config is scored at
+HORIZONS = (12, 36)
+# Rolling origins per config and the months between them
+BACKTEST_FOLDS = int(os.getenv("ARIMA_BACKTEST_FOLDS", 8))
+BACKTEST_STEP_MONTHS = int(os.getenv("ARIMA_BACKTEST_STEP_MONTHS", 6))
+
+
+def order_grid(p_values, d_values, q_values):
+    return list(itertools.product(p_values, d_values, q_values))
+
+
+def fold_origins(n, horizon, folds=BACKTEST_FOLDS, step=BACKTEST_STEP_MONTHS):
+    """
+    Row positions the rolling origins end their training data at (exclusive), oldest first. The newest leaves
+    exactly horizon observations to score against, the others are step months before it.
+    """
+    newest = n - horizon
+    return [origin for origin in range(newest - (folds - 1) * step, newest + 1, step) if origin > 1]
+
+
+def evaluate_config(task):
+    """
+    Rolling-origin errors of one (order, window) config, the unit of work of a worker process.
+    Every fold fits the window ending at its origin and forecasts the longest horizon, shorter horizons are scored
+    on its first months. Folds that fail to fit (or forecast non-finite values) are counted, not scored.
+    """
+    history, column, order, window, horizons, folds, step = task
+    started = time.perf_counter()
+    longest = max(horizons)
+    values = history[column].to_numpy(dtype=float)
+    errors = {horizon: [] for horizon in horizons}
+    failed = 0
+
+    for origin in fold_origins(len(history), longest, folds, step):
+        train = window_frame(history.iloc[:origin], window)[column].to_numpy(dtype=float)
+        try:
+            with warnings.catch_warnings():
+                # Convergence and non-stationary start warnings of every fold of every config drown the output
+                warnings.simplefilter('ignore')
+                forecast = np.asarray(arima_model(train, order).fit().forecast(steps=longest))
+            if not np.isfinite(forecast).all():
+                raise ValueError("non-finite forecast")
+        except Exception:
+            failed += 1
+            continue
+        actual = values[origin:origin + longest]
+        for horizon in horizons:
+            errors[horizon].append(forecast[:horizon] - actual[:horizon])
+
+    rows = []
+    for horizon in horizons:
+        fold_errors = np.concatenate(errors[horizon]) if errors[horizon] else np.array([])
+        rows.append({
+            'window_name': window,
+            'arima_order': format_order(order),
+            'horizon': horizon,
+            'mae': float(np.mean(np.abs(fold_errors))) if fold_errors.size else np.nan,
+            'rmse': float(np.sqrt(np.mean(fold_errors ** 2))) if fold_errors.size else np.nan,
+            'folds': len(errors[horizon]),
+            'failed_folds': failed,
+            'fit_seconds': time.perf_counter() - started,
+        })
+    return rows
+
+
+def run_backtest(history, column, orders, windows=tuple(WINDOWS), horizons=HORIZONS, folds=BACKTEST_FOLDS,
+                 step=BACKTEST_STEP_MONTHS, workers=None):
+    """
+    Backtests every (order, window) config on history (date and column, oldest first) and returns the leaderboard:
+    one row per config and horizon with MAE / RMSE over all folds, best RMSE first within each window and horizon.
+    Configs are spread over a process pool of workers (every core by default), workers=1 runs them in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    history = history[['date', column]].reset_index(drop=True)
+    tasks = [(history, column, order, window, tuple(horizons), folds, step) for window in windows for order in orders]
+
+    if workers == 1:
+        results = [evaluate_config(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(evaluate_config, tasks))
+
+    leaderboard = pd.DataFrame([row for rows in results for row in rows])
+    return leaderboard.sort_values(['window_name', 'horizon', 'rmse'], na_position='last').reset_index(drop=True)
@@ -0,0 +1,125 @@
+import os
+import pandas as pd
+import yfinance as yf
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CACHE_DIR = os.getenv("BAR_CACHE_DIR") or os.path.join(ROOT_DIR, 'cache')
+
+# The longest change the engines report is 2 years, keep a little more so the 2Y threshold always has a bar
+HISTORY_PERIOD = '2y'
+HISTORY_KEEP = pd.DateOffset(years=2, days=10)
+
+# Re-read a few bars before the last cached one: today's bar keeps moving until the close
+# and Yahoo sometimes fills in the previous session late
+REFRESH_OVERLAP = pd.DateOffset(days=5)
+
+# Closes are adjusted for splits and dividends like Ticker.history() returns them. A new dividend or split rescales
+# a symbol's whole history, so settled bars in the overlap that moved by more than this send it back to a full download.
+ADJUSTMENT_TOLERANCE = 1e-6
+
+
+def _close_prices(downloaded, symbols):
+    """Returns the Close prices of a yf.download result as a (dates x symbols) frame."""
+    if downloaded is None or downloaded.empty:
+        return pd.DataFrame(columns=symbols, dtype=float)
+
+    if isinstance(downloaded.columns, pd.MultiIndex):
+        close = downloaded['Close']
+    else:
+        # Older yfinance versions return flat columns for a single symbol
+        close = downloaded[['Close']].rename(columns={'Close': symbols[0]})
+
+    close.index = pd.DatetimeIndex(close.index)
+    if close.index.tz is not None:
+        close.index = close.index.tz_localize(None)
+    close.index = close.index.normalize()
+    close = close[~close.index.duplicated(keep='last')]
+    return close.reindex(columns=symbols).astype(float)
+
+
+class BarCache:
+    """
+    Daily Close bars for a set of Yahoo Finance symbols persisted as one CSV (dates x symbols).
+    refresh() downloads all symbols in at most two batched yf.download calls: full history for symbols
+    the cache hasn't seen yet, and only the bars since the last cached date for the rest.
+    """
+
+    def __init__(self, name, cache_dir=DEFAULT_CACHE_DIR):
+        self.path = os.path.join(cache_dir, f"{name}_adjusted_bars.csv")
+        # Caches written before the closes were adjusted are rebuilt from scratch
+        legacy_path = os.path.join(cache_dir, f"{name}_bars.csv")
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+        self.bars = self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(dtype=float)
+        try:
+            return pd.read_csv(self.path, index_col=0, parse_dates=True).astype(float)
+        except Exception as e:
+            print(f"Could not read bar cache {self.path}, rebuilding it: {e}")
+            return pd.DataFrame(dtype=float)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write to a temporary file first so a crash mid-write never leaves a truncated cache behind
+        temp_path = f"{self.path}.tmp"
+        self.bars.to_csv(temp_path, index_label='Date')
+        os.replace(temp_path, self.path)
+
+    def refresh(self, symbols):
+        """Brings the cached bars of symbols up to date and returns them (dates x symbols, NaN where a symbol didn't trade)."""
+        symbols = list(symbols)
+        cached = [symbol for symbol in symbols if symbol in self.bars.columns and self.bars[symbol].notna().any()]
+        uncached = [symbol for symbol in symbols if symbol not in cached]
+
+        bars = self.bars
+        downloads = []
+        if cached:
+            start = bars[cached].apply(lambda column: column.last_valid_index()).min() - REFRESH_OVERLAP
+            print(f"Downloading bars since {start.date()} for {len(cached)} cached symbol(s).")
+            recent = _close_prices(
+                yf.download(cached, start=start.strftime('%Y-%m-%d'), interval='1d', group_by='column',
+                            auto_adjust=True, progress=False, threads=True),
+                cached
+            )
+            readjusted = self._readjusted(recent, cached)
+            if readjusted:
+                print(f"Adjustments changed for {len(readjusted)} symbol(s), downloading their full history again.")
+                bars = bars.drop(columns=readjusted)
+                recent = recent.drop(columns=readjusted)
+                uncached += readjusted
+            downloads.append(recent)
+        if uncached:
+            print(f"Downloading {HISTORY_PERIOD} of bars for {len(uncached)} uncached symbol(s).")
+            downloads.append(_close_prices(
+                yf.download(uncached, period=HISTORY_PERIOD, interval='1d', group_by='column',
+                            auto_adjust=True, progress=False, threads=True),
+                uncached
+            ))
+
+        for new_bars in downloads:
+            # Fresh values win, the cache fills in whatever the download didn't return
+            bars = new_bars.combine_first(bars)
+
+        bars = bars.sort_index()
+        bars = bars[bars.index >= pd.Timestamp.now().normalize() - HISTORY_KEEP]
+        self.bars = bars
+        self.save()
+
+        return self.bars.reindex(columns=symbols)
+
+    def _readjusted(self, recent, symbols):
+        """Symbols whose settled bars (before their last cached one) differ between the cache and recent."""
+        readjusted = []
+        for symbol in symbols:
+            cached = self.bars[symbol].dropna()
+            settled = cached[cached.index < cached.index[-1]]
+            fresh = recent[symbol].reindex(settled.index).dropna()
+            if fresh.empty:
+                continue
+            moved = ((fresh - settled[fresh.index]).abs() / settled[fresh.index].abs()).max()
+            if moved > ADJUSTMENT_TOLERANCE:
+                readjusted.append(symbol)
+        return readjusted
@@ -0,0 +1,78 @@
+import io
+import time
+from psycopg2 import sql
+
+
+def bulk_upsert(cur, df, table_name, conflict_columns, only_changed=False, ignore_columns=()):
+    """
+    Load a DataFrame into table_name with COPY and merge it with a single INSERT ... ON CONFLICT DO UPDATE.
+    The DataFrame columns must match the target column names (unquoted names are folded to lowercase like Postgres does).
+    With only_changed, existing rows are only rewritten when a value other than when_updated differs.
+    ignore_columns are written along with such a change but never trigger one on their own (e.g. a series vintage).
+    Returns the number of rows inserted or updated.
+    """
+    start_time = time.perf_counter()
+
+    columns = [col.lower() for col in df.columns]
+    conflict_columns = [col.lower() for col in conflict_columns]
+    update_columns = [col for col in columns if col not in conflict_columns]
+    ignore_columns = {'when_updated'} | {col.lower() for col in ignore_columns}
+
+    df = df.copy()
+    df.columns = columns
+    # The row-by-row inserts let the last duplicate win, ON CONFLICT would fail on it instead
+    df = df.drop_duplicates(subset=conflict_columns, keep='last')
+
+    staging_table = sql.Identifier(f"{table_name.lower()}_staging")
+    target_table = sql.Identifier(table_name.lower())
+    column_list = sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+
+    # Staging table only carries the loaded columns, typed like the target and without its constraints
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging_table))
+    cur.execute(sql.SQL("CREATE TEMP TABLE {} AS SELECT {} FROM {} WITH NO DATA").format(
+        staging_table, column_list, target_table
+    ))
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep='')
+    buffer.seek(0)
+    cur.copy_expert(
+        sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(staging_table, column_list),
+        buffer
+    )
+
+    if update_columns:
+        conflict_action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(', ').join(
+            sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(col), sql.Identifier(col))
+            for col in update_columns
+        ))
+        compare_columns = [col for col in update_columns if col not in ignore_columns]
+        if only_changed and compare_columns:
+            conflict_action = sql.SQL("{} WHERE ({}) IS DISTINCT FROM ({})").format(
+                conflict_action,
+                sql.SQL(', ').join(sql.SQL("{}.{}").format(target_table, sql.Identifier(col)) for col in compare_columns),
+                sql.SQL(', ').join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(col)) for col in compare_columns)
+            )
+    else:
+        conflict_action = sql.SQL("DO NOTHING")
+
+    cur.execute(sql.SQL("""
+        INSERT INTO {target} ({columns})
+        SELECT {columns} FROM {staging}
+        ON CONFLICT ({conflict}) {action}
+    """).format(
+        target=target_table,
+        columns=column_list,
+        staging=staging_table,
+        conflict=sql.SQL(', ').join(sql.Identifier(col) for col in conflict_columns),
+        action=conflict_action
+    ))
+    written_count = cur.rowcount
+    cur.execute(sql.SQL("DROP TABLE {}").format(staging_table))
+
+    row_count = len(df)
+    elapsed = time.perf_counter() - start_time
+    rows_per_sec = row_count / elapsed if elapsed > 0 else float('inf')
+    print(f"Upserted {row_count} rows into {table_name} ({written_count} written) in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec).")
+
+    return written_count
@@ -0,0 +1,58 @@
+import io
+import re
+from datetime import datetime, timedelta
+from psycopg2 import sql
+
+HISTORY_TABLE = 'coin_volume_history'
+HISTORY_COLUMNS = ['coin_id', 'timestamp', 'granularity', 'market_cap', 'total_volume', 'in_volume', 'out_volume',
+                   'price_change_percentage_24h', 'samples']
+PARTITION_PATTERN = re.compile(rf'^{HISTORY_TABLE}_(\d{{8}})$')
+
+
+def partition_name(day):
+    return f"{HISTORY_TABLE}_{day.strftime('%Y%m%d')}"
+
+
+def ensure_day_partition(cur, day):
+    """Creates the coin_volume_history partition holding day if it doesn't exist yet."""
+    day = datetime(day.year, day.month, day.day)
+    cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(partition_name(day)), sql.Identifier(HISTORY_TABLE)
+    ), (day, day + timedelta(days=1)))
+
+
+def day_partitions(cur):
+    """Returns [(day, partition name)] for every coin_volume_history partition, oldest first."""
+    cur.execute("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s
+    """, (HISTORY_TABLE,))
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((datetime.strptime(match.group(1), '%Y%m%d'), name))
+    return sorted(partitions)
+
+
+def append_history(cur, df, timestamp):
+    """
+    Appends one hourly snapshot (a coin_volume_data shaped frame) to coin_volume_history with COPY.
+    Returns the number of rows written.
+    """
+    ensure_day_partition(cur, timestamp)
+    history = df.reindex(columns=HISTORY_COLUMNS).copy()
+    history['timestamp'] = timestamp
+    history['granularity'] = 'hourly'
+    history['samples'] = 1
+
+    buffer = io.StringIO()
+    history.to_csv(buffer, index=False, header=False, na_rep='')
+    buffer.seek(0)
+    cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(HISTORY_TABLE), sql.SQL(', ').join(sql.Identifier(col) for col in HISTORY_COLUMNS)
+    ), buffer)
+    return len(history)
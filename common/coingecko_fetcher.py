@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from common.http_cache import cached_session
+from common.rate_limited_client import RateLimitedClient
+
+COINGECKO_BASE_URL = 'https://api.coingecko.com/api/v3'
+COINGECKO_REQUESTS_PER_MINUTE = 30  # Public / demo plan limit
+COINGECKO_PAGE_SIZE = 250  # Largest per_page /coins/markets accepts
+
+
+class TimeBudgetExceeded(Exception):
+    pass
+
+
+class CoinGeckoFetcher(RateLimitedClient):
+    """
+    CoinGecko client that pages through /coins/markets with a bounded thread pool and one shared rate limiter.
+    A 429 pauses every worker for Retry-After (or a backoff) instead of only the one that got it.
+    Nothing new is requested once time_budget seconds have passed, so a run always ends in time with the pages it has.
+    api_key (demo plan) is optional, base_url can point at a local stub server for testing.
+    """
+
+    api_name = 'CoinGecko'
+
+    def __init__(self, api_key=None, base_url=COINGECKO_BASE_URL, max_workers=4,
+                 requests_per_minute=COINGECKO_REQUESTS_PER_MINUTE, max_retries=5, backoff_seconds=2.0, timeout=30,
+                 session=None):
+        if session is None:
+            session = cached_session('COINGECKO')
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        if api_key:
+            session.headers['x-cg-demo-api-key'] = api_key
+        super().__init__(session, requests_per_minute, capacity=max_workers, max_retries=max_retries,
+                         backoff_seconds=backoff_seconds, timeout=timeout)
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.deadline = None
+
+    def _before_request(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise TimeBudgetExceeded("CoinGecko time budget used up")
+
+    def get_markets_page(self, page, vs_currency='usd', per_page=COINGECKO_PAGE_SIZE):
+        return self._get_json(f"{self.base_url}/coins/markets", {
+            'vs_currency': vs_currency,
+            'order': 'market_cap_desc',
+            'per_page': per_page,
+            'page': page,
+            'sparkline': 'false',
+        }, f"page {page}")
+
+    def get_all_markets(self, vs_currency='usd', per_page=COINGECKO_PAGE_SIZE, time_budget=None, max_pages=None):
+        """
+        Fetches /coins/markets page by page until a page comes back short, keeping max_workers pages in flight.
+        Returns (DataFrame in market cap order, complete). complete is False when the time budget ran out or a page
+        failed before the last page was seen; the DataFrame then holds every page that did arrive.
+        """
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        pages = {}
+        failed_pages = []
+        last_page = max_pages
+        next_page = 1
+        # A page that fails after all retries stops new pages, the API is down or refusing us
+        stopped = False
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+
+            def submit_pages():
+                nonlocal next_page
+                while (not stopped and len(pending) < self.max_workers and (last_page is None or next_page <= last_page)
+                       and (self.deadline is None or time.monotonic() < self.deadline)):
+                    pending[executor.submit(self.get_markets_page, next_page, vs_currency, per_page)] = next_page
+                    next_page += 1
+
+            submit_pages()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pending.pop(future)
+                    try:
+                        data = future.result()
+                    except TimeBudgetExceeded:
+                        failed_pages.append(page)
+                        continue
+                    except Exception as e:
+                        print(f"Error fetching CoinGecko markets page {page}: {e}")
+                        failed_pages.append(page)
+                        stopped = True
+                        continue
+                    pages[page] = data
+                    if len(data) < per_page:
+                        last_page = page if last_page is None else min(last_page, page)
+                submit_pages()
+
+        self.deadline = None
+        failed_pages = [page for page in failed_pages if last_page is None or page <= last_page]
+        complete = last_page is not None and not failed_pages and all(page in pages for page in range(1, last_page + 1))
+        if failed_pages:
+            print(f"{len(failed_pages)} CoinGecko page(s) not fetched: {sorted(failed_pages)}")
+
+        rows = [coin for page in sorted(pages) if last_page is None or page <= last_page for coin in pages[page]]
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            # Coins move between pages while we fetch, keep each one once, at its first position
+            df = df.drop_duplicates(subset='id', keep='first').reset_index(drop=True)
+        return df, complete
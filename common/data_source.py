@@ -0,0 +1,171 @@
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+
+from common.snapshots import SNAPSHOT_TABLES, DEFAULT_SNAPSHOT_DIR, frame_from_cursor, read_snapshot
+
+load_dotenv()
+
+# Where the analyses read from: 'postgres' (default) or 'parquet' for the snapshots written by export/parquet_snapshots.py
+DATA_SOURCES = ('postgres', 'parquet')
+
+# Process-wide connection pool, created on first use so Parquet-only runs never connect
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 8))
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def data_source():
+    source = os.getenv("DATA_SOURCE", "postgres").lower()
+    if source not in DATA_SOURCES:
+        raise ValueError(f"DATA_SOURCE must be one of {', '.join(DATA_SOURCES)}, got '{source}'.")
+    return source
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                dbname=os.getenv("DB_NAME"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                host=os.getenv("DB_HOST"),
+                port=os.getenv("DB_PORT")
+            )
+            atexit.register(close_pool)
+    return _pool
+
+
+def get_connection():
+    """A connection from the process-wide pool, hand it back with release_connection (or use connection())."""
+    return get_pool().getconn()
+
+
+def release_connection(conn, close=False):
+    """
+    Returns conn to the pool, an open transaction is rolled back. close=True discards it instead, for connections
+    that failed. Safe to call after the pool was closed.
+    """
+    if _pool is None or _pool.closed:
+        conn.close()
+    else:
+        _pool.putconn(conn, close=close)
+
+
+@contextmanager
+def connection():
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+def date_range_clause(date_column, start=None, end=None):
+    """(" WHERE ..." or empty sql.SQL, params) limiting a query to start <= date column <= end."""
+    conditions = []
+    params = []
+    if date_column and start is not None:
+        conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(date_column)))
+        params.append(pd.Timestamp(start).date())
+    if date_column and end is not None:
+        conditions.append(sql.SQL("{} <= %s").format(sql.Identifier(date_column)))
+        params.append(pd.Timestamp(end).date())
+    if not conditions:
+        return sql.SQL(''), params
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions), params
+
+
+def read_postgres(conn, table, columns=None, start=None, end=None, date_column=None):
+    date_column = date_column or SNAPSHOT_TABLES.get(table)
+    query = sql.SQL("SELECT {columns} FROM {table}").format(
+        columns=sql.SQL(', ').join(sql.Identifier(col) for col in columns) if columns else sql.SQL('*'),
+        table=sql.Identifier(table)
+    )
+    where, params = date_range_clause(date_column, start, end)
+    query = query + where
+    if date_column:
+        query = query + sql.SQL(" ORDER BY {}").format(sql.Identifier(date_column))
+
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        df = frame_from_cursor(cur)
+    if date_column and date_column in df.columns:
+        df[date_column] = pd.to_datetime(df[date_column])
+    return df
+
+
+def read_table(table, columns=None, start=None, end=None, date_column=None, conn=None, source=None):
+    """
+    Rows of an ingested table with start <= date column <= end (either may be None), oldest first.
+    Columns come back lowercase, the date column as datetime64 and NUMERIC columns as floats whichever source
+    is used, so DATA_SOURCE=parquet can be switched on without touching the analyses.
+    Postgres is read through conn, or a pooled connection when conn is None.
+    """
+    source = source or data_source()
+    columns = [col.lower() for col in columns] if columns else None
+    if source == 'parquet':
+        return read_snapshot(table, columns, start, end, date_column, DEFAULT_SNAPSHOT_DIR)
+    if conn is not None:
+        return read_postgres(conn, table, columns, start, end, date_column)
+    with connection() as pooled:
+        return read_postgres(pooled, table, columns, start, end, date_column)
+
+
+def get_series(table, column, start=None, end=None, date_column=None, source=None):
+    """
+    One or more numeric columns of a table between start and end as a frame indexed by date (sorted DatetimeIndex).
+    NUMERIC and float columns come back as float64, integer columns as int64 (float64 when they hold NULLs).
+    """
+    columns = [column] if isinstance(column, str) else list(column)
+    date_column = (date_column or SNAPSHOT_TABLES.get(table) or 'date').lower()
+    df = read_table(table, [date_column] + columns, start, end, date_column, source=source)
+    df = df.set_index(date_column)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def data_version(table, start=None, end=None, date_column=None, source=None):
+    """
+    (row count, max(when_updated) as a Timestamp or None) of a table's rows with start <= date column <= end,
+    what cached reads of that range are invalidated on. With DATA_SOURCE=parquet it is read from the snapshot.
+    """
+    date_column = date_column or SNAPSHOT_TABLES.get(table)
+    if (source or data_source()) == 'parquet':
+        df = read_snapshot(table, ['when_updated'], start, end, date_column, DEFAULT_SNAPSHOT_DIR)
+        return version_of(df)
+
+    query = sql.SQL("SELECT count(*), max(when_updated) FROM {}").format(sql.Identifier(table))
+    where, params = date_range_clause(date_column, start, end)
+    query = query + where
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            count, max_when_updated = cur.fetchone()
+    return count, pd.Timestamp(max_when_updated) if max_when_updated is not None else None
+
+
+def version_of(df):
+    """data_version of rows already read with their when_updated column."""
+    if df.empty or df['when_updated'].isna().all():
+        return len(df), None
+    return len(df), pd.Timestamp(df['when_updated'].max())
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from common.http_cache import cached_session
+from common.rate_limited_client import RateLimitedClient
+
+EIA_BASE_URL = 'https://api.eia.gov/v2'
+EIA_REQUESTS_PER_MINUTE = 60  # EIA allows roughly 5,000 requests an hour per key
+EIA_PAGE_SIZE = 5000  # Largest length the v2 API returns in one response
+
+# EIA period strings by frequency
+PERIOD_FORMATS = {
+    'monthly': '%Y-%m',
+    'weekly': '%Y-%m-%d',
+    'daily': '%Y-%m-%d',
+    'quarterly': None,  # 2024-Q1, parsed with pd.Period
+    'annual': '%Y',
+}
+
+
+def format_period(date, frequency):
+    """EIA start/end parameter for a date."""
+    date = pd.Timestamp(date)
+    if frequency == 'quarterly':
+        return f"{date.year}-Q{date.quarter}"
+    return date.strftime(PERIOD_FORMATS[frequency])
+
+
+def parse_periods(periods, frequency):
+    if frequency == 'quarterly':
+        return pd.PeriodIndex(periods, freq='Q').to_timestamp()
+    return pd.to_datetime(periods, format=PERIOD_FORMATS[frequency])
+
+
+class EiaFetcher(RateLimitedClient):
+    """
+    EIA API v2 client. Follows offset pagination until a series is exhausted and fetches many series
+    through a bounded thread pool sharing one rate limiter. base_url can point at a local stub server for testing.
+
+    A series is described by a dict:
+        {'series_id': 'MCRFPUS2', 'route': 'petroleum/sum/snd', 'frequency': 'monthly', 'facets': {'series': ['MCRFPUS2']}}
+    """
+
+    api_name = 'EIA'
+
+    def __init__(self, api_key, base_url=EIA_BASE_URL, max_workers=4, requests_per_minute=EIA_REQUESTS_PER_MINUTE,
+                 page_size=EIA_PAGE_SIZE, max_retries=5, backoff_seconds=1.0, timeout=60, session=None):
+        super().__init__(session or cached_session('EIA'), requests_per_minute, max_retries=max_retries,
+                         backoff_seconds=backoff_seconds, timeout=timeout)
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.page_size = page_size
+
+    def _request(self, route, params):
+        return self._get_json(f"{self.base_url}/{route.strip('/')}/data/", dict(params, api_key=self.api_key), route)
+
+    def get_series(self, spec, start=None):
+        """
+        Every observation of one series from start (inclusive, None for the full history), oldest first.
+        Returns a DataFrame with Date, value and units.
+        """
+        frequency = spec.get('frequency', 'monthly')
+        params = {
+            'frequency': frequency,
+            'data[0]': spec.get('data_column', 'value'),
+            'sort[0][column]': 'period',
+            'sort[0][direction]': 'asc',
+            'length': self.page_size,
+        }
+        for facet, values in spec.get('facets', {}).items():
+            params[f'facets[{facet}][]'] = list(values)
+        if start is not None:
+            params['start'] = format_period(start, frequency)
+
+        rows = []
+        offset = 0
+        while True:
+            payload = self._request(spec['route'], dict(params, offset=offset)).get('response', {})
+            page = payload.get('data', [])
+            rows.extend(page)
+            offset += len(page)
+            if not page or offset >= int(payload.get('total', 0)):
+                break
+
+        if not rows:
+            return pd.DataFrame(columns=['Date', 'value', 'units'])
+
+        df = pd.DataFrame(rows)
+        return pd.DataFrame({
+            'Date': parse_periods(df['period'], frequency),
+            'value': pd.to_numeric(df[spec.get('data_column', 'value')], errors='coerce'),
+            'units': df['units'] if 'units' in df else None,
+        }).dropna(subset=['value']).reset_index(drop=True)
+
+    def get_many(self, specs, starts=None):
+        """
+        Fetches every series concurrently and returns {series_id: DataFrame}.
+        starts optionally maps series_id to its start. Failed series are printed and left out.
+        """
+        starts = starts or {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {spec['series_id']: executor.submit(self.get_series, spec, starts.get(spec['series_id']))
+                       for spec in specs}
+            for series_id, future in futures.items():
+                try:
+                    results[series_id] = future.result()
+                except Exception as e:
+                    print(f"Error fetching EIA series {series_id}: {e}")
+        return results
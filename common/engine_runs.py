@@ -0,0 +1,113 @@
+import atexit
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is recorded as NULL there
+    resource = None
+
+STAGES = ('fetch', 'transform', 'load')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where the platform doesn't report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class EngineRun:
+    """
+    Collects per-stage wall time and row/byte counters for one engine run and writes them to engine_runs.
+
+        run = EngineRun('cpi', conn)
+        with run.stage('fetch'):
+            ...
+            run.rows_fetched += len(data)
+        with run.stage('load'):
+            run.rows_upserted += bulk_upsert(...)
+        run.record(cur, engine_status)
+
+    Errors raised inside a stage are kept and written to error_message. If the script exits without calling
+    record() (the engines exit(1) on fatal errors), the run is recorded as 'Error' on its own at interpreter exit,
+    after rolling back the engine's open transaction, so failed runs show up in the history too.
+    """
+
+    def __init__(self, engine, conn):
+        self.engine = engine
+        self.conn = conn
+        self.run_started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.stage_seconds = {}
+        self.rows_fetched = 0
+        self.rows_upserted = 0
+        self.bytes_downloaded = None  # Stays NULL for clients that don't expose response sizes (e.g. yfinance)
+        self.errors = []
+        self.recorded = False
+        atexit.register(self.record_unfinished)
+
+    def add_bytes(self, byte_count):
+        self.bytes_downloaded = (self.bytes_downloaded or 0) + byte_count
+
+    @contextmanager
+    def stage(self, name):
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}', expected one of {', '.join(STAGES)}.")
+
+        stage_start = time.perf_counter()
+        try:
+            yield self
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                self.errors.append(f"{name}: exited with status {e.code}")
+            raise
+        except Exception as e:
+            # Engines often handle the error themselves and carry on with the next series, just remember it
+            self.errors.append(f"{name}: {type(e).__name__}: {e}")
+            raise
+        finally:
+            # Stages can be entered more than once (e.g. one load per table), their times add up
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - stage_start
+
+    def record(self, cur, status, error_message=None):
+        """Inserts the run into engine_runs on cur. The caller commits it along with its engines update."""
+        if error_message is None and self.errors:
+            error_message = '; '.join(self.errors)
+        duration = time.perf_counter() - self.start_time
+        rss = peak_rss_mb()
+        cur.execute("""
+            INSERT INTO engine_runs (engine, run_started, run_finished, status, duration_seconds,
+                                     fetch_seconds, transform_seconds, load_seconds,
+                                     rows_fetched, rows_upserted, bytes_downloaded, peak_rss_mb, error_message)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            self.engine, self.run_started, datetime.now(), status, duration,
+            self.stage_seconds.get('fetch'), self.stage_seconds.get('transform'), self.stage_seconds.get('load'),
+            self.rows_fetched, self.rows_upserted, self.bytes_downloaded, rss, error_message
+        ))
+        self.recorded = True
+        # Engines that loop (e.g. yfinance_main --daemon) create one EngineRun per iteration
+        atexit.unregister(self.record_unfinished)
+
+        stage_summary = ', '.join(f"{name} {self.stage_seconds[name]:.2f}s" for name in STAGES if name in self.stage_seconds)
+        print(f"Run of {self.engine} took {duration:.2f}s ({stage_summary or 'no stages'}): "
+              f"{self.rows_fetched} rows fetched, {self.rows_upserted} rows upserted, "
+              f"{self.bytes_downloaded if self.bytes_downloaded is not None else 'unknown'} bytes downloaded, "
+              f"peak RSS {f'{rss:.0f} MB' if rss is not None else 'unknown'}.")
+
+    def record_unfinished(self):
+        if self.recorded or self.conn is None or self.conn.closed:
+            return
+        try:
+            self.conn.rollback()
+            cur = self.conn.cursor()
+            self.record(cur, 'Error')
+            self.conn.commit()
+            cur.close()
+        except Exception as e:
+            print(f"Error recording failed run of {self.engine}: {e}")
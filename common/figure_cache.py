@@ -0,0 +1,54 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Figures kept per cache, enough for every horizon and president of the house price app
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", 64))
+
+
+class FigureCache:
+    """
+    Least recently used cache of Dash figures keyed on (selection, data version). build(selection, *args) makes the
+    figure on a miss, args being whatever get() was given along (e.g. the frames of that data version). A callback
+    returns a cached figure unless its data changed since, in which case the new version simply misses and the old
+    entries age out (or are dropped with invalidate). warm() builds a list of selections up front, e.g. at app start.
+    """
+
+    def __init__(self, build, max_entries=FIGURE_CACHE_SIZE):
+        self.build = build
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, selection, version, *args):
+        key = (selection, version)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Built outside the lock, two callbacks racing on the same miss just build it twice
+        figure = self.build(selection, *args)
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def warm(self, selections, version, *args):
+        for selection in selections:
+            self.get(selection, version, *args)
+
+    def invalidate(self, version=None):
+        """Drops the figures built at version, every figure when None."""
+        with self._lock:
+            for key in [key for key in self._figures if version is None or key[1] == version]:
+                del self._figures[key]
+
+    def __len__(self):
+        return len(self._figures)
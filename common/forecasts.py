@@ -0,0 +1,199 @@
+import hashlib
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from common.bulk_loader import bulk_upsert
+from common.data_source import connection, get_series
+
+# Window name -> years of observations the model is fitted on, counted back from the last observation (None for all)
+WINDOWS = {
+    '4_years': 4,
+    'all_time': None,
+}
+
+# Order used until predictions/arima_backtest.py has written a leaderboard for the series and window
+DEFAULT_ORDER = (5, 1, 0)
+
+
+def format_order(order):
+    return ','.join(str(part) for part in order)
+
+
+def window_frame(df, window, date_column='date'):
+    """
+    The rows of df (oldest first) inside window. Counted back from the last date rather than today,
+    so the same data always gives the same window.
+    """
+    years = WINDOWS[window]
+    if years is None or df.empty:
+        return df.reset_index(drop=True)
+    start = df[date_column].iloc[-1] - pd.DateOffset(years=years)
+    return df[df[date_column] > start].reset_index(drop=True)
+
+
+def data_hash(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=float).tobytes()).hexdigest()
+
+
+def parse_order(order):
+    return tuple(int(part) for part in order.split(','))
+
+
+def best_order(cur, series, window, steps):
+    """
+    The order with the lowest backtested RMSE in arima_leaderboard for series and window, at the horizon closest to
+    steps, from the latest backtest. Orders with failed folds rank last. DEFAULT_ORDER when none was backtested.
+    """
+    cur.execute("""
+        SELECT arima_order
+        FROM arima_leaderboard
+        WHERE series = %s AND window_name = %s AND rmse IS NOT NULL
+          AND last_obs_date = (SELECT MAX(last_obs_date) FROM arima_leaderboard WHERE series = %s AND window_name = %s)
+        ORDER BY ABS(horizon - %s), failed_folds > 0, rmse
+        LIMIT 1
+    """, (series, window, series, window, steps))
+    row = cur.fetchone()
+    return parse_order(row[0]) if row else DEFAULT_ORDER
+
+
+def load_model(cur, series, window, order, last_obs_date=None):
+    """
+    The stored fit of (series, window, order) at last_obs_date, or the most recent one when last_obs_date
+    is None. Returns a dict or None.
+    """
+    query = """
+        SELECT last_obs_date, data_hash, param_names, params
+        FROM arima_models
+        WHERE series = %s AND window_name = %s AND arima_order = %s
+    """
+    params = [series, window, format_order(order)]
+    if last_obs_date is not None:
+        query += " AND last_obs_date = %s"
+        params.append(last_obs_date)
+    cur.execute(query + " ORDER BY last_obs_date DESC LIMIT 1", params)
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {'last_obs_date': row[0], 'data_hash': row[1], 'param_names': row[2], 'params': np.array(row[3], dtype=float)}
+
+
+def load_forecast(cur, series, window, order, last_obs_date, steps):
+    """The stored forecast of a model, None unless it covers at least steps months."""
+    cur.execute("""
+        SELECT date, forecast, lower_95, upper_95
+        FROM forecasts
+        WHERE series = %s AND window_name = %s AND arima_order = %s AND last_obs_date = %s AND step <= %s
+        ORDER BY step
+    """, (series, window, format_order(order), last_obs_date, steps))
+    rows = cur.fetchall()
+    if len(rows) < steps:
+        return None
+    forecast_df = pd.DataFrame(rows, columns=['date', 'forecast', 'lower_95', 'upper_95'])
+    forecast_df['date'] = pd.to_datetime(forecast_df['date'])
+    return forecast_df
+
+
+def arima_model(values, order):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    return ARIMA(values, order=order)
+
+
+def save_model(cur, series, window, order, last_obs_date, values, results, fit_seconds, warm_started):
+    # One row with array columns, a plain upsert rather than bulk_upsert's CSV COPY
+    cur.execute("""
+        INSERT INTO arima_models (series, window_name, arima_order, last_obs_date, nobs, data_hash, param_names, params,
+                                  aic, fit_seconds, warm_started, when_updated)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (series, window_name, arima_order, last_obs_date) DO UPDATE SET
+            nobs = EXCLUDED.nobs,
+            data_hash = EXCLUDED.data_hash,
+            param_names = EXCLUDED.param_names,
+            params = EXCLUDED.params,
+            aic = EXCLUDED.aic,
+            fit_seconds = EXCLUDED.fit_seconds,
+            warm_started = EXCLUDED.warm_started,
+            when_updated = EXCLUDED.when_updated
+    """, (series, window, format_order(order), last_obs_date, len(values), data_hash(values),
+          list(results.param_names), [float(param) for param in results.params], float(results.aic), fit_seconds,
+          warm_started, datetime.now()))
+
+
+def forecast_frame(results, last_date, steps):
+    prediction = results.get_forecast(steps=steps)
+    bounds = np.asarray(prediction.conf_int(alpha=0.05))
+    return pd.DataFrame({
+        'date': pd.date_range(start=last_date, periods=steps + 1, freq='MS')[1:],
+        'forecast': np.asarray(prediction.predicted_mean),
+        'lower_95': bounds[:, 0],
+        'upper_95': bounds[:, 1],
+    })
+
+
+def forecast_series(table, column, window, steps, order=None):
+    """
+    Monthly ARIMA forecast of table.column fitted on window, as (history, forecast) frames: history has date and
+    column, forecast has date, column and the 95% interval (lower_95, upper_95).
+
+    Fits are kept in arima_models keyed on (series, window, order, last observation date). When the data hasn't
+    changed the stored forecast is returned (or recomputed from the stored params if it is shorter than steps)
+    without fitting. When one new month arrived, the fit starts from the previous month's params, which converges
+    in a fraction of the iterations. Otherwise the model is fitted from scratch. Forecasts are written to forecasts.
+    Without an order, the best backtested one for the window and horizon is used (see best_order).
+    """
+    series = f"{table}.{column}"
+    history = window_frame(get_series(table, column).reset_index(), window)
+    values = history[column].to_numpy(dtype=float)
+    last_obs_date = history['date'].iloc[-1].date()
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            order = tuple(order) if order is not None else best_order(cur, series, window, steps)
+            model = load_model(cur, series, window, order, last_obs_date)
+            forecast_df = None
+            if model is not None and model['data_hash'] == data_hash(values):
+                forecast_df = load_forecast(cur, series, window, order, last_obs_date, steps)
+                if forecast_df is not None:
+                    print(f"Using the stored {window} ARIMA{order} forecast of {series} as of {last_obs_date}.")
+                else:
+                    results = arima_model(values, order).filter(model['params'])
+                    print(f"Reused the {window} ARIMA{order} params of {series} as of {last_obs_date}.")
+            else:
+                # Revised data starts from its own old params, one new month from the previous month's
+                start_model = model
+                if start_model is None and len(history) > 1:
+                    start_model = load_model(cur, series, window, order)
+                    if start_model is not None and start_model['last_obs_date'] != history['date'].iloc[-2].date():
+                        start_model = None
+                start_params = start_model['params'] if start_model is not None else None
+
+                started = time.perf_counter()
+                results = arima_model(values, order).fit(start_params=start_params)
+                fit_seconds = time.perf_counter() - started
+                print(f"Fitted the {window} ARIMA{order} model of {series} on {len(values)} observations "
+                      f"in {fit_seconds:.2f}s ({'warm start' if start_params is not None else 'cold start'}).")
+
+                save_model(cur, series, window, order, last_obs_date, values, results, fit_seconds,
+                           start_params is not None)
+                # A refit on revised data replaces the model, its old forecast (possibly longer than steps) goes with it
+                cur.execute("""
+                    DELETE FROM forecasts
+                    WHERE series = %s AND window_name = %s AND arima_order = %s AND last_obs_date = %s
+                """, (series, window, format_order(order), last_obs_date))
+
+            if forecast_df is None:
+                forecast_df = forecast_frame(results, history['date'].iloc[-1], steps)
+                stored = forecast_df.assign(
+                    series=series,
+                    window_name=window,
+                    arima_order=format_order(order),
+                    last_obs_date=last_obs_date,
+                    step=np.arange(1, steps + 1),
+                    when_updated=datetime.now(),
+                )
+                bulk_upsert(cur, stored, 'forecasts', ['series', 'window_name', 'arima_order', 'last_obs_date', 'date'])
+        conn.commit()
+
+    return history[['date', column]], forecast_df.rename(columns={'forecast': column})
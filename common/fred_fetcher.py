@@ -0,0 +1,94 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+from common.http_cache import cached_session
+from common.rate_limited_client import RateLimitedClient
+
+FRED_BASE_URL = 'https://api.stlouisfed.org/fred'
+FRED_REQUESTS_PER_MINUTE = 120  # Published FRED API limit per key
+
+
+class FredFetcher(RateLimitedClient):
+    """
+    Minimal FRED client that fetches many series through a bounded thread pool.
+    Exposes get_series / get_series_info like fredapi.Fred so it can be used wherever the engines use Fred.
+    base_url can point at a local stub server for testing. Responses go through the shared HTTP cache (common/http_cache.py).
+    """
+
+    api_name = 'FRED'
+
+    def __init__(self, api_key, base_url=FRED_BASE_URL, max_workers=8, requests_per_minute=None,
+                 max_retries=5, backoff_seconds=1.0, timeout=30, session=None):
+        # runEngines.py hands every concurrent FRED engine its share of the key's limit
+        if requests_per_minute is None:
+            requests_per_minute = int(os.getenv("FRED_REQUESTS_PER_MINUTE", FRED_REQUESTS_PER_MINUTE))
+        super().__init__(session or cached_session('FRED'), requests_per_minute, max_retries=max_retries,
+                         backoff_seconds=backoff_seconds, timeout=timeout)
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+
+    def _error_message(self, response):
+        try:
+            return response.json().get('error_message', response.text)
+        except ValueError:
+            return response.text
+
+    def _request(self, path, params):
+        return self._get_json(f"{self.base_url}/{path}", dict(params, api_key=self.api_key, file_type='json'),
+                              params.get('series_id', path))
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        params = {'series_id': series_id}
+        if observation_start is not None:
+            params['observation_start'] = pd.Timestamp(observation_start).strftime('%Y-%m-%d')
+        if observation_end is not None:
+            params['observation_end'] = pd.Timestamp(observation_end).strftime('%Y-%m-%d')
+
+        observations = []
+        offset = 0
+        while True:
+            payload = self._request('series/observations', dict(params, offset=offset))
+            page = payload.get('observations', [])
+            observations.extend(page)
+            offset += len(page)
+            if not page or offset >= int(payload.get('count', 0)):
+                break
+
+        if not observations:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+
+        dates = pd.to_datetime([obs['date'] for obs in observations])
+        values = pd.to_numeric([obs['value'] for obs in observations], errors='coerce')  # FRED uses '.' for missing
+        return pd.Series(values, index=dates)
+
+    def get_series_info(self, series_id):
+        payload = self._request('series', {'series_id': series_id})
+        return pd.Series(payload['seriess'][0])
+
+    def _run_concurrently(self, func, series_ids):
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {series_id: executor.submit(func, series_id) for series_id in series_ids}
+            for series_id, future in futures.items():
+                try:
+                    results[series_id] = future.result()
+                except Exception as e:
+                    print(f"Error fetching series {series_id}: {e}")
+        return results
+
+    def get_many(self, series_ids, observation_starts=None):
+        """
+        Fetches every series concurrently and returns {series_id: Series}.
+        observation_starts optionally maps series_id to its observation_start. Failed series are printed and left out.
+        """
+        observation_starts = observation_starts or {}
+        return self._run_concurrently(
+            lambda series_id: self.get_series(series_id, observation_start=observation_starts.get(series_id)),
+            series_ids
+        )
+
+    def get_many_info(self, series_ids):
+        """Fetches series metadata concurrently and returns {series_id: info Series}."""
+        return self._run_concurrently(self.get_series_info, series_ids)
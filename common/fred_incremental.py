@@ -0,0 +1,125 @@
+import argparse
+import pandas as pd
+from datetime import datetime
+
+# FRED revises recent observations, so every incremental fetch re-reads this much history before the watermark
+DEFAULT_REVISION_WINDOW = pd.DateOffset(years=1)
+
+
+def parse_refresh_args():
+    """Returns True when the engine was started with --full-refresh."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full-refresh', action='store_true', help='Ignore watermarks and reload the full series history.')
+    args, _ = parser.parse_known_args()
+    return args.full_refresh
+
+
+def get_watermark(cur, series_id):
+    """Returns (last_observation_date, last_vintage) for a series, or (None, None) if it has never been loaded."""
+    cur.execute("""
+        SELECT last_observation_date, last_vintage
+        FROM fred_series_watermarks
+        WHERE series_id = %s
+    """, (series_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
+
+def set_watermark(cur, series_id, last_observation_date, vintage):
+    cur.execute("""
+        INSERT INTO fred_series_watermarks (series_id, last_observation_date, last_vintage, when_updated)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (series_id) DO UPDATE
+        SET last_observation_date = GREATEST(fred_series_watermarks.last_observation_date, EXCLUDED.last_observation_date),
+            last_vintage = COALESCE(EXCLUDED.last_vintage, fred_series_watermarks.last_vintage),
+            when_updated = EXCLUDED.when_updated
+    """, (series_id, last_observation_date, vintage, datetime.now()))
+
+
+def get_series_vintage(fred, series_id):
+    """Returns FRED's last_updated stamp for the series, or None if it can't be read."""
+    try:
+        return str(fred.get_series_info(series_id)['last_updated'])
+    except Exception as e:
+        print(f"Could not read vintage for series {series_id}, fetching anyway: {e}")
+        return None
+
+
+def _plan_fetch(series_id, vintage, last_observation_date, last_vintage, revision_window, full_refresh):
+    """Returns ('full' | 'skip' | 'incremental', observation_start)."""
+    if full_refresh or last_observation_date is None:
+        print(f"Fetching full history for series {series_id}.")
+        return 'full', None
+
+    if vintage is not None and vintage == last_vintage:
+        print(f"Series {series_id} unchanged since vintage {vintage}, nothing to fetch.")
+        return 'skip', pd.Timestamp(last_observation_date)
+
+    observation_start = pd.Timestamp(last_observation_date) - revision_window
+    print(f"Fetching series {series_id} from {observation_start.date()} (watermark {last_observation_date}).")
+    return 'incremental', observation_start
+
+
+def _empty_series():
+    return pd.Series(dtype=float, index=pd.DatetimeIndex([]))
+
+
+def fetch_series_incremental(fred, cur, series_id, revision_window=DEFAULT_REVISION_WINDOW, full_refresh=False):
+    """
+    Fetches a FRED series starting at (watermark - revision_window) instead of the full history.
+    Returns (series, vintage, observation_start). observation_start is None when the full history was requested.
+    An empty series is returned when FRED reports the same vintage as the last run.
+    """
+    vintage = get_series_vintage(fred, series_id)
+    last_observation_date, last_vintage = get_watermark(cur, series_id)
+
+    action, observation_start = _plan_fetch(series_id, vintage, last_observation_date, last_vintage, revision_window, full_refresh)
+    if action == 'skip':
+        return _empty_series(), vintage, observation_start
+    if action == 'full':
+        return fred.get_series(series_id), vintage, None
+    return fred.get_series(series_id, observation_start=observation_start), vintage, observation_start
+
+
+def fetch_many_incremental(fetcher, cur, series_ids, revision_window=DEFAULT_REVISION_WINDOW, full_refresh=False):
+    """
+    Same as fetch_series_incremental for a list of series, using a FredFetcher so the vintage checks and
+    downloads run concurrently. Watermarks are read in one query on the calling thread.
+    Returns {series_id: (series, vintage, observation_start)}. Series that failed to download are left out.
+    """
+    cur.execute("""
+        SELECT series_id, last_observation_date, last_vintage
+        FROM fred_series_watermarks
+        WHERE series_id = ANY(%s)
+    """, (list(series_ids),))
+    watermarks = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+    infos = fetcher.get_many_info(series_ids) if not full_refresh else {}
+    vintages = {series_id: str(info['last_updated']) for series_id, info in infos.items()}
+
+    results = {}
+    observation_starts = {}
+    for series_id in series_ids:
+        last_observation_date, last_vintage = watermarks.get(series_id, (None, None))
+        action, observation_start = _plan_fetch(
+            series_id, vintages.get(series_id), last_observation_date, last_vintage, revision_window, full_refresh
+        )
+        if action == 'skip':
+            results[series_id] = (_empty_series(), vintages.get(series_id), observation_start)
+        else:
+            observation_starts[series_id] = observation_start
+
+    fetched = fetcher.get_many(list(observation_starts), observation_starts)
+    for series_id, series in fetched.items():
+        results[series_id] = (series, vintages.get(series_id), observation_starts[series_id])
+
+    return results
+
+
+def update_watermark(cur, series_id, series, vintage):
+    """Moves the watermark to the latest observation of the fetched series."""
+    series = series.dropna()
+    last_observation_date = series.index.max().date() if not series.empty else None
+    set_watermark(cur, series_id, last_observation_date, vintage)
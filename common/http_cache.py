@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CACHE_DIR = os.getenv("HTTP_CACHE_DIR") or os.path.join(ROOT_DIR, 'cache', 'http')
+DEFAULT_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", 256))
+
+# Seconds a stored response is served without asking the upstream again, HTTP_CACHE_TTL_<SOURCE> overrides.
+# FRED and EIA publish at most daily, CoinGecko markets move by the minute.
+SOURCE_TTLS = {
+    'FRED': 4 * 3600,
+    'EIA': 12 * 3600,
+    'COINGECKO': 300,
+}
+
+# Query parameters left out of the cache key, so keys (and the cache file) never hold credentials
+SECRET_PARAMS = {'api_key', 'apikey', 'x_cg_demo_api_key', 'x_cg_pro_api_key', 'token'}
+
+# Response headers kept with the body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def cache_enabled():
+    # Opt-in for development reruns: engines in production must see revisions and consistent CoinGecko pages
+    return os.getenv("HTTP_CACHE", "N").upper() == 'Y'
+
+
+def cache_key(method, url, params=None):
+    """Hash of the method, URL and query parameters (merged, sorted, secrets removed)."""
+    prepared = requests.Request(method, url, params=params).prepare()
+    parts = urlsplit(prepared.url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in SECRET_PARAMS)
+    normalized = urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ''))
+    return hashlib.sha256(f"{method.upper()} {normalized}".encode()).hexdigest(), normalized
+
+
+class HttpCache:
+    """
+    Compressed response bodies in one SQLite file, shared by every engine process.
+    Entries are evicted least recently used first once the compressed total passes max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'responses.sqlite')
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                source TEXT,
+                url TEXT,
+                headers TEXT,
+                body BLOB,
+                size INTEGER,
+                stored_at REAL,
+                last_access REAL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_access_idx ON responses (last_access)")
+
+    def get(self, key):
+        """Returns (headers, body, stored_at) or None."""
+        with self.lock:
+            row = self.db.execute("SELECT headers, body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        headers, body, stored_at = row
+        return json.loads(headers), zlib.decompress(body), stored_at
+
+    def put(self, key, source, url, headers, body):
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        with self.lock:
+            self.db.execute("""
+                INSERT OR REPLACE INTO responses (key, source, url, headers, body, size, stored_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, source, url, json.dumps(headers), compressed, len(compressed), now, now))
+            self._evict()
+
+    def touch(self, key):
+        """Marks an entry as fresh again after the upstream answered 304 Not Modified."""
+        now = time.time()
+        with self.lock:
+            self.db.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        print(f"HTTP cache over {self.max_bytes // (1024 * 1024)} MB, evicted {evicted} least recently used response(s).")
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session that answers GET requests from an HttpCache while they are younger than ttl seconds.
+    Older entries are revalidated with If-None-Match / If-Modified-Since when the upstream sent an ETag or
+    Last-Modified, a 304 then serves the stored body. Only 200 responses are stored.
+    Responses carry from_cache=True when no body was downloaded.
+    """
+
+    def __init__(self, source, ttl=None, cache=None):
+        super().__init__()
+        self.source = source
+        if ttl is None:
+            ttl = int(os.getenv(f"HTTP_CACHE_TTL_{source}", SOURCE_TTLS.get(source, 0)))
+        self.ttl = ttl
+        self.cache = cache or HttpCache()
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        key, normalized_url = cache_key(method, url, params)
+        entry = self.cache.get(key)
+        if entry is not None:
+            stored_headers, body, stored_at = entry
+            if time.time() - stored_at < self.ttl:
+                return self._cached_response(url, stored_headers, body)
+
+            headers = dict(headers or {})
+            if stored_headers.get('ETag'):
+                headers['If-None-Match'] = stored_headers['ETag']
+            if stored_headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = stored_headers['Last-Modified']
+
+        response = super().request(method, url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            return self._cached_response(url, entry[0], entry[1])
+        if response.status_code == 200:
+            self.cache.put(key, self.source, normalized_url,
+                           {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+                           response.content)
+        response.from_cache = False
+        return response
+
+    @staticmethod
+    def _cached_response(url, headers, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        return response
+
+
+def cached_session(source, ttl=None):
+    """CachedSession for source when HTTP_CACHE=Y, a plain requests.Session otherwise."""
+    if not cache_enabled():
+        return requests.Session()
+    return CachedSession(source, ttl)
@@ -0,0 +1,33 @@
+import os
+import pandas as pd
+from common.bulk_loader import bulk_upsert
+
+
+def observations_store_enabled():
+    """True when OBSERVATIONS_STORE=Y, i.e. db-config/migrate_to_observations.sql has been run."""
+    return os.getenv('OBSERVATIONS_STORE', 'N').upper() in ('Y', 'YES', 'TRUE')
+
+
+def get_series_family(cur, series_id):
+    cur.execute("SELECT series_family FROM observation_series WHERE series_id = %s", (series_id,))
+    row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"Series {series_id} is not registered in observation_series.")
+    return row[0]
+
+
+def upsert_observations(cur, series_id, df, value_column, vintage=None, when_updated=None, date_column='Date'):
+    """
+    Writes one series from an engine DataFrame into the partitioned observations table. Only rows whose value changed
+    are rewritten: a new vintage re-fetches the whole revision window, the vintage alone is no change.
+    """
+    observations_df = pd.DataFrame({
+        'series_family': get_series_family(cur, series_id),
+        'series_id': series_id,
+        'date': df[date_column].to_numpy(),
+        'value': df[value_column].to_numpy(),
+        'vintage': vintage,
+        'when_updated': when_updated if when_updated is not None else df['when_updated'].to_numpy()
+    })
+    return bulk_upsert(cur, observations_df, 'observations', ['series_family', 'series_id', 'date'], only_changed=True,
+                       ignore_columns=['vintage'])
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# presidential_terms is loaded once per process, every engine and analysis shares this copy
+_terms_cache = None
+
+
+def get_presidential_terms(conn):
+    """Returns presidential_terms sorted by start_date with datetime start/end columns, cached per process."""
+    global _terms_cache
+    if _terms_cache is None:
+        president_query = """
+            SELECT president_name, start_date, end_date
+            FROM presidential_terms
+            ORDER BY start_date
+        """
+        terms_df = pd.read_sql(president_query, conn)
+        terms_df['start_date'] = pd.to_datetime(terms_df['start_date'])
+        terms_df['end_date'] = pd.to_datetime(terms_df['end_date'])
+        _terms_cache = terms_df.reset_index(drop=True)
+    return _terms_cache
+
+
+def clear_presidential_terms_cache():
+    global _terms_cache
+    _terms_cache = None
+
+
+def label_presidents(dates, terms_df):
+    """
+    Labels every date with the president in office in one vectorized lookup.
+    Boundaries are inclusive on both ends, and on an inauguration day the outgoing president wins, which is the
+    same as scanning presidential_terms in order and taking the first term with start_date <= date <= end_date.
+    Dates outside every term are labeled None.
+    """
+    dates = pd.Series(pd.to_datetime(dates))
+    starts = terms_df['start_date'].to_numpy(dtype='datetime64[ns]')
+    ends = terms_df['end_date'].to_numpy(dtype='datetime64[ns]')
+    names = terms_df['president_name'].to_numpy(dtype=object)
+
+    values = dates.to_numpy(dtype='datetime64[ns]')
+    # Terms are contiguous, so the first term ending on or after the date is the earliest one that can contain it
+    positions = np.searchsorted(ends, values, side='left')
+    in_range = positions < len(ends)
+    clipped = np.minimum(positions, len(ends) - 1)
+    matched = in_range & (starts[clipped] <= values) & ~np.isnat(values)
+
+    labels = np.where(matched, names[clipped], None)
+    return pd.Series(labels, index=dates.index, dtype=object)
+
+
+def tag_presidents(dates, conn):
+    """label_presidents against the cached presidential_terms table."""
+    return label_presidents(dates, get_presidential_terms(conn))
+
+
+def calculate_president_changes(df, value_column, date_column, group_columns=(), president_column='president'):
+    """
+    Computes, for every row, the value at the start and end of its president's term (per group_columns, e.g. State)
+    plus the amount and percent change between them, in a single grouped pass.
+    Start/end are the values on the first and last observed dates of each (group, president), including NaN values.
+    Rows without a president get NaN. Returns a DataFrame aligned to df.index with
+    start_value, end_value, amt_change and percent_change columns.
+    """
+    keys = list(group_columns) + [president_column]
+    work = df[keys + [date_column, value_column]].reset_index(drop=True)
+
+    grouped = work.groupby(keys, sort=False)[date_column]
+    first_rows = grouped.transform('idxmin')
+    last_rows = grouped.transform('idxmax')
+
+    values = work[value_column].to_numpy(dtype=float)
+    has_group = first_rows.notna().to_numpy()
+    first_positions = first_rows.fillna(0).to_numpy(dtype=np.int64)
+    last_positions = last_rows.fillna(0).to_numpy(dtype=np.int64)
+
+    start_value = np.where(has_group, values[first_positions], np.nan)
+    end_value = np.where(has_group, values[last_positions], np.nan)
+    amt_change = end_value - start_value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent_change = (amt_change / start_value) * 100
+
+    return pd.DataFrame({
+        'start_value': start_value,
+        'end_value': end_value,
+        'amt_change': amt_change,
+        'percent_change': percent_change
+    }, index=df.index)
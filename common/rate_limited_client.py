@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+import requests
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Allows a burst of `capacity` requests and refills so that no 60 second window
+    goes over requests_per_minute. pause() holds every caller, e.g. once the API answers 429.
+    """
+
+    def __init__(self, requests_per_minute, capacity=20):
+        self.capacity = max(1, min(capacity, requests_per_minute // 2))
+        self.refill_rate = (requests_per_minute - self.capacity) / 60.0
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            # No burst right after the pause, the server just told us we were going too fast
+            self.tokens = 0.0
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    # Nothing refills while paused
+                    self.tokens = min(self.capacity, self.tokens + (now - max(self.last_refill, self.paused_until)) * self.refill_rate)
+                    self.last_refill = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """
+    Base of the FRED, EIA and CoinGecko clients: JSON GETs through one token bucket shared by every worker thread,
+    retried with backoff on connection errors and RETRY_STATUS_CODES. A 429 pauses every worker for Retry-After
+    (or a backoff) instead of only the one that got it. bytes_downloaded counts what actually came over the network.
+    """
+
+    api_name = 'API'
+
+    def __init__(self, session, requests_per_minute, capacity=20, max_retries=5, backoff_seconds=1.0, timeout=30):
+        self.session = session
+        self.limiter = TokenBucket(requests_per_minute, capacity=capacity)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.bytes_downloaded = 0
+        self.bytes_lock = threading.Lock()
+
+    def _before_request(self):
+        """Runs before every attempt and again once the limiter lets it through, raise to give up."""
+
+    def _error_message(self, response):
+        return response.text[:200]
+
+    def _get_json(self, url, params, label):
+        """GET url and return the decoded JSON. label names the request in retry and error messages."""
+        for attempt in range(self.max_retries + 1):
+            self._before_request()
+            self.limiter.acquire()
+            self._before_request()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"{self.api_name} request for {label} failed ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+
+            if not getattr(response, 'from_cache', False):
+                with self.bytes_lock:
+                    self.bytes_downloaded += len(response.content)
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self._backoff(attempt)
+                print(f"{self.api_name} returned {response.status_code} for {label}, retrying in {delay:.1f}s.")
+                if response.status_code == 429:
+                    self.limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+
+            if response.status_code != 200:
+                raise ValueError(f"{self.api_name} request for {label} failed with {response.status_code}: "
+                                 f"{self._error_message(response)}")
+            return response.json()
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter so parallel workers don't retry in lockstep
+        return self.backoff_seconds * (2 ** attempt) + random.uniform(0, self.backoff_seconds)
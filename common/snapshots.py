@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import pandas as pd
+from psycopg2 import sql
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_SNAPSHOT_DIR = os.getenv("PARQUET_SNAPSHOT_DIR") or os.path.join(ROOT_DIR, 'snapshots')
+ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", 10000))
+MANIFEST_FILE = '_manifest.json'
+PARTITION_COLUMN = 'year'
+NUMERIC_OID = 1700
+
+# Ingested tables exported to Parquet -> date column they are partitioned (by year) and filtered on.
+# None exports the table as a single unpartitioned file.
+SNAPSHOT_TABLES = {
+    'unemployment_data': 'date',
+    'employment_jobs': 'date',
+    'house_prices': 'date',
+    'total_business_inventories': 'date',
+    'inventories_to_sales_ratio': 'date',
+    'retailers_inventories_to_sales_ratio': 'date',
+    'manufacturers_inventories_to_sales_ratio': 'date',
+    'wholesalers_inventories_to_sales_ratio': 'date',
+    'auto_inventory_to_sales_ratio': 'date',
+    'total_business_sales': 'date',
+    'retailer_inventories': 'date',
+    'gross_domestic_product': 'date',
+    'gross_national_product': 'date',
+    'real_gross_domestic_product': 'date',
+    'gdp_per_capita': 'date',
+    'real_gdp_per_capita': 'date',
+    'real_gdp_growth': 'date',
+    'sp500': 'date',
+    'dji': 'date',
+    'cpi': 'date',
+    'state_house_prices': 'date',
+    'federal_debt_gdp': 'date',
+    'us_oil_production_monthly_mil_bar_pd': 'date',
+    'eia_observations': 'date',
+    'presidential_terms': None,
+    'us_ill_migration': None,
+}
+
+# Extra sort keys after the date column, so rows of one day stay together and row-group statistics stay tight
+SORT_COLUMNS = {
+    'employment_jobs': ['job_type'],
+    'state_house_prices': ['state'],
+    'eia_observations': ['series_id'],
+}
+
+
+def frame_from_cursor(cur):
+    """DataFrame of an executed query with lowercase columns, NUMERIC columns (Decimal objects) as floats."""
+    df = pd.DataFrame(cur.fetchall(), columns=[desc[0].lower() for desc in cur.description])
+    for desc in cur.description:
+        if desc[1] == NUMERIC_OID:
+            df[desc[0].lower()] = df[desc[0].lower()].astype(float)
+    return df
+
+
+def load_manifest(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def table_version(cur, table):
+    """(row count, max(when_updated) as text or None) of a table, what decides whether its snapshot is stale."""
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s AND column_name = 'when_updated'
+        )
+    """, (table,))
+    if cur.fetchone()[0]:
+        cur.execute(sql.SQL("SELECT count(*), max(when_updated)::text FROM {}").format(sql.Identifier(table)))
+        return cur.fetchone()
+    cur.execute(sql.SQL("SELECT count(*) FROM {}").format(sql.Identifier(table)))
+    return cur.fetchone()[0], None
+
+
+def is_current(manifest, table, version):
+    entry = manifest.get(table)
+    # Tables without when_updated can't tell an edit from no change, they are exported again unless empty
+    return (entry is not None and (version[1] is not None or version[0] == 0)
+            and entry['rows'] == version[0] and entry['max_when_updated'] == version[1])
+
+
+def export_table(conn, table, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Writes table to snapshot_dir/<table>/ as zstd-compressed Parquet, hive partitioned by year of its date column,
+    sorted by date and with row-group statistics, so readers can skip partitions and row groups outside a date range.
+    The new files are written next to the old snapshot and swapped in with a rename. Returns the number of rows.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    date_column = SNAPSHOT_TABLES[table]
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT * FROM {}").format(sql.Identifier(table)))
+        df = frame_from_cursor(cur)
+
+    partitioning = None
+    if date_column:
+        df[date_column] = pd.to_datetime(df[date_column]).dt.date
+        df = df.sort_values([date_column] + SORT_COLUMNS.get(table, []), kind='stable')
+        df[PARTITION_COLUMN] = pd.to_datetime(df[date_column]).dt.year.astype('int32')
+        partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.int32())]), flavor='hive')
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    target = os.path.join(snapshot_dir, table)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    if df.empty:
+        # write_dataset writes no file for an empty table, keep one so readers still find the snapshot
+        os.makedirs(staging)
+        pq.write_table(arrow_table, os.path.join(staging, 'part-0.parquet'), compression='zstd')
+    else:
+        ds.write_dataset(
+            arrow_table,
+            staging,
+            format='parquet',
+            partitioning=partitioning,
+            basename_template='part-{i}.parquet',
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd', write_statistics=True),
+            max_rows_per_group=ROW_GROUP_ROWS,
+            min_rows_per_group=min(ROW_GROUP_ROWS, len(df)),
+        )
+
+    retired = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.rename(target, retired)
+    os.rename(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    return len(df)
+
+
+def read_snapshot(table, columns=None, start=None, end=None, date_column=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """
+    Reads a table's Parquet snapshot, only the rows with start <= date column <= end (either may be None).
+    The range is pushed down to the year partitions and the row-group statistics of the date column.
+    """
+    import pyarrow.dataset as ds
+
+    path = os.path.join(snapshot_dir, table)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No Parquet snapshot of {table} in {snapshot_dir}, run export/parquet_snapshots.py first.")
+
+    date_column = date_column or SNAPSHOT_TABLES.get(table)
+    dataset = ds.dataset(path, format='parquet', partitioning='hive' if SNAPSHOT_TABLES.get(table) else None)
+    partitioned = PARTITION_COLUMN in dataset.schema.names and SNAPSHOT_TABLES.get(table) is not None
+
+    clauses = []
+    if date_column and start is not None:
+        start = pd.Timestamp(start)
+        clauses.append(ds.field(date_column) >= start.date())
+        if partitioned:
+            clauses.append(ds.field(PARTITION_COLUMN) >= start.year)
+    if date_column and end is not None:
+        end = pd.Timestamp(end)
+        clauses.append(ds.field(date_column) <= end.date())
+        if partitioned:
+            clauses.append(ds.field(PARTITION_COLUMN) <= end.year)
+    condition = None
+    for clause in clauses:
+        condition = clause if condition is None else condition & clause
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if not (partitioned and name == PARTITION_COLUMN)]
+    df = dataset.to_table(columns=list(columns), filter=condition).to_pandas()
+    if date_column and date_column in df.columns:
+        df[date_column] = pd.to_datetime(df[date_column])
+        df = df.sort_values(date_column, kind='stable').reset_index(drop=True)
+    return df
+
+
+def record_export(manifest, table, version):
+    manifest[table] = {
+        'rows': version[0],
+        'max_when_updated': version[1],
+        'date_column': SNAPSHOT_TABLES[table],
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+    }
@@ -0,0 +1,91 @@
+import pandas as pd
+
+from common.data_source import read_table, data_version, version_of
+
+# Shared by every analysis in the process, see term_windows()
+_shared = None
+
+
+class TermWindows:
+    """
+    Series sliced to presidential terms. presidential_terms is read once, and each (table, column) is read once
+    for the union of the windows asked for so far; windows inside that range are then sliced from memory.
+    A president's window is their first term, start and end inclusive.
+
+    Every series is read with its when_updated column, so the version of the cached range (row count,
+    max(when_updated)) comes from the same query as the data. invalidate_stale() checks each cached range again
+    and drops the ones that changed since.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+        self.queries = 0
+        self._terms = None
+        self._series = {}
+
+    def terms(self):
+        if self._terms is None:
+            terms = read_table('presidential_terms', source=self.source)
+            self.queries += 1
+            terms['start_date'] = pd.to_datetime(terms['start_date'])
+            terms['end_date'] = pd.to_datetime(terms['end_date'])
+            self._terms = terms.sort_values('start_date').reset_index(drop=True)
+        return self._terms
+
+    def window(self, president):
+        """(start, end) Timestamps of a president's first term."""
+        terms = self.terms()
+        terms = terms[terms['president_name'] == president]
+        if terms.empty:
+            raise ValueError(f"{president} is not in presidential_terms.")
+        return terms['start_date'].iloc[0], terms['end_date'].iloc[0]
+
+    def prefetch(self, table, column, presidents):
+        """Reads table.column once for the union of the presidents' windows, so slicing them costs no query."""
+        windows = [self.window(president) for president in presidents]
+        self._frame(table, column, min(start for start, _ in windows), max(end for _, end in windows))
+
+    def series(self, table, column, president):
+        """date and column of table within the president's term, oldest first."""
+        start, end = self.window(president)
+        frame = self._frame(table, column, start, end)
+        return frame[(frame['date'] >= start) & (frame['date'] <= end)].reset_index(drop=True)
+
+    def _frame(self, table, column, start, end):
+        key = (table, column)
+        entry = self._series.get(key)
+        if entry is not None and entry['start'] <= start and end <= entry['end']:
+            return entry['frame']
+
+        # Widen to what is cached already, one read then covers both
+        if entry is not None:
+            start, end = min(start, entry['start']), max(end, entry['end'])
+        frame = read_table(table, ['date', column, 'when_updated'], start, end, source=self.source)
+        self.queries += 1
+        self._series[key] = {'frame': frame.drop(columns='when_updated'), 'start': start, 'end': end,
+                             'version': version_of(frame)}
+        return self._series[key]['frame']
+
+    def invalidate(self, table=None):
+        """Drops the cached series of table (every table when None), presidential_terms included."""
+        if table is None or table == 'presidential_terms':
+            self._terms = None
+        self._series = {key: entry for key, entry in self._series.items() if table is not None and key[0] != table}
+
+    def invalidate_stale(self):
+        """
+        Drops cached series whose range gained, lost or rewrote rows since it was read (one count/max(when_updated)
+        query per cached series). Returns the tables of the dropped series.
+        """
+        stale = {key for key, entry in self._series.items()
+                 if data_version(key[0], entry['start'], entry['end'], source=self.source) != entry['version']}
+        self._series = {key: entry for key, entry in self._series.items() if key not in stale}
+        return {table for table, _ in stale}
+
+
+def term_windows():
+    """The process-wide TermWindows."""
+    global _shared
+    if _shared is None:
+        _shared = TermWindows()
+    return _shared
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Horizon name -> offset back from as_of. 'ytd' is measured from January 1st of as_of's year.
+HORIZONS = {
+    '1w': pd.DateOffset(weeks=1),
+    '1m': pd.DateOffset(months=1),
+    '3m': pd.DateOffset(months=3),
+    '6m': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '18m': pd.DateOffset(months=18),
+    '2y': pd.DateOffset(years=2),
+    'ytd': None,
+}
+
+
+def horizon_start(offset, as_of):
+    """Threshold timestamp of a horizon (offset None means year to date), the first bar at or after it is the base price."""
+    if offset is None:
+        return pd.Timestamp(as_of.year, 1, 1)
+    return as_of - offset
+
+
+def _last_valid_positions(valid):
+    """Row position of the last True per column, -1 for columns without any."""
+    n_rows = valid.shape[0]
+    last = n_rows - 1 - np.argmax(valid[::-1], axis=0)
+    return np.where(valid.any(axis=0), last, -1)
+
+
+def trailing_returns(prices, as_of=None, horizons=HORIZONS):
+    """
+    Trailing changes for every column of prices at once.
+    prices is a (dates x tickers) frame of closes with NaN where a ticker has no bar (e.g. weekends for indices but not
+    for crypto). For each horizon the base price is the ticker's first bar at or after the horizon start.
+    Returns a float64 frame indexed by ticker with last, chg, chg_pct (against the previous bar) and
+    {horizon}_price / {horizon}_pct for each horizon (absolute and percent change). Missing values are NaN,
+    formatting is left to whoever displays them.
+    """
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+    prices = prices.sort_index()
+    dates = pd.DatetimeIndex(prices.index)
+    values = prices.to_numpy(dtype=float)
+    columns = np.arange(values.shape[1])
+
+    valid = ~np.isnan(values)
+    last_positions = _last_valid_positions(valid)
+    valid_before_last = valid.copy()
+    valid_before_last[last_positions[last_positions >= 0], columns[last_positions >= 0]] = False
+    previous_positions = _last_valid_positions(valid_before_last)
+
+    def take(positions):
+        return np.where(positions >= 0, values[np.maximum(positions, 0), columns], np.nan)
+
+    # Tickers with fewer than two bars get no values at all
+    previous = take(previous_positions)
+    last = np.where(previous_positions >= 0, take(last_positions), np.nan)
+
+    result = {
+        'last': last,
+        'chg': last - previous,
+        'chg_pct': (last - previous) / previous * 100,
+    }
+
+    # Backfilled values give each ticker's first real bar at or after any row, one searchsorted per horizon
+    # then looks up every ticker at once
+    backfilled = pd.DataFrame(values).bfill().to_numpy()
+    starts = [horizon_start(offset, as_of) for offset in horizons.values()]
+    start_positions = dates.searchsorted(pd.DatetimeIndex(starts), side='left')
+    for name, position in zip(horizons, start_positions):
+        if position < len(dates):
+            base = backfilled[position]
+        else:
+            base = np.full(values.shape[1], np.nan)
+        change = last - base
+        result[f'{name}_price'] = change
+        result[f'{name}_pct'] = change / base * 100
+
+    return pd.DataFrame(result, index=prices.columns, dtype=float)
@@ -1,26 +1,18 @@
 import os
+import sys
 from dotenv import load_dotenv
-import psycopg2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
 #dotenv_path = '/path/to/your/.env'
 #load_dotenv(dotenv_path=dotenv_path)
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 environment_name = os.getenv("ENVIRONMENT_NAME")
 
-conn = psycopg2.connect(
-    dbname=dbname,
-    user=user,
-    password=password,
-    host=host,
-    port=port
-)
+conn = get_connection()
 
 cursor = conn.cursor()
 
@@ -51,5 +43,5 @@ else:
 
 
 cursor.close()
-conn.close()
+release_connection(conn)
 
@@ -0,0 +1,87 @@
+-- Converts the VARCHAR value columns of app_home_page and watchlist to DOUBLE PRECISION.
+-- 'N/A', empty strings and anything else that isn't a number become NULL, '%' suffixes are dropped.
+-- Formatting moves to the app_home_page_display / watchlist_display views with the same column names and strings:
+-- values rounded to 2 decimals, '%' on percentages, 'N/A' when missing, and LAST unrounded as before
+-- (Postgres drops the '.0' the old Python formatting left on whole LAST values).
+-- and partial indexes let top gainers / losers per horizon be served by ORDER BY ... LIMIT.
+-- Run before deploying the yfinance_main.py / watchlist engine versions that write numbers.
+
+BEGIN;
+
+ALTER TABLE app_home_page
+    ALTER COLUMN LAST TYPE DOUBLE PRECISION USING CASE WHEN LAST ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(LAST, '%')::double precision END,
+    ALTER COLUMN CHG TYPE DOUBLE PRECISION USING CASE WHEN CHG ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(CHG, '%')::double precision END,
+    ALTER COLUMN CHG_PCT TYPE DOUBLE PRECISION USING CASE WHEN CHG_PCT ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(CHG_PCT, '%')::double precision END,
+    ALTER COLUMN "1W_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "1W_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1W_PRICE", '%')::double precision END,
+    ALTER COLUMN "1W_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "1W_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1W_PCT", '%')::double precision END,
+    ALTER COLUMN "1M_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "1M_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1M_PRICE", '%')::double precision END,
+    ALTER COLUMN "1M_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "1M_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1M_PCT", '%')::double precision END,
+    ALTER COLUMN "3M_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "3M_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("3M_PRICE", '%')::double precision END,
+    ALTER COLUMN "3M_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "3M_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("3M_PCT", '%')::double precision END,
+    ALTER COLUMN "6M_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "6M_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("6M_PRICE", '%')::double precision END,
+    ALTER COLUMN "6M_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "6M_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("6M_PCT", '%')::double precision END,
+    ALTER COLUMN "1Y_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "1Y_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1Y_PRICE", '%')::double precision END,
+    ALTER COLUMN "1Y_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "1Y_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("1Y_PCT", '%')::double precision END,
+    ALTER COLUMN "18M_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "18M_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("18M_PRICE", '%')::double precision END,
+    ALTER COLUMN "18M_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "18M_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("18M_PCT", '%')::double precision END,
+    ALTER COLUMN "2Y_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "2Y_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("2Y_PRICE", '%')::double precision END,
+    ALTER COLUMN "2Y_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "2Y_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("2Y_PCT", '%')::double precision END,
+    ALTER COLUMN "YTD_PRICE" TYPE DOUBLE PRECISION USING CASE WHEN "YTD_PRICE" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("YTD_PRICE", '%')::double precision END,
+    ALTER COLUMN "YTD_PCT" TYPE DOUBLE PRECISION USING CASE WHEN "YTD_PCT" ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim("YTD_PCT", '%')::double precision END;
+
+ALTER TABLE watchlist
+    ALTER COLUMN open TYPE DOUBLE PRECISION USING CASE WHEN open ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(open, '%')::double precision END,
+    ALTER COLUMN close TYPE DOUBLE PRECISION USING CASE WHEN close ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(close, '%')::double precision END,
+    ALTER COLUMN percent_chg TYPE DOUBLE PRECISION USING CASE WHEN percent_chg ~* '^-?[0-9]+(\.[0-9]+)?(e[-+]?[0-9]+)?%?$' THEN rtrim(percent_chg, '%')::double precision END;
+
+CREATE OR REPLACE VIEW app_home_page_display AS
+SELECT TICKER,
+    COALESCE(LAST::text, 'N/A') AS LAST,  -- Stored unrounded before, left that way
+    COALESCE(round(CHG::numeric, 2)::text, 'N/A') AS CHG,
+    COALESCE(round(CHG_PCT::numeric, 2)::text || '%', 'N/A') AS CHG_PCT,
+    COALESCE(round("1W_PRICE"::numeric, 2)::text, 'N/A') AS "1W_PRICE",
+    COALESCE(round("1W_PCT"::numeric, 2)::text || '%', 'N/A') AS "1W_PCT",
+    COALESCE(round("1M_PRICE"::numeric, 2)::text, 'N/A') AS "1M_PRICE",
+    COALESCE(round("1M_PCT"::numeric, 2)::text || '%', 'N/A') AS "1M_PCT",
+    COALESCE(round("3M_PRICE"::numeric, 2)::text, 'N/A') AS "3M_PRICE",
+    COALESCE(round("3M_PCT"::numeric, 2)::text || '%', 'N/A') AS "3M_PCT",
+    COALESCE(round("6M_PRICE"::numeric, 2)::text, 'N/A') AS "6M_PRICE",
+    COALESCE(round("6M_PCT"::numeric, 2)::text || '%', 'N/A') AS "6M_PCT",
+    COALESCE(round("1Y_PRICE"::numeric, 2)::text, 'N/A') AS "1Y_PRICE",
+    COALESCE(round("1Y_PCT"::numeric, 2)::text || '%', 'N/A') AS "1Y_PCT",
+    COALESCE(round("18M_PRICE"::numeric, 2)::text, 'N/A') AS "18M_PRICE",
+    COALESCE(round("18M_PCT"::numeric, 2)::text || '%', 'N/A') AS "18M_PCT",
+    COALESCE(round("2Y_PRICE"::numeric, 2)::text, 'N/A') AS "2Y_PRICE",
+    COALESCE(round("2Y_PCT"::numeric, 2)::text || '%', 'N/A') AS "2Y_PCT",
+    COALESCE(round("YTD_PRICE"::numeric, 2)::text, 'N/A') AS "YTD_PRICE",
+    COALESCE(round("YTD_PCT"::numeric, 2)::text || '%', 'N/A') AS "YTD_PCT",
+    VISIBLE_YN
+FROM app_home_page;
+
+-- Top gainers / losers by horizon are an indexed ORDER BY ... LIMIT, e.g.
+--   SELECT * FROM app_home_page WHERE VISIBLE_YN = 'Y' AND "1M_PCT" IS NOT NULL ORDER BY "1M_PCT" DESC LIMIT 5;
+-- (ASC for losers, join app_home_page_display on TICKER for the formatted values)
+CREATE INDEX IF NOT EXISTS app_home_page_chg_pct_idx ON app_home_page (CHG_PCT) WHERE VISIBLE_YN = 'Y' AND CHG_PCT IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1w_pct_idx ON app_home_page ("1W_PCT") WHERE VISIBLE_YN = 'Y' AND "1W_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1m_pct_idx ON app_home_page ("1M_PCT") WHERE VISIBLE_YN = 'Y' AND "1M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_3m_pct_idx ON app_home_page ("3M_PCT") WHERE VISIBLE_YN = 'Y' AND "3M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_6m_pct_idx ON app_home_page ("6M_PCT") WHERE VISIBLE_YN = 'Y' AND "6M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1y_pct_idx ON app_home_page ("1Y_PCT") WHERE VISIBLE_YN = 'Y' AND "1Y_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_18m_pct_idx ON app_home_page ("18M_PCT") WHERE VISIBLE_YN = 'Y' AND "18M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_2y_pct_idx ON app_home_page ("2Y_PCT") WHERE VISIBLE_YN = 'Y' AND "2Y_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_ytd_pct_idx ON app_home_page ("YTD_PCT") WHERE VISIBLE_YN = 'Y' AND "YTD_PCT" IS NOT NULL;
+
+CREATE OR REPLACE VIEW watchlist_display AS
+SELECT ticker,
+    status,
+    last_checkin,
+    COALESCE(round(open::numeric, 2)::text, 'N/A') AS open,
+    COALESCE(round(close::numeric, 2)::text, 'N/A') AS close,
+    COALESCE(round(percent_chg::numeric, 2)::text || '%', 'N/A') AS percent_chg,
+    date
+FROM watchlist;
+
+-- Watchlist gainers / losers: ORDER BY percent_chg DESC|ASC LIMIT n WHERE percent_chg IS NOT NULL
+CREATE INDEX IF NOT EXISTS watchlist_percent_chg_idx ON watchlist (percent_chg) WHERE percent_chg IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,128 @@
+-- Migrates the per-series tables into the observations store (run observations_store.sql first).
+-- 1. Backfills observations from every per-series table.
+-- 2. Renames each per-series table to <name>_legacy and creates a view under the old name with the old columns,
+--    so existing analyses keep working unchanged.
+-- Set OBSERVATIONS_STORE=Y for the engines once this has run, the old names are read-only views afterwards.
+-- The _legacy tables can be dropped once the views have been checked.
+
+BEGIN;
+
+-- 1. Backfill
+INSERT INTO observations (series_family, series_id, date, value, when_updated)
+SELECT 'business_inventories', 'BUSINV', date, total_business_inventories, when_updated FROM total_business_inventories
+UNION ALL SELECT 'business_inventories', 'ISRATIO', date, inventories_to_sales_ratio, when_updated FROM inventories_to_sales_ratio
+UNION ALL SELECT 'business_inventories', 'RETAILIRSA', date, retailers_inventories_to_sales_ratio, when_updated FROM retailers_inventories_to_sales_ratio
+UNION ALL SELECT 'business_inventories', 'MNFCTRIRSA', date, manufacturers_inventories_to_sales_ratio, when_updated FROM manufacturers_inventories_to_sales_ratio
+UNION ALL SELECT 'business_inventories', 'WHLSLRIRSA', date, wholesalers_inventories_to_sales_ratio, when_updated FROM wholesalers_inventories_to_sales_ratio
+UNION ALL SELECT 'business_inventories', 'AISRSA', date, auto_inventory_to_sales_ratio, when_updated FROM auto_inventory_to_sales_ratio
+UNION ALL SELECT 'business_inventories', 'TOTBUSSMSA', date, total_business_sales, when_updated FROM total_business_sales
+UNION ALL SELECT 'business_inventories', 'RETAILIMSA', date, retailer_inventories, when_updated FROM retailer_inventories
+UNION ALL SELECT 'gdp', 'GDP', date, gross_domestic_product, when_updated FROM gross_domestic_product
+UNION ALL SELECT 'gdp', 'GNP', date, gross_national_product, when_updated FROM gross_national_product
+UNION ALL SELECT 'gdp', 'GDPC1', date, real_gross_domestic_product, when_updated FROM real_gross_domestic_product
+UNION ALL SELECT 'gdp', 'A939RC0Q052SBEA', date, gdp_per_capita, when_updated FROM gdp_per_capita
+UNION ALL SELECT 'gdp', 'A939RX0Q048SBEA', date, real_gdp_per_capita, when_updated FROM real_gdp_per_capita
+UNION ALL SELECT 'markets', 'DJIA', date, dji, when_updated FROM dji
+UNION ALL SELECT 'markets', 'SP500', date, sp500, when_updated FROM sp500
+UNION ALL SELECT 'inflation', 'CPIAUCNS', date, cpi, when_updated FROM cpi
+UNION ALL SELECT 'inflation', 'CPIAUCNS_INFLATION', date, inflation_rate, when_updated FROM cpi
+UNION ALL SELECT 'labor', 'UNRATE', date, unemployment_rate, when_updated FROM unemployment_data
+ON CONFLICT (series_family, series_id, date) DO UPDATE
+SET value = EXCLUDED.value,
+    when_updated = EXCLUDED.when_updated;
+
+-- 2. Swap the per-series tables for compatibility views
+ALTER TABLE total_business_inventories RENAME TO total_business_inventories_legacy;
+ALTER TABLE inventories_to_sales_ratio RENAME TO inventories_to_sales_ratio_legacy;
+ALTER TABLE retailers_inventories_to_sales_ratio RENAME TO retailers_inventories_to_sales_ratio_legacy;
+ALTER TABLE manufacturers_inventories_to_sales_ratio RENAME TO manufacturers_inventories_to_sales_ratio_legacy;
+ALTER TABLE wholesalers_inventories_to_sales_ratio RENAME TO wholesalers_inventories_to_sales_ratio_legacy;
+ALTER TABLE auto_inventory_to_sales_ratio RENAME TO auto_inventory_to_sales_ratio_legacy;
+ALTER TABLE total_business_sales RENAME TO total_business_sales_legacy;
+ALTER TABLE retailer_inventories RENAME TO retailer_inventories_legacy;
+ALTER TABLE gross_domestic_product RENAME TO gross_domestic_product_legacy;
+ALTER TABLE gross_national_product RENAME TO gross_national_product_legacy;
+ALTER TABLE real_gross_domestic_product RENAME TO real_gross_domestic_product_legacy;
+ALTER TABLE gdp_per_capita RENAME TO gdp_per_capita_legacy;
+ALTER TABLE real_gdp_per_capita RENAME TO real_gdp_per_capita_legacy;
+ALTER TABLE dji RENAME TO dji_legacy;
+ALTER TABLE sp500 RENAME TO sp500_legacy;
+ALTER TABLE cpi RENAME TO cpi_legacy;
+ALTER TABLE unemployment_data RENAME TO unemployment_data_legacy;
+
+-- Business inventories: Date, <series>, Quarter, when_updated
+CREATE VIEW total_business_inventories AS
+SELECT date, value AS total_business_inventories, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'BUSINV';
+
+CREATE VIEW inventories_to_sales_ratio AS
+SELECT date, value AS inventories_to_sales_ratio, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'ISRATIO';
+
+CREATE VIEW retailers_inventories_to_sales_ratio AS
+SELECT date, value AS retailers_inventories_to_sales_ratio, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'RETAILIRSA';
+
+CREATE VIEW manufacturers_inventories_to_sales_ratio AS
+SELECT date, value AS manufacturers_inventories_to_sales_ratio, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'MNFCTRIRSA';
+
+CREATE VIEW wholesalers_inventories_to_sales_ratio AS
+SELECT date, value AS wholesalers_inventories_to_sales_ratio, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'WHLSLRIRSA';
+
+CREATE VIEW auto_inventory_to_sales_ratio AS
+SELECT date, value AS auto_inventory_to_sales_ratio, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'AISRSA';
+
+CREATE VIEW total_business_sales AS
+SELECT date, value AS total_business_sales, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'TOTBUSSMSA';
+
+CREATE VIEW retailer_inventories AS
+SELECT date, value AS retailer_inventories, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'business_inventories' AND series_id = 'RETAILIMSA';
+
+-- GDP: Date, <series>, Quarter, Year, when_updated
+CREATE VIEW gross_domestic_product AS
+SELECT date, value AS gross_domestic_product, to_char(date, '"Q"Q-YYYY') AS quarter, EXTRACT(YEAR FROM date)::INTEGER AS year, when_updated
+FROM observations WHERE series_family = 'gdp' AND series_id = 'GDP';
+
+CREATE VIEW gross_national_product AS
+SELECT date, value AS gross_national_product, to_char(date, '"Q"Q-YYYY') AS quarter, EXTRACT(YEAR FROM date)::INTEGER AS year, when_updated
+FROM observations WHERE series_family = 'gdp' AND series_id = 'GNP';
+
+CREATE VIEW real_gross_domestic_product AS
+SELECT date, value AS real_gross_domestic_product, to_char(date, '"Q"Q-YYYY') AS quarter, EXTRACT(YEAR FROM date)::INTEGER AS year, when_updated
+FROM observations WHERE series_family = 'gdp' AND series_id = 'GDPC1';
+
+CREATE VIEW gdp_per_capita AS
+SELECT date, value AS gdp_per_capita, to_char(date, '"Q"Q-YYYY') AS quarter, EXTRACT(YEAR FROM date)::INTEGER AS year, when_updated
+FROM observations WHERE series_family = 'gdp' AND series_id = 'A939RC0Q052SBEA';
+
+CREATE VIEW real_gdp_per_capita AS
+SELECT date, value AS real_gdp_per_capita, to_char(date, '"Q"Q-YYYY') AS quarter, EXTRACT(YEAR FROM date)::INTEGER AS year, when_updated
+FROM observations WHERE series_family = 'gdp' AND series_id = 'A939RX0Q048SBEA';
+
+-- Markets: Date, <series>, Quarter, when_updated
+CREATE VIEW dji AS
+SELECT date, value AS dji, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'markets' AND series_id = 'DJIA';
+
+CREATE VIEW sp500 AS
+SELECT date, value AS sp500, to_char(date, '"Q"Q-YYYY') AS quarter, when_updated
+FROM observations WHERE series_family = 'markets' AND series_id = 'SP500';
+
+-- CPI keeps its derived inflation rate as a second series on the same dates
+CREATE VIEW cpi AS
+SELECT c.date, c.value AS cpi, to_char(c.date, '"Q"Q-YYYY') AS quarter, c.when_updated, i.value AS inflation_rate
+FROM observations c
+LEFT JOIN observations i
+    ON i.series_family = 'inflation' AND i.series_id = 'CPIAUCNS_INFLATION' AND i.date = c.date
+WHERE c.series_family = 'inflation' AND c.series_id = 'CPIAUCNS';
+
+CREATE VIEW unemployment_data AS
+SELECT date, value AS unemployment_rate, when_updated
+FROM observations WHERE series_family = 'labor' AND series_id = 'UNRATE';
+
+COMMIT;
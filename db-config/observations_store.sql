@@ -0,0 +1,54 @@
+-- Optional unified observations store.
+-- One long-format table for every single-value FRED series instead of one table per series.
+-- List-partitioned by series family so each engine's writes and most reads stay inside one partition.
+-- Run this file first, then migrate_to_observations.sql to backfill and swap the per-series tables for views.
+-- Engines write here instead of the per-series tables when OBSERVATIONS_STORE=Y is set in the .env file.
+
+-- Registry of series held in the store and the per-series table each one replaced
+CREATE TABLE IF NOT EXISTS observation_series (
+    series_id VARCHAR(50) PRIMARY KEY,
+    series_family VARCHAR(50) NOT NULL,
+    legacy_table VARCHAR(100),
+    description TEXT
+);
+
+INSERT INTO observation_series (series_id, series_family, legacy_table, description) VALUES
+('BUSINV', 'business_inventories', 'total_business_inventories', 'Total Business Inventories'),
+('ISRATIO', 'business_inventories', 'inventories_to_sales_ratio', 'Total Business: Inventories to Sales Ratio'),
+('RETAILIRSA', 'business_inventories', 'retailers_inventories_to_sales_ratio', 'Retailers: Inventories to Sales Ratio'),
+('MNFCTRIRSA', 'business_inventories', 'manufacturers_inventories_to_sales_ratio', 'Manufacturers: Inventories to Sales Ratio'),
+('WHLSLRIRSA', 'business_inventories', 'wholesalers_inventories_to_sales_ratio', 'Merchant Wholesalers: Inventories to Sales Ratio'),
+('AISRSA', 'business_inventories', 'auto_inventory_to_sales_ratio', 'Auto Inventory to Sales Ratio'),
+('TOTBUSSMSA', 'business_inventories', 'total_business_sales', 'Total Business Sales'),
+('RETAILIMSA', 'business_inventories', 'retailer_inventories', 'Retailer Inventories'),
+('GDP', 'gdp', 'gross_domestic_product', 'Gross Domestic Product (base units)'),
+('GNP', 'gdp', 'gross_national_product', 'Gross National Product (base units)'),
+('GDPC1', 'gdp', 'real_gross_domestic_product', 'Real Gross Domestic Product (base units)'),
+('A939RC0Q052SBEA', 'gdp', 'gdp_per_capita', 'GDP Per Capita'),
+('A939RX0Q048SBEA', 'gdp', 'real_gdp_per_capita', 'Real GDP Per Capita'),
+('DJIA', 'markets', 'dji', 'Dow Jones Industrial Average'),
+('SP500', 'markets', 'sp500', 'S&P 500'),
+('CPIAUCNS', 'inflation', 'cpi', 'Consumer Price Index'),
+('CPIAUCNS_INFLATION', 'inflation', 'cpi', 'Annual inflation rate derived from CPIAUCNS by the cpi engine'),
+('UNRATE', 'labor', 'unemployment_data', 'Unemployment Rate')
+ON CONFLICT (series_id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS observations (
+    series_family VARCHAR(50) NOT NULL,
+    series_id VARCHAR(50) NOT NULL,
+    date DATE NOT NULL,
+    value NUMERIC,
+    vintage VARCHAR(50), -- FRED last_updated stamp the value last changed under
+    when_updated TIMESTAMP,
+    PRIMARY KEY (series_family, series_id, date)
+) PARTITION BY LIST (series_family);
+
+CREATE TABLE IF NOT EXISTS observations_business_inventories PARTITION OF observations FOR VALUES IN ('business_inventories');
+CREATE TABLE IF NOT EXISTS observations_gdp PARTITION OF observations FOR VALUES IN ('gdp');
+CREATE TABLE IF NOT EXISTS observations_markets PARTITION OF observations FOR VALUES IN ('markets');
+CREATE TABLE IF NOT EXISTS observations_inflation PARTITION OF observations FOR VALUES IN ('inflation');
+CREATE TABLE IF NOT EXISTS observations_labor PARTITION OF observations FOR VALUES IN ('labor');
+CREATE TABLE IF NOT EXISTS observations_other PARTITION OF observations DEFAULT;
+
+-- Covering index so a series range read is an index-only scan
+CREATE INDEX IF NOT EXISTS observations_series_date_idx ON observations (series_id, date) INCLUDE (value);
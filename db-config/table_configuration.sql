@@ -29,6 +29,14 @@ alter table engines
 add column source varchar(50),
 add column target varchar(50);
 
+-- Used by runEngines.py: when the current run started, how long the last run took, and an optional
+-- per-engine timeout overriding the runner default. source can override the upstream (FRED, EIA, COINGECKO, YAHOO, POSTGRES)
+-- the runner uses for per-upstream concurrency limits.
+ALTER TABLE engines
+ADD COLUMN IF NOT EXISTS last_run_started TIMESTAMP,
+ADD COLUMN IF NOT EXISTS last_duration INTERVAL,
+ADD COLUMN IF NOT EXISTS timeout_seconds INTEGER;
+
 -- Start Application Configuration
 CREATE TABLE if not exists users (
     id SERIAL PRIMARY KEY,
@@ -79,11 +87,11 @@ CREATE TABLE IF NOT EXISTS app_release_notes (
 
 CREATE TABLE IF NOT EXISTS app_home_page (
 --Top Gainers, Top Losers, Most Active
---Setting as Varchar so integration doesn't fail over character mismatch types
+--Values are numeric with NULL when missing, app_home_page_display formats them for the front-end
 TICKER VARCHAR(50),
-LAST VARCHAR(50),
-CHG VARCHAR(50),
-CHG_PCT VARCHAR(50),
+LAST DOUBLE PRECISION,
+CHG DOUBLE PRECISION,
+CHG_PCT DOUBLE PRECISION,
 VISIBLE_YN VARCHAR(50) DEFAULT 'Y'
 );
 
@@ -91,24 +99,62 @@ ALTER TABLE app_home_page
 ADD CONSTRAINT unique_ticker UNIQUE (TICKER);
 
 ALTER TABLE app_home_page
-ADD COLUMN "1M_PRICE" VARCHAR(50),
-ADD COLUMN "1M_PCT" VARCHAR(50),
-ADD COLUMN "3M_PRICE" VARCHAR(50),
-ADD COLUMN "3M_PCT" VARCHAR(50),
-ADD COLUMN "6M_PRICE" VARCHAR(50),
-ADD COLUMN "6M_PCT" VARCHAR(50),
-ADD COLUMN "1Y_PRICE" VARCHAR(50),
-ADD COLUMN "1Y_PCT" VARCHAR(50),
-ADD COLUMN "18M_PRICE" VARCHAR(50),
-ADD COLUMN "18M_PCT" VARCHAR(50),
-ADD COLUMN "2Y_PRICE" VARCHAR(50),
-ADD COLUMN "2Y_PCT" VARCHAR(50);
+ADD COLUMN "1M_PRICE" DOUBLE PRECISION,
+ADD COLUMN "1M_PCT" DOUBLE PRECISION,
+ADD COLUMN "3M_PRICE" DOUBLE PRECISION,
+ADD COLUMN "3M_PCT" DOUBLE PRECISION,
+ADD COLUMN "6M_PRICE" DOUBLE PRECISION,
+ADD COLUMN "6M_PCT" DOUBLE PRECISION,
+ADD COLUMN "1Y_PRICE" DOUBLE PRECISION,
+ADD COLUMN "1Y_PCT" DOUBLE PRECISION,
+ADD COLUMN "18M_PRICE" DOUBLE PRECISION,
+ADD COLUMN "18M_PCT" DOUBLE PRECISION,
+ADD COLUMN "2Y_PRICE" DOUBLE PRECISION,
+ADD COLUMN "2Y_PCT" DOUBLE PRECISION;
 
 ALTER TABLE app_home_page
-ADD COLUMN "1W_PRICE" VARCHAR(50),
-ADD COLUMN "1W_PCT" VARCHAR(50),
-ADD COLUMN "YTD_PRICE" VARCHAR(50),
-ADD COLUMN "YTD_PCT" VARCHAR(50);
+ADD COLUMN "1W_PRICE" DOUBLE PRECISION,
+ADD COLUMN "1W_PCT" DOUBLE PRECISION,
+ADD COLUMN "YTD_PRICE" DOUBLE PRECISION,
+ADD COLUMN "YTD_PCT" DOUBLE PRECISION;
+
+-- Display formatting lives here instead of in the stored values: 2 decimals, '%' on percent columns and 'N/A' when missing
+CREATE OR REPLACE VIEW app_home_page_display AS
+SELECT TICKER,
+    COALESCE(LAST::text, 'N/A') AS LAST,  -- Stored unrounded before, left that way
+    COALESCE(round(CHG::numeric, 2)::text, 'N/A') AS CHG,
+    COALESCE(round(CHG_PCT::numeric, 2)::text || '%', 'N/A') AS CHG_PCT,
+    COALESCE(round("1W_PRICE"::numeric, 2)::text, 'N/A') AS "1W_PRICE",
+    COALESCE(round("1W_PCT"::numeric, 2)::text || '%', 'N/A') AS "1W_PCT",
+    COALESCE(round("1M_PRICE"::numeric, 2)::text, 'N/A') AS "1M_PRICE",
+    COALESCE(round("1M_PCT"::numeric, 2)::text || '%', 'N/A') AS "1M_PCT",
+    COALESCE(round("3M_PRICE"::numeric, 2)::text, 'N/A') AS "3M_PRICE",
+    COALESCE(round("3M_PCT"::numeric, 2)::text || '%', 'N/A') AS "3M_PCT",
+    COALESCE(round("6M_PRICE"::numeric, 2)::text, 'N/A') AS "6M_PRICE",
+    COALESCE(round("6M_PCT"::numeric, 2)::text || '%', 'N/A') AS "6M_PCT",
+    COALESCE(round("1Y_PRICE"::numeric, 2)::text, 'N/A') AS "1Y_PRICE",
+    COALESCE(round("1Y_PCT"::numeric, 2)::text || '%', 'N/A') AS "1Y_PCT",
+    COALESCE(round("18M_PRICE"::numeric, 2)::text, 'N/A') AS "18M_PRICE",
+    COALESCE(round("18M_PCT"::numeric, 2)::text || '%', 'N/A') AS "18M_PCT",
+    COALESCE(round("2Y_PRICE"::numeric, 2)::text, 'N/A') AS "2Y_PRICE",
+    COALESCE(round("2Y_PCT"::numeric, 2)::text || '%', 'N/A') AS "2Y_PCT",
+    COALESCE(round("YTD_PRICE"::numeric, 2)::text, 'N/A') AS "YTD_PRICE",
+    COALESCE(round("YTD_PCT"::numeric, 2)::text || '%', 'N/A') AS "YTD_PCT",
+    VISIBLE_YN
+FROM app_home_page;
+
+-- Top gainers / losers by horizon are an indexed ORDER BY ... LIMIT, e.g.
+--   SELECT * FROM app_home_page WHERE VISIBLE_YN = 'Y' AND "1M_PCT" IS NOT NULL ORDER BY "1M_PCT" DESC LIMIT 5;
+-- (ASC for losers, join app_home_page_display on TICKER for the formatted values)
+CREATE INDEX IF NOT EXISTS app_home_page_chg_pct_idx ON app_home_page (CHG_PCT) WHERE VISIBLE_YN = 'Y' AND CHG_PCT IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1w_pct_idx ON app_home_page ("1W_PCT") WHERE VISIBLE_YN = 'Y' AND "1W_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1m_pct_idx ON app_home_page ("1M_PCT") WHERE VISIBLE_YN = 'Y' AND "1M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_3m_pct_idx ON app_home_page ("3M_PCT") WHERE VISIBLE_YN = 'Y' AND "3M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_6m_pct_idx ON app_home_page ("6M_PCT") WHERE VISIBLE_YN = 'Y' AND "6M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_1y_pct_idx ON app_home_page ("1Y_PCT") WHERE VISIBLE_YN = 'Y' AND "1Y_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_18m_pct_idx ON app_home_page ("18M_PCT") WHERE VISIBLE_YN = 'Y' AND "18M_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_2y_pct_idx ON app_home_page ("2Y_PCT") WHERE VISIBLE_YN = 'Y' AND "2Y_PCT" IS NOT NULL;
+CREATE INDEX IF NOT EXISTS app_home_page_ytd_pct_idx ON app_home_page ("YTD_PCT") WHERE VISIBLE_YN = 'Y' AND "YTD_PCT" IS NOT NULL;
 
 
 -- End Application Configuration
@@ -151,6 +197,9 @@ values ('house_state_idx', 'OFF','Reads house prices by state from FRED API.','D
 insert into engines (engine, status, description, planned_schedule, enabled)
 values ('export_president_pcnt_fed_debt_to_gdp', 'OFF','Reads presidents from federal_debt_gdp and gets total percent by each president to export as JSON.','Monthly','NO');
 
+insert into engines (engine, status, description, planned_schedule, enabled)
+values ('parquet_snapshots', 'OFF','Exports the ingested tables to partitioned Parquet snapshots (also run by runEngines.py after FRED/EIA loads).','Daily','NO');
+
 insert into engines (engine, status, description, planned_schedule, enabled)
 values ('yfinance_main', 'OFF','Reads macro stock market details from Yahoo Finance.','NRT','NO');
 
@@ -169,13 +218,26 @@ CREATE TABLE IF NOT EXISTS WATCHLIST (
 ticker VARCHAR(20) PRIMARY KEY, 
 status	VARCHAR(25),
 last_checkin TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-open VARCHAR(35),
-close VARCHAR(35),
-percent_chg VARCHAR(35),
+open DOUBLE PRECISION,
+close DOUBLE PRECISION,
+percent_chg DOUBLE PRECISION,
 date VARCHAR(50) -- May return to adj. to date dynamically, but lot of date formats are inconsistent
     -- Can handle in Python plotting / front-end alternatively
 );
 
+CREATE OR REPLACE VIEW watchlist_display AS
+SELECT ticker,
+    status,
+    last_checkin,
+    COALESCE(round(open::numeric, 2)::text, 'N/A') AS open,
+    COALESCE(round(close::numeric, 2)::text, 'N/A') AS close,
+    COALESCE(round(percent_chg::numeric, 2)::text || '%', 'N/A') AS percent_chg,
+    date
+FROM watchlist;
+
+-- Watchlist gainers / losers: ORDER BY percent_chg DESC|ASC LIMIT n WHERE percent_chg IS NOT NULL
+CREATE INDEX IF NOT EXISTS watchlist_percent_chg_idx ON watchlist (percent_chg) WHERE percent_chg IS NOT NULL;
+
 CREATE TABLE IF NOT EXISTS unemployment_data (
             Date DATE PRIMARY KEY,
             Unemployment_Rate FLOAT,
@@ -486,6 +548,45 @@ ALTER TABLE state_house_prices
 ADD COLUMN "president_amt" NUMERIC,
 ADD COLUMN "president_percent" NUMERIC;
 
+-- Small relations the house price by state app reads instead of scanning state_house_prices.
+-- house_prices_state_idx.py refreshes them CONCURRENTLY (hence the unique indexes) in the transaction of its upsert.
+
+-- Every state's most recent quarter
+CREATE MATERIALIZED VIEW IF NOT EXISTS state_house_prices_latest AS
+SELECT state, house_price, "4_years", "4_years_percent",
+       "10_years", "10_years_percent", "25_years",
+       "25_years_percent", "all_time", "all_time_percent",
+       president, president_amt, president_percent, date
+FROM state_house_prices
+WHERE date = (SELECT MAX(date) FROM state_house_prices);
+
+CREATE UNIQUE INDEX IF NOT EXISTS state_house_prices_latest_state_idx ON state_house_prices_latest (state);
+
+-- One row per president and state: the change over the term (the same on every row of it) as of its last quarter
+CREATE MATERIALIZED VIEW IF NOT EXISTS state_house_prices_by_president AS
+SELECT DISTINCT ON (president, state)
+       president, state, house_price, president_amt, president_percent,
+       MIN(date) OVER (PARTITION BY president, state) AS first_date,
+       date AS last_date
+FROM state_house_prices
+WHERE president IS NOT NULL
+ORDER BY president, state, date DESC;
+
+CREATE UNIQUE INDEX IF NOT EXISTS state_house_prices_by_president_idx ON state_house_prices_by_president (president, state);
+
+-- Presidents and years available, plus the row count and max(when_updated) the app checks for new data.
+-- Rows without a president are one NULL row so the totals cover the whole table.
+CREATE MATERIALIZED VIEW IF NOT EXISTS state_house_prices_presidents AS
+SELECT president,
+       MIN(date) AS first_date,
+       MAX(date) AS last_date,
+       COUNT(*) AS row_count,
+       MAX(when_updated) AS max_when_updated
+FROM state_house_prices
+GROUP BY president;
+
+CREATE UNIQUE INDEX IF NOT EXISTS state_house_prices_presidents_idx ON state_house_prices_presidents (president);
+
 -- End House prices by state       
 
 -- Federal dept as % of GDP
@@ -545,6 +646,38 @@ ADD PRIMARY KEY (coin_id);
 insert into engines (engine, status, description, planned_schedule, enabled)
 values ('coingather', 'OFF','Reads all coin volume data for from CoinGecko.','Hourly','NO');
 
+-- coin_volume_data only keeps the latest run. Every run is also appended here, one range partition per day
+-- (the engine creates them as needed). coin_volume_rollup.py averages the hourly snapshots of older days into
+-- one daily row per coin and drops days past the retention window.
+CREATE TABLE IF NOT EXISTS coin_volume_history (
+    coin_id VARCHAR(255) NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    granularity VARCHAR(10) NOT NULL DEFAULT 'hourly', -- 'hourly' snapshot or 'daily' rollup
+    market_cap BIGINT,
+    total_volume BIGINT,
+    in_volume BIGINT,
+    out_volume BIGINT,
+    price_change_percentage_24h DOUBLE PRECISION,
+    samples INT NOT NULL DEFAULT 1 -- hourly snapshots averaged into the row
+) PARTITION BY RANGE (timestamp);
+
+-- Rows arrive in timestamp order, so a BRIN index stays a few pages per partition and still narrows time-range scans
+CREATE INDEX IF NOT EXISTS coin_volume_history_timestamp_brin ON coin_volume_history USING BRIN (timestamp);
+CREATE INDEX IF NOT EXISTS coin_volume_history_coin_idx ON coin_volume_history (coin_id, timestamp);
+
+-- Market totals per run, volume_trending_up compares against the previous complete one
+CREATE TABLE IF NOT EXISTS coin_volume_snapshots (
+    timestamp TIMESTAMP PRIMARY KEY,
+    coins INT,
+    complete BOOLEAN, -- False when the run stopped before the end of the market list
+    total_volume_sum BIGINT,
+    total_in_volume_sum BIGINT,
+    total_out_volume_sum BIGINT
+);
+
+insert into engines (engine, status, description, planned_schedule, enabled)
+values ('coin_volume_rollup', 'OFF','Rolls hourly coin volume history up to daily rows and drops expired days.','Daily','NO');
+
 ------- End CoinGecko
 
 
@@ -559,6 +692,16 @@ CREATE TABLE us_oil_production_monthly_mil_bar_pd (
 );
 
 
+-- Every EIA series the energy engine loads (EIA_SERIES in us_oil_by_month.py), one row per series and period
+CREATE TABLE IF NOT EXISTS eia_observations (
+    series_id VARCHAR(50) NOT NULL,
+    date DATE NOT NULL,
+    value NUMERIC,
+    units VARCHAR(50),
+    when_updated TIMESTAMP,
+    PRIMARY KEY (series_id, date)
+);
+
 insert into engines (engine, status, description, planned_schedule, enabled)
 values ('us_oil_production_by_month', 'OFF','Reads US Oil production by month from EIA.','Weekly','NO');
 
@@ -568,4 +711,119 @@ values ('us_oil_production_by_month', 'OFF','Reads US Oil production by month fr
 --------------------------------
 
 insert into engines (engine, status, description, planned_schedule, enabled)
-values ('watchlist', 'OFF','Reads all watchlist data for predetermined assets from YFINANCE.','NRT','NO');
\ No newline at end of file
+values ('watchlist', 'OFF','Reads all watchlist data for predetermined assets from YFINANCE.','NRT','NO');
+
+--------------------------------
+
+-- FRED incremental loads: last ingested observation and FRED last_updated vintage per series.
+-- Engines fetch from (last_observation_date - revision window) unless run with --full-refresh.
+CREATE TABLE IF NOT EXISTS fred_series_watermarks (
+    series_id VARCHAR(50) PRIMARY KEY,
+    last_observation_date DATE,
+    last_vintage VARCHAR(50),
+    when_updated TIMESTAMP
+);
+
+--------------------------------
+
+-- Engine run history: one row per run, written by common/engine_runs.py (and by runEngines.py for runs it had to kill).
+-- Stage columns are NULL when the engine has no such stage, bytes_downloaded / peak_rss_mb when the client can't report them.
+-- initializeEngine.py summarizes p50/p95 durations per engine from this table.
+CREATE TABLE IF NOT EXISTS engine_runs (
+    id BIGSERIAL PRIMARY KEY,
+    engine VARCHAR(80) NOT NULL,
+    run_started TIMESTAMP NOT NULL,
+    run_finished TIMESTAMP,
+    status VARCHAR(25),
+    duration_seconds DOUBLE PRECISION,
+    fetch_seconds DOUBLE PRECISION,
+    transform_seconds DOUBLE PRECISION,
+    load_seconds DOUBLE PRECISION,
+    rows_fetched INTEGER,
+    rows_upserted INTEGER,
+    bytes_downloaded BIGINT,
+    peak_rss_mb DOUBLE PRECISION,
+    error_message TEXT
+);
+
+CREATE INDEX IF NOT EXISTS engine_runs_engine_started_idx ON engine_runs (engine, run_started DESC);
+
+--------------------------------
+
+-- Live engine lag computed in one pass, used by initializeEngine.py (including --watch) to flag overdue engines.
+-- expected_interval mirrors SCHEDULE_INTERVALS in runEngines.py; NRT and Infinite engines are expected to check in continuously.
+CREATE OR REPLACE VIEW engine_health AS
+SELECT
+    engine,
+    status,
+    enabled,
+    planned_schedule,
+    last_checkin,
+    LOCALTIMESTAMP - last_checkin AS time_since_last_run,
+    expected_interval,
+    (LOCALTIMESTAMP - last_checkin) - expected_interval AS overdue_by
+FROM (
+    SELECT e.*,
+        CASE e.planned_schedule
+            WHEN 'NRT' THEN INTERVAL '15 minutes'
+            WHEN 'Infinite' THEN INTERVAL '15 minutes'
+            WHEN 'Hourly' THEN INTERVAL '1 hour'
+            WHEN 'Daily' THEN INTERVAL '1 day'
+            WHEN 'Weekly' THEN INTERVAL '7 days'
+            WHEN 'Monthly' THEN INTERVAL '30 days'
+        END AS expected_interval
+    FROM engines e
+) engines_with_interval;
+
+--------------------------------
+
+-- ARIMA forecasts, written by common/forecasts.py (the predictions/ scripts).
+-- arima_models keeps the fitted parameters per (series, window, order, last observation date): a run on unchanged
+-- data reuses them, a run with one new month starts the fit from the previous month's. data_hash tells revised data apart.
+CREATE TABLE IF NOT EXISTS arima_models (
+    series VARCHAR(100) NOT NULL,
+    window_name VARCHAR(25) NOT NULL,
+    arima_order VARCHAR(25) NOT NULL,
+    last_obs_date DATE NOT NULL,
+    nobs INTEGER,
+    data_hash VARCHAR(40),
+    param_names TEXT[],
+    params DOUBLE PRECISION[],
+    aic DOUBLE PRECISION,
+    fit_seconds DOUBLE PRECISION,
+    warm_started BOOLEAN,
+    when_updated TIMESTAMP,
+    PRIMARY KEY (series, window_name, arima_order, last_obs_date)
+);
+
+-- Forecast outputs of the models above, one row per forecast month, what dashboards read instead of refitting
+CREATE TABLE IF NOT EXISTS forecasts (
+    series VARCHAR(100) NOT NULL,
+    window_name VARCHAR(25) NOT NULL,
+    arima_order VARCHAR(25) NOT NULL,
+    last_obs_date DATE NOT NULL,
+    date DATE NOT NULL,
+    step INTEGER,
+    forecast DOUBLE PRECISION,
+    lower_95 DOUBLE PRECISION,
+    upper_95 DOUBLE PRECISION,
+    when_updated TIMESTAMP,
+    PRIMARY KEY (series, window_name, arima_order, last_obs_date, date)
+);
+
+-- Rolling-origin backtest results of ARIMA configs, written by predictions/arima_backtest.py.
+-- One row per (series, window, order, horizon), forecast_series() picks the lowest RMSE of the latest backtest.
+CREATE TABLE IF NOT EXISTS arima_leaderboard (
+    series VARCHAR(100) NOT NULL,
+    window_name VARCHAR(25) NOT NULL,
+    arima_order VARCHAR(25) NOT NULL,
+    horizon INTEGER NOT NULL,
+    mae DOUBLE PRECISION,
+    rmse DOUBLE PRECISION,
+    folds INTEGER,
+    failed_folds INTEGER,
+    fit_seconds DOUBLE PRECISION,
+    last_obs_date DATE,
+    when_updated TIMESTAMP,
+    PRIMARY KEY (series, window_name, arima_order, horizon)
+);
@@ -0,0 +1,84 @@
+import argparse
+import os
+from dotenv import load_dotenv
+from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.engine_runs import EngineRun
+from common.snapshots import (SNAPSHOT_TABLES, DEFAULT_SNAPSHOT_DIR, load_manifest, save_manifest, table_version,
+                              is_current, export_table, record_export)
+from common.data_source import get_connection, release_connection
+
+load_dotenv()
+
+engine_status = 'In Progress'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export the ingested tables to Parquet snapshots.')
+    parser.add_argument('--table', action='append', choices=sorted(SNAPSHOT_TABLES),
+                        help='Only export this table (repeatable).')
+    parser.add_argument('--force', action='store_true', help='Export tables even if their snapshot is current.')
+    parser.add_argument('--snapshot-dir', default=DEFAULT_SNAPSHOT_DIR,
+                        help='Directory the snapshots are written to (PARQUET_SNAPSHOT_DIR).')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        print("Successfully connected to the database.")
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        exit(1)
+
+    current_timestamp = datetime.now()
+    run = EngineRun('parquet_snapshots', conn)
+    engine_status = 'Success'
+    manifest = load_manifest(args.snapshot_dir)
+
+    for table in args.table or SNAPSHOT_TABLES:
+        # Each table on its own, a failing one leaves the others' snapshots current
+        try:
+            with run.stage('fetch'):
+                version = table_version(cur, table)
+            conn.rollback()
+            if not args.force and is_current(manifest, table, version):
+                print(f"{table} unchanged since its last snapshot ({version[0]} rows), skipping.")
+                continue
+            with run.stage('load'):
+                rows = export_table(conn, table, args.snapshot_dir)
+            conn.rollback()
+            run.rows_fetched += rows
+            run.rows_upserted += rows
+            record_export(manifest, table, version)
+            save_manifest(manifest, args.snapshot_dir)
+            print(f"Exported {rows} rows of {table} to {os.path.join(args.snapshot_dir, table)}.")
+        except Exception as e:
+            print(f"Error exporting {table}: {e}")
+            conn.rollback()
+            engine_status = 'Error'
+
+    try:
+        run.record(cur, engine_status)
+        update_engine_query = """
+            UPDATE engines
+            SET status = %s,
+                last_checkin = %s
+            WHERE engine = %s
+        """
+        cur.execute(update_engine_query, (engine_status, current_timestamp, 'parquet_snapshots'))
+        conn.commit()
+    except Exception as e:
+        print(f"Error updating engine status: {e}")
+        engine_status = 'Error'
+    finally:
+        cur.close()
+        release_connection(conn)
+
+    if engine_status == 'Error':
+        exit(1)
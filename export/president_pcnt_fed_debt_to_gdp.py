@@ -1,29 +1,20 @@
-import psycopg2
 import json
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import datetime
 from decimal import Decimal
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.data_source import get_connection, release_connection
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
+load_dotenv()
 
 json_folder = os.getenv("JSON_FOLDER")
 
 current_time = datetime.now()
 
-conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-)
+conn = get_connection()
 
 query = """
 SELECT DISTINCT president, round(president_total_percent_change,3) as president_total_percent_change
@@ -62,4 +53,4 @@ with conn.cursor() as cursor:
     cursor.execute(update_engine, (current_time, 'Success', 'export_president_pcnt_fed_debt_to_gdp'))
 
 conn.commit()
-conn.close()
+release_connection(conn)
@@ -1,40 +1,22 @@
 import psycopg2
 from psycopg2 import sql
 import os
+import time
+import argparse
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 
+from common.data_source import get_connection, release_connection, close_pool
+
 # Set up logging
-logging.basicConfig(filename='initEngine.log', level=logging.ERROR,
+logging.basicConfig(filename='initEngine.log', level=logging.WARNING,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
-    print("Successfully connected to the database.")
-except Exception as e:
-    error_message = f"Error connecting to the database: {e}"
-    print(error_message)
-    logging.error(error_message)
-    exit()
-
-# Get the current timestamp
-current_time = datetime.now()
+# How far back the engine_runs duration summary looks
+summary_days = int(os.getenv("ENGINE_RUNS_SUMMARY_DAYS", 30))
 
 # Set the init to success / last checkin right away so no interval is shown
 # If interval exists for init, we have a problem
@@ -45,36 +27,156 @@ update_init = sql.SQL("""
     WHERE engine = %s
 """)
 
-cur.execute(update_init, (current_time, 'Success', 'initEngine'))
-if cur.rowcount == 0:
-    logging.error("Failed to update initEngine status: No rows affected")
-else:
-    logging.info(f"Successfully updated initEngine status. Rows affected: {cur.rowcount}")
+# Time since last run for every engine in one statement, NULL when an engine never checked in
+update_time_since_last_run = sql.SQL("""
+    UPDATE engines
+    SET time_since_last_run = %s - last_checkin
+    WHERE time_since_last_run IS DISTINCT FROM %s - last_checkin
+""")
 
-# Retrieve all rows from the engines table
-select_query = sql.SQL("SELECT engine, last_checkin FROM engines")
-cur.execute(select_query)
-rows = cur.fetchall()
+# Enabled engines that missed their planned_schedule by more than the grace period (engine_health view)
+overdue_query = sql.SQL("""
+    SELECT engine, planned_schedule, status, last_checkin, overdue_by
+    FROM engine_health
+    WHERE enabled = 'YES'
+      AND engine <> 'initEngine'
+      AND (last_checkin IS NULL OR overdue_by > %s)
+    ORDER BY overdue_by DESC NULLS FIRST
+""")
 
-# Calculate time since last run and update the table
-update_query = sql.SQL("""
-    UPDATE engines
-    SET time_since_last_run = %s
-    WHERE engine = %s
+# Summarize p50/p95 run and stage durations per engine from the run history (successful runs only, failures are counted)
+summary_query = sql.SQL("""
+    SELECT engine,
+        COUNT(*) AS runs,
+        COUNT(*) FILTER (WHERE status <> 'Success') AS failed_runs,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_seconds) FILTER (WHERE status = 'Success') AS p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_seconds) FILTER (WHERE status = 'Success') AS p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY fetch_seconds) FILTER (WHERE status = 'Success') AS fetch_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY fetch_seconds) FILTER (WHERE status = 'Success') AS fetch_p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY transform_seconds) FILTER (WHERE status = 'Success') AS transform_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY transform_seconds) FILTER (WHERE status = 'Success') AS transform_p95,
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY load_seconds) FILTER (WHERE status = 'Success') AS load_p50,
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY load_seconds) FILTER (WHERE status = 'Success') AS load_p95,
+        MAX(peak_rss_mb) AS max_rss_mb
+    FROM engine_runs
+    WHERE run_started >= %s
+    GROUP BY engine
+    ORDER BY engine
 """)
 
-for row in rows:
-    engine, last_checkin = row
-    # Calculate the time difference
-    if last_checkin:
-        time_since_last_run = current_time - last_checkin
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Check in the monitor and refresh engine lag, optionally in a loop.')
+    parser.add_argument('--watch', action='store_true', help='Keep polling on one connection and flag overdue engines.')
+    parser.add_argument('--interval', type=int, default=int(os.getenv("ENGINE_WATCH_INTERVAL", 60)),
+                        help='Seconds between polls in watch mode.')
+    parser.add_argument('--grace-minutes', type=int, default=int(os.getenv("ENGINE_OVERDUE_GRACE_MINUTES", 15)),
+                        help='How far past its planned_schedule an engine may be before it is flagged.')
+    return parser.parse_args()
+
+
+def connect():
+    conn = get_connection()
+    print("Successfully connected to the database.")
+    return conn
+
+
+def check_in(cur, conn, current_time):
+    cur.execute(update_init, (current_time, 'Success', 'initEngine'))
+    if cur.rowcount == 0:
+        logging.error("Failed to update initEngine status: No rows affected")
     else:
-        time_since_last_run = None
-    
-    # Update the time_since_last_run column
-    cur.execute(update_query, (time_since_last_run, engine))
-
-# Commit the changes and close the connection
-conn.commit()
-cur.close()
-conn.close()
\ No newline at end of file
+        logging.info(f"Successfully updated initEngine status. Rows affected: {cur.rowcount}")
+
+    cur.execute(update_time_since_last_run, (current_time, current_time))
+    conn.commit()
+
+
+def get_overdue_engines(cur, grace):
+    cur.execute(overdue_query, (grace,))
+    return cur.fetchall()
+
+
+def report_overdue(overdue_engines, previously_overdue=None):
+    """Prints every overdue engine and logs the ones that were not overdue on the previous poll."""
+    for engine, planned_schedule, status, last_checkin, overdue_by in overdue_engines:
+        lag = f"overdue by {overdue_by}" if last_checkin else "never checked in"
+        print(f"OVERDUE: {engine} ({planned_schedule}, status {status}) {lag}.")
+        if previously_overdue is None or engine not in previously_overdue:
+            logging.warning(f"Engine {engine} ({planned_schedule}) is {lag}, last status {status}.")
+    return {row[0] for row in overdue_engines}
+
+
+def format_seconds(value):
+    return f"{value:.1f}" if value is not None else '-'
+
+
+def summarize_engine_runs(cur, conn, current_time):
+    try:
+        cur.execute(summary_query, (current_time - timedelta(days=summary_days),))
+        summary_rows = cur.fetchall()
+        print(f"Engine run durations over the last {summary_days} days (seconds, p50/p95):")
+        print(f"{'engine':<40}{'runs':>6}{'failed':>8}{'total':>16}{'fetch':>16}{'transform':>16}{'load':>16}{'max RSS MB':>12}")
+        for engine, runs, failed_runs, *percentiles, max_rss_mb in summary_rows:
+            pairs = [f"{format_seconds(p50)}/{format_seconds(p95)}" for p50, p95 in zip(percentiles[::2], percentiles[1::2])]
+            print(f"{engine:<40}{runs:>6}{failed_runs:>8}" + ''.join(f"{pair:>16}" for pair in pairs) + f"{format_seconds(max_rss_mb):>12}")
+    except Exception as e:
+        # The summary is informational, the check-in is already committed
+        conn.rollback()
+        error_message = f"Error summarizing engine runs: {e}"
+        print(error_message)
+        logging.error(error_message)
+
+
+def watch(conn, interval, grace, previously_overdue):
+    """Polls on the one connection, reconnecting only if it drops."""
+    print(f"Watching engines every {interval}s, flagging engines more than {grace} past their planned_schedule.")
+    while True:
+        time.sleep(interval)
+        try:
+            if conn is None or conn.closed:
+                conn = connect()
+            cur = conn.cursor()
+            check_in(cur, conn, datetime.now())
+            previously_overdue = report_overdue(get_overdue_engines(cur, grace), previously_overdue)
+            conn.commit()
+            cur.close()
+        except psycopg2.Error as e:
+            error_message = f"Error polling engines, reconnecting on the next poll: {e}"
+            print(error_message)
+            logging.error(error_message)
+            if conn is not None:
+                release_connection(conn, close=True)
+            conn = None
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    grace = timedelta(minutes=args.grace_minutes)
+
+    try:
+        conn = connect()
+        cur = conn.cursor()
+    except Exception as e:
+        error_message = f"Error connecting to the database: {e}"
+        print(error_message)
+        logging.error(error_message)
+        exit(1)
+
+    # Get the current timestamp
+    current_time = datetime.now()
+
+    check_in(cur, conn, current_time)
+    summarize_engine_runs(cur, conn, current_time)
+    overdue_engines = report_overdue(get_overdue_engines(cur, grace))
+    conn.commit()
+    cur.close()
+
+    if args.watch:
+        try:
+            watch(conn, args.interval, grace, overdue_engines)
+        except KeyboardInterrupt:
+            print("Stopped watching engines.")
+
+    # Close the connection (watch mode may have replaced it, so close whatever the pool holds)
+    close_pool()
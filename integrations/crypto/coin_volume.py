@@ -1,104 +1,128 @@
-import requests
+import numpy as np
 import pandas as pd
-import psycopg2
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.engine_runs import EngineRun
+from common.bulk_loader import bulk_upsert
+from common.coin_history import append_history
+from common.coingecko_fetcher import CoinGeckoFetcher, COINGECKO_BASE_URL, COINGECKO_REQUESTS_PER_MINUTE
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
+coingecko_api_key = os.getenv("COINGECKO_API_KEY")
+coingecko_base_url = os.getenv("COINGECKO_BASE_URL", COINGECKO_BASE_URL)
+# Pages requested at once and the shared request rate, the demo plan allows 30 requests a minute
+concurrency = int(os.getenv("COINGECKO_CONCURRENCY", 4))
+requests_per_minute = int(os.getenv("COINGECKO_REQUESTS_PER_MINUTE", COINGECKO_REQUESTS_PER_MINUTE))
+# Seconds the fetch may take before the run writes what it has, under the runner's 900s timeout
+time_budget = float(os.getenv("COINGECKO_TIME_BUDGET", 600))
+
+# Integer columns of coin_volume_data
+BIGINT_COLUMNS = ['market_cap', 'total_volume', 'in_volume', 'out_volume', 'volume_average',
+                  'total_volume_sum', 'total_in_volume_sum', 'total_out_volume_sum']
+
+# Market totals of the latest complete run before this one, volume_trending_up compares against it
+previous_snapshot_query = """
+    SELECT total_volume_sum
+    FROM coin_volume_snapshots
+    WHERE complete AND timestamp < %s
+    ORDER BY timestamp DESC
+    LIMIT 1
+"""
+
+insert_snapshot_query = """
+    INSERT INTO coin_volume_snapshots (timestamp, coins, complete, total_volume_sum, total_in_volume_sum, total_out_volume_sum)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
 
 engine_status = 'In Progress'
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
+    conn = get_connection()
     cur = conn.cursor()
     print("Successfully connected to the database.")
 except Exception as e:
     print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 current_timestamp = datetime.now()
+run = EngineRun('coingather', conn)
+error_message = None
 
 try:
-    url = "https://api.coingecko.com/api/v3/coins/markets"
-    params = {
-        "vs_currency": "usd",
-        "order": "market_cap_desc",
-        "per_page": 250,
-        "page": 1,
-        "sparkline": "false"
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
-
-    df = pd.DataFrame(data)
-
-    volume_average = df['total_volume'].mean()
-    total_volume_sum = df['total_volume'].sum()
-    volume_trending_up = bool(df['total_volume'].pct_change().apply(lambda x: True if x > 0 else False).iloc[-1])
-    total_in_volume_sum = df.apply(lambda x: x['total_volume'] if x['price_change_percentage_24h'] > 0 else 0, axis=1).sum()
-    total_out_volume_sum = df.apply(lambda x: x['total_volume'] if x['price_change_percentage_24h'] < 0 else 0, axis=1).sum()
-
-    insert_query = """
-        INSERT INTO coin_volume_data 
-(coin_id, name, symbol, market_cap, total_volume, in_volume, out_volume, volume_average, total_volume_sum, total_in_volume_sum, total_out_volume_sum, volume_trending_up, timestamp)
-VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-ON CONFLICT (coin_id) DO UPDATE
-SET name = EXCLUDED.name,
-    symbol = EXCLUDED.symbol,
-    market_cap = EXCLUDED.market_cap,
-    total_volume = EXCLUDED.total_volume,
-    in_volume = EXCLUDED.in_volume,
-    out_volume = EXCLUDED.out_volume,
-    volume_average = EXCLUDED.volume_average,
-    total_volume_sum = EXCLUDED.total_volume_sum,
-    total_in_volume_sum = EXCLUDED.total_in_volume_sum,
-    total_out_volume_sum = EXCLUDED.total_out_volume_sum,
-    volume_trending_up = EXCLUDED.volume_trending_up,
-    timestamp = EXCLUDED.timestamp;
-
-    """
-
-    for _, row in df.iterrows():
-        cur.execute(insert_query, (
-            row['id'],
-            row['name'],
-            row['symbol'],
-            row['market_cap'],
-            row['total_volume'],
-            row['total_volume'] if row['price_change_percentage_24h'] > 0 else 0,
-            row['total_volume'] if row['price_change_percentage_24h'] < 0 else 0,
-            volume_average,
-            total_volume_sum,
-            total_in_volume_sum,
-            total_out_volume_sum,
-            volume_trending_up,  # Ensure this is a standard Python boolean
-            current_timestamp
-        ))
+    fetcher = CoinGeckoFetcher(api_key=coingecko_api_key, base_url=coingecko_base_url, max_workers=concurrency,
+                               requests_per_minute=requests_per_minute)
+    with run.stage('fetch'):
+        # Every page of the market list, market cap order
+        df, complete = fetcher.get_all_markets(time_budget=time_budget)
+        run.add_bytes(fetcher.bytes_downloaded)
+        run.rows_fetched += len(df)
+    if df.empty:
+        raise ValueError("CoinGecko returned no coins")
+    print(f"Fetched {len(df)} coins from CoinGecko{'' if complete else ' (incomplete, time budget or page errors)'}.")
+
+    with run.stage('transform'):
+        volume = df['total_volume'].fillna(0).to_numpy(dtype=float)
+        change = df['price_change_percentage_24h'].to_numpy(dtype=float)
+        in_volume = np.where(change > 0, volume, 0)
+        out_volume = np.where(change < 0, volume, 0)
+
+        # Trending up means more market volume than the previous complete run, unknown (NULL) for a partial
+        # list or the very first run
+        cur.execute(previous_snapshot_query, (current_timestamp,))
+        previous = cur.fetchone()
+        if complete and previous is not None and previous[0] is not None:
+            volume_trending_up = str(bool(volume.sum() > previous[0])).lower()
+        else:
+            volume_trending_up = None
+
+        coins = pd.DataFrame({
+            'coin_id': df['id'],
+            'name': df['name'],
+            'symbol': df['symbol'],
+            'market_cap': df['market_cap'],
+            'total_volume': df['total_volume'],
+            'in_volume': in_volume,
+            'out_volume': out_volume,
+            'volume_average': df['total_volume'].mean(),
+            'total_volume_sum': volume.sum(),
+            'total_in_volume_sum': in_volume.sum(),
+            'total_out_volume_sum': out_volume.sum(),
+            # volume_trending_up is a VARCHAR column
+            'volume_trending_up': volume_trending_up,
+            'timestamp': current_timestamp,
+        })
+        coins[BIGINT_COLUMNS] = coins[BIGINT_COLUMNS].apply(pd.to_numeric, errors='coerce').round().astype('Int64')
+
+    with run.stage('load'):
+        run.rows_upserted += bulk_upsert(cur, coins, 'coin_volume_data', ['coin_id'])
+        # coin_volume_data only holds the latest run, the history keeps every snapshot
+        run.rows_upserted += append_history(cur, coins.assign(price_change_percentage_24h=change), current_timestamp)
+        totals = coins[['total_volume_sum', 'total_in_volume_sum', 'total_out_volume_sum']].iloc[0]
+        cur.execute(insert_snapshot_query, (current_timestamp, len(coins), complete, *(int(total) for total in totals)))
 
     conn.commit()
     print("Successfully inserted data into the coin_volume_data table.")
-    engine_status = 'Success'
+    engine_status = 'Success' if complete else 'Error'
+    if not complete:
+        error_message = f"Incomplete market list, {len(df)} coins written"
 
 except Exception as e:
     print(f"Error fetching or processing CoinGecko data: {e}")
+    conn.rollback()
     engine_status = 'Error'
+    if not run.errors:
+        error_message = str(e)
 
 # Update the status of the 'crypto' engine in the engines table
 try:
+    run.record(cur, engine_status, error_message)
     update_engine_query = """
         UPDATE engines
         SET status = %s,
@@ -114,4 +138,4 @@ except Exception as e:
 
 finally:
     cur.close()
-    conn.close()
+    release_connection(conn)
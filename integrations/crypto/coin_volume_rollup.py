@@ -0,0 +1,124 @@
+from psycopg2 import sql
+from datetime import datetime, timedelta
+import argparse
+import os
+from dotenv import load_dotenv
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.engine_runs import EngineRun
+from common.coin_history import HISTORY_COLUMNS, day_partitions
+from common.data_source import get_connection, release_connection
+
+load_dotenv()
+
+# Columns averaged into the daily row, weighted by how many snapshots each row already stands for
+AVERAGED_COLUMNS = ['market_cap', 'total_volume', 'in_volume', 'out_volume', 'price_change_percentage_24h']
+BIGINT_COLUMNS = {'market_cap', 'total_volume', 'in_volume', 'out_volume'}
+
+engine_status = 'In Progress'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Roll coin_volume_history up to daily rows and drop expired days.')
+    parser.add_argument('--hourly-days', type=int, default=int(os.getenv("COIN_HISTORY_HOURLY_DAYS", 30)),
+                        help='Days of hourly snapshots to keep before rolling them up to one row per coin and day.')
+    parser.add_argument('--retention-days', type=int, default=int(os.getenv("COIN_HISTORY_RETENTION_DAYS", 730)),
+                        help='Days of history to keep at all, 0 keeps everything.')
+    return parser.parse_args()
+
+
+def averaged(column):
+    average = sql.SQL("sum({col} * samples) / NULLIF(sum(samples) FILTER (WHERE {col} IS NOT NULL), 0)").format(
+        col=sql.Identifier(column))
+    if column in BIGINT_COLUMNS:
+        return sql.SQL("round({})::bigint").format(average)
+    return average
+
+
+def roll_up_day(cur, day, partition):
+    """Replaces the rows of one day partition by one daily row per coin. Returns (rows before, rows after), None if already rolled up."""
+    partition = sql.Identifier(partition)
+    cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE granularity = 'hourly')").format(partition))
+    if not cur.fetchone()[0]:
+        return None
+
+    cur.execute(sql.SQL("""
+        CREATE TEMP TABLE coin_volume_rollup ON COMMIT DROP AS
+        SELECT coin_id, %s::timestamp AS timestamp, 'daily'::varchar AS granularity, {averages}, sum(samples)::int AS samples
+        FROM {partition}
+        GROUP BY coin_id
+    """).format(
+        averages=sql.SQL(', ').join(sql.SQL("{} AS {}").format(averaged(col), sql.Identifier(col)) for col in AVERAGED_COLUMNS),
+        partition=partition
+    ), (day,))
+    cur.execute(sql.SQL("SELECT count(*) FROM {}").format(partition))
+    rows_before = cur.fetchone()[0]
+
+    # TRUNCATE instead of DELETE so the space of the hourly rows is given back right away
+    column_list = sql.SQL(', ').join(sql.Identifier(col) for col in HISTORY_COLUMNS)
+    cur.execute(sql.SQL("TRUNCATE {}").format(partition))
+    cur.execute(sql.SQL("INSERT INTO {} ({columns}) SELECT {columns} FROM coin_volume_rollup").format(
+        partition, columns=column_list))
+    return rows_before, cur.rowcount
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        print("Successfully connected to the database.")
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        exit(1)
+
+    current_timestamp = datetime.now()
+    today = datetime(current_timestamp.year, current_timestamp.month, current_timestamp.day)
+    run = EngineRun('coin_volume_rollup', conn)
+    engine_status = 'Success'
+
+    partitions = day_partitions(cur)
+    rollup_before = today - timedelta(days=args.hourly_days)
+    drop_before = today - timedelta(days=args.retention_days) if args.retention_days > 0 else None
+
+    for day, partition in partitions:
+        # Each day is its own transaction, a failure leaves the other days rolled up
+        try:
+            if drop_before is not None and day < drop_before:
+                with run.stage('load'):
+                    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+                print(f"Dropped {partition}, older than {args.retention_days} days.")
+            elif day < rollup_before:
+                with run.stage('transform'):
+                    result = roll_up_day(cur, day, partition)
+                if result is not None:
+                    run.rows_fetched += result[0]
+                    run.rows_upserted += result[1]
+                    print(f"Rolled {partition} up from {result[0]} hourly rows to {result[1]} daily rows.")
+            conn.commit()
+        except Exception as e:
+            print(f"Error rolling up {partition}: {e}")
+            conn.rollback()
+            engine_status = 'Error'
+
+    try:
+        run.record(cur, engine_status)
+        update_engine_query = """
+            UPDATE engines
+            SET status = %s,
+                last_checkin = %s
+            WHERE engine = %s
+        """
+        cur.execute(update_engine_query, (engine_status, current_timestamp, 'coin_volume_rollup'))
+        conn.commit()
+    except Exception as e:
+        print(f"Error updating engine status: {e}")
+        engine_status = 'Error'
+    finally:
+        cur.close()
+        release_connection(conn)
+
+    if engine_status == 'Error':
+        exit(1)
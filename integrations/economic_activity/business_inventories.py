@@ -8,23 +8,26 @@
 # Retailer Inventories (RETAILIMSA)
 
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.observations import observations_store_enabled, upsert_observations
+from common.fred_fetcher import FredFetcher
+from common.fred_incremental import fetch_many_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 # Series IDs
 series_dict = {
@@ -38,60 +41,66 @@ series_dict = {
     'RETAILIMSA': 'retailer_inventories'
 }
 
+# Annual seasonal adjustment reviews revise a few years of history
+INVENTORIES_REVISION_WINDOW = pd.DateOffset(years=3)
+
 # Initialize Fred API client
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
+    conn = get_connection()
     cur = conn.cursor()
 except Exception as e:
     print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 current_timestamp = datetime.now()
+run = EngineRun('business_inventories', conn)
+
+# Pull every series concurrently up front, the transforms and loads below stay sequential on the one connection
+with run.stage('fetch'):
+    fetched_series = fetch_many_incremental(fred, cur, list(series_dict), INVENTORIES_REVISION_WINDOW, full_refresh)
+    run.rows_fetched += sum(len(data) for data, _, _ in fetched_series.values())
+run.add_bytes(fred.bytes_downloaded)
 
 for series_id, table_name in series_dict.items():
     try:
-        data = fred.get_series(series_id)
+        if series_id not in fetched_series:
+            raise ValueError("series could not be fetched from FRED API")
+        data, vintage, _ = fetched_series[series_id]
         print(f"Successfully fetched data for series {series_id} from FRED API.")
         
-        df = pd.DataFrame(data, columns=[table_name])
-        df.index.name = 'Date'
-        df.reset_index(inplace=True)
+        with run.stage('transform'):
+            df = pd.DataFrame(data, columns=[table_name])
+            df.index.name = 'Date'
+            df.reset_index(inplace=True)
         
-        df['Quarter'] = df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
-
-        insert_query = sql.SQL(f"""
-            INSERT INTO {table_name} (Date, {table_name}, Quarter, when_updated)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (Date) DO UPDATE 
-            SET {table_name} = EXCLUDED.{table_name},
-                Quarter = EXCLUDED.Quarter,
-                when_updated = EXCLUDED.when_updated
-        """)
-        for index, row in df.iterrows():
-            cur.execute(insert_query, (row['Date'], row[table_name], row['Quarter'], current_timestamp))
+            df['Quarter'] = df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
+
+        df['when_updated'] = current_timestamp
+        with run.stage('load'):
+            if observations_store_enabled():
+                run.rows_upserted += upsert_observations(cur, series_id, df, table_name, vintage)
+            else:
+                run.rows_upserted += bulk_upsert(cur, df[['Date', table_name, 'Quarter', 'when_updated']], table_name, ['Date'], only_changed=True)
+            update_watermark(cur, series_id, data, vintage)
         
         print(f"Successfully inserted data into {table_name} table.")
     except Exception as e:
         print(f"Error processing series {series_id}: {e}")
         engine_status = 'Error'
         continue
-    
+
+run.record(cur, engine_status)
+
 update_engine_query = sql.SQL("""
     UPDATE engines
     SET status = %s,
@@ -103,4 +112,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'business_in
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
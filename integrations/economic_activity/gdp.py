@@ -10,23 +10,26 @@
 
 
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.observations import observations_store_enabled, upsert_observations
+from common.fred_fetcher import FredFetcher
+from common.fred_incremental import fetch_many_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 series_dict = {
     'GDP': 'gross_domestic_product',
@@ -36,62 +39,65 @@ series_dict = {
     'A939RX0Q048SBEA': 'real_gdp_per_capita'
 }
 
+# BEA annual updates revise several years of NIPA estimates
+GDP_REVISION_WINDOW = pd.DateOffset(years=5)
+
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
+    conn = get_connection()
     cur = conn.cursor()
 except Exception as e:
     print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 current_timestamp = datetime.now()
+run = EngineRun('gdp', conn)
+
+# Pull every series concurrently up front, the transforms and loads below stay sequential on the one connection
+with run.stage('fetch'):
+    fetched_series = fetch_many_incremental(fred, cur, list(series_dict), GDP_REVISION_WINDOW, full_refresh)
+    run.rows_fetched += sum(len(data) for data, _, _ in fetched_series.values())
+run.add_bytes(fred.bytes_downloaded)
 
 for series_id, table_name in series_dict.items():
     try:
-        data = fred.get_series(series_id)
+        if series_id not in fetched_series:
+            raise ValueError("series could not be fetched from FRED API")
+        data, vintage, _ = fetched_series[series_id]
         print(f"Successfully fetched data for series {series_id} from FRED API.")
 
-        df = pd.DataFrame(data, columns=[table_name])
-        df.index.name = 'Date'
-        df.reset_index(inplace=True)
+        with run.stage('transform'):
+            df = pd.DataFrame(data, columns=[table_name])
+            df.index.name = 'Date'
+            df.reset_index(inplace=True)
         
 
-        if table_name in ['gross_domestic_product', 'gross_national_product', 'real_gross_domestic_product']:
-            df[table_name] = df[table_name] * 1e6  # Convert from billions to base unit
+            if table_name in ['gross_domestic_product', 'gross_national_product', 'real_gross_domestic_product']:
+                df[table_name] = df[table_name] * 1e6  # Convert from billions to base unit
  
-        df.dropna(inplace=True)
+            df.dropna(inplace=True)
         
    
-        df['Quarter'] = df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
-        df['Year'] = df['Date'].dt.year
+            df['Quarter'] = df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
+            df['Year'] = df['Date'].dt.year
 
      
-        insert_query = sql.SQL(f"""
-            INSERT INTO {table_name} (Date, {table_name}, Quarter, Year, when_updated)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (Date) DO UPDATE 
-            SET {table_name} = EXCLUDED.{table_name},
-                Quarter = EXCLUDED.Quarter,
-                Year = EXCLUDED.Year,
-                when_updated = EXCLUDED.when_updated
-        """)
-        for index, row in df.iterrows():
-            cur.execute(insert_query, (row['Date'], row[table_name], row['Quarter'], row['Year'], current_timestamp))
+        df['when_updated'] = current_timestamp
+        with run.stage('load'):
+            if observations_store_enabled():
+                run.rows_upserted += upsert_observations(cur, series_id, df, table_name, vintage)
+            else:
+                run.rows_upserted += bulk_upsert(cur, df[['Date', table_name, 'Quarter', 'Year', 'when_updated']], table_name, ['Date'], only_changed=True)
+            update_watermark(cur, series_id, data, vintage)
         
         print(f"Successfully inserted data into {table_name} table.")
     except Exception as e:
@@ -100,42 +106,37 @@ for series_id, table_name in series_dict.items():
         continue
 
 try:
-    cur.execute("""
-        SELECT Date, real_gross_domestic_product FROM real_gross_domestic_product
-        ORDER BY Date
-    """)
-    real_gdp_data = cur.fetchall()
+    with run.stage('transform'):
+        cur.execute("""
+            SELECT Date, real_gross_domestic_product FROM real_gross_domestic_product
+            ORDER BY Date
+        """)
+        real_gdp_data = cur.fetchall()
     
-    real_gdp_df = pd.DataFrame(real_gdp_data, columns=['Date', 'Real_GDP'])
+        real_gdp_df = pd.DataFrame(real_gdp_data, columns=['Date', 'Real_GDP'])
     
-    real_gdp_df['Date'] = pd.to_datetime(real_gdp_df['Date'])
+        real_gdp_df['Date'] = pd.to_datetime(real_gdp_df['Date'])
 
-    real_gdp_df['Real_GDP_Growth_Quarterly'] = real_gdp_df['Real_GDP'].pct_change() * 100
-    real_gdp_df['Year'] = real_gdp_df['Date'].dt.year
-    real_gdp_df['Real_GDP_Growth_Annual'] = real_gdp_df.groupby('Year')['Real_GDP'].pct_change() * 100
+        real_gdp_df['Real_GDP_Growth_Quarterly'] = real_gdp_df['Real_GDP'].pct_change() * 100
+        real_gdp_df['Year'] = real_gdp_df['Date'].dt.year
+        real_gdp_df['Real_GDP_Growth_Annual'] = real_gdp_df.groupby('Year')['Real_GDP'].pct_change() * 100
 
 
-    real_gdp_df.dropna(inplace=True)
+        real_gdp_df.dropna(inplace=True)
 
-    insert_growth_query = """
-        INSERT INTO real_gdp_growth (Date, Real_GDP_Growth_Quarterly, Real_GDP_Growth_Annual, when_updated)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (Date) DO UPDATE
-        SET Real_GDP_Growth_Quarterly = EXCLUDED.Real_GDP_Growth_Quarterly,
-            Real_GDP_Growth_Annual = EXCLUDED.Real_GDP_Growth_Annual,
-            when_updated = EXCLUDED.when_updated
-    """
-    
-    for index, row in real_gdp_df.iterrows():
         # Use Quarterly Only - Not Including Annual Anymore - 8.4.2024
-        cur.execute(insert_growth_query, (row['Date'], row['Real_GDP_Growth_Quarterly'], 0, current_timestamp))
-        #cur.execute(insert_growth_query, (row['Date'], row['Real_GDP_Growth_Quarterly'], row['Real_GDP_Growth_Annual'], current_timestamp))
+        real_gdp_df['Real_GDP_Growth_Annual'] = 0
+    real_gdp_df['when_updated'] = current_timestamp
+    with run.stage('load'):
+        run.rows_upserted += bulk_upsert(cur, real_gdp_df[['Date', 'Real_GDP_Growth_Quarterly', 'Real_GDP_Growth_Annual', 'when_updated']], 'real_gdp_growth', ['Date'], only_changed=True)
     
     print("Successfully calculated and inserted real GDP growth rates.")
 except Exception as e:
     print(f"Error calculating real GDP growth rates: {e}")
     engine_status = 'Error'
 
+run.record(cur, engine_status)
+
 # Update the status of the 'gdp' engine in the engines table
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -148,4 +149,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'gdp'))
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
@@ -1,21 +1,23 @@
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.fred_incremental import fetch_series_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 # Median
 HOUSE_PRICES_SERIES_ID = 'MSPUS'  # FRED series ID for median house prices
@@ -23,19 +25,33 @@ HOUSE_PRICES_SERIES_ID = 'MSPUS'  # FRED series ID for median house prices
 # Average
 AVG_HOUSE_PRICES_SERIES_ID = 'ASPUS'  # FRED series ID for average house prices
 
+HOUSE_PRICES_REVISION_WINDOW = pd.DateOffset(years=2)
+
 # Initialize Fred API client
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
+
+try:
+    conn = get_connection()
+    cur = conn.cursor()
+except Exception as e:
+    print(f"Error connecting to the database: {e}")
+    engine_status = 'Error'
+    exit(1)
+
+run = EngineRun('house_prices', conn)
 
 # Fetch median house prices data
 try:
-    median_house_prices_data = fred.get_series(HOUSE_PRICES_SERIES_ID)
+    with run.stage('fetch'):
+        median_house_prices_data, median_vintage, _ = fetch_series_incremental(fred, cur, HOUSE_PRICES_SERIES_ID, HOUSE_PRICES_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(median_house_prices_data)
     print("Successfully fetched median house prices data from FRED API.")
     # Convert to DataFrame
     median_house_prices_df = pd.DataFrame(median_house_prices_data, columns=['Median_House_Price'])
@@ -47,11 +63,13 @@ try:
 except Exception as e:
     print(f"Error fetching median house prices data: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 # Fetch average house prices data
 try:
-    avg_house_prices_data = fred.get_series(AVG_HOUSE_PRICES_SERIES_ID)
+    with run.stage('fetch'):
+        avg_house_prices_data, avg_vintage, _ = fetch_series_incremental(fred, cur, AVG_HOUSE_PRICES_SERIES_ID, HOUSE_PRICES_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(avg_house_prices_data)
     print("Successfully fetched average house prices data from FRED API.")
     # Convert to DataFrame
     avg_house_prices_df = pd.DataFrame(avg_house_prices_data, columns=['Avg_House_Price'])
@@ -63,43 +81,26 @@ try:
 except Exception as e:
     print(f"Error fetching average house prices data: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
-# Merge
-house_prices_df = pd.merge(median_house_prices_df, avg_house_prices_df, on='Date', how='left')
+with run.stage('transform'):
+    # Merge
+    house_prices_df = pd.merge(median_house_prices_df, avg_house_prices_df, on='Date', how='left')
 
-# Resolve duplicate 'Quarter' columns
-if 'Quarter_x' in house_prices_df.columns:
-    house_prices_df['Quarter'] = house_prices_df['Quarter_x']
-    house_prices_df.drop(columns=['Quarter_x', 'Quarter_y'], inplace=True)
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    engine_status = 'Error'
-    exit()
+    # Resolve duplicate 'Quarter' columns
+    if 'Quarter_x' in house_prices_df.columns:
+        house_prices_df['Quarter'] = house_prices_df['Quarter_x']
+        house_prices_df.drop(columns=['Quarter_x', 'Quarter_y'], inplace=True)
 
 current_timestamp = datetime.now()
-insert_query = sql.SQL("""
-    INSERT INTO house_prices (Date, median_house_price, avg_house_price, Quarter, when_updated)
-    VALUES (%s, %s, %s, %s, %s)
-    ON CONFLICT (Date) DO UPDATE 
-    SET median_house_price = EXCLUDED.median_house_price,
-        avg_house_price = EXCLUDED.avg_house_price,
-        Quarter = EXCLUDED.Quarter,
-        when_updated = EXCLUDED.when_updated
-""")
-for index, row in house_prices_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['Median_House_Price'], row['Avg_House_Price'], row['Quarter'], current_timestamp))
-    
+house_prices_df = house_prices_df.rename(columns={'Median_House_Price': 'median_house_price', 'Avg_House_Price': 'avg_house_price'})
+house_prices_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    run.rows_upserted += bulk_upsert(cur, house_prices_df[['Date', 'median_house_price', 'avg_house_price', 'Quarter', 'when_updated']], 'house_prices', ['Date'], only_changed=True)
+    update_watermark(cur, HOUSE_PRICES_SERIES_ID, median_house_prices_data, median_vintage)
+    update_watermark(cur, AVG_HOUSE_PRICES_SERIES_ID, avg_house_prices_data, avg_vintage)
+run.record(cur, engine_status)
+
 # Update the status of the 'house_prices' engine in the engines table
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -112,4 +113,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'house_price
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
@@ -1,10 +1,16 @@
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.presidents import tag_presidents, calculate_president_changes
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 #### This engine works with indexes and not base value. If I wanted to apply a base value (like 100,000$), then I need to define and calc that:
 # base_value = 100000  # Example base value in dollars
@@ -17,11 +23,6 @@ from datetime import datetime
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
@@ -34,148 +35,76 @@ states = [
     'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
 ]
 
+# Materialized views over state_house_prices the house price by state app reads
+house_price_views = ['state_house_prices_latest', 'state_house_prices_by_president', 'state_house_prices_presidents']
+
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
-
-all_states_df = pd.DataFrame()
-
-for state in states:
-    series_id = f'{state}STHPI'
-    try:
-        state_data = fred.get_series(series_id)
-        state_df = pd.DataFrame(state_data, columns=['House_Price'])
-        state_df.index.name = 'Date'
-        state_df['State'] = state
-        state_df['Quarter'] = state_df.index.to_period('Q').strftime('Q%q-%Y')
-        state_df.reset_index(inplace=True)
-        
-
-        state_df['4_years'] = state_df['House_Price'] - state_df['House_Price'].shift(4*4)  # Approx 4*4 quarters = 4 years
-        state_df['4_years_percent'] = (state_df['4_years'] / state_df['House_Price'].shift(4*4)) * 100
-        
-        state_df['10_years'] = state_df['House_Price'] - state_df['House_Price'].shift(10*4)  # Approx 10*4 quarters = 10 years
-        state_df['10_years_percent'] = (state_df['10_years'] / state_df['House_Price'].shift(10*4)) * 100
-        
-        state_df['25_years'] = state_df['House_Price'] - state_df['House_Price'].shift(25*4)  # Approx 25*4 quarters = 25 years
-        state_df['25_years_percent'] = (state_df['25_years'] / state_df['House_Price'].shift(25*4)) * 100
-        
-        state_df['all_time'] = state_df['House_Price'] - state_df['House_Price'].iloc[0]  # Difference from first available value
-        state_df['all_time_percent'] = (state_df['all_time'] / state_df['House_Price'].iloc[0]) * 100
-        
-        all_states_df = pd.concat([all_states_df, state_df])
-    except Exception as e:
-        print(f"Error fetching data for {state}: {e}")
+    exit(1)
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
+    conn = get_connection()
     cur = conn.cursor()
     print("Successfully connected to the database.")
 except Exception as e:
     print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
-
-president_query = """
-    SELECT president_name, start_date, end_date
-    FROM presidential_terms
-"""
-
-president_df = pd.read_sql(president_query, conn)
-
-president_df['start_date'] = pd.to_datetime(president_df['start_date'])
-president_df['end_date'] = pd.to_datetime(president_df['end_date'])
-
-def get_president(date):
-    date = pd.Timestamp(date)
-    for _, row in president_df.iterrows():
-        if row['start_date'] <= date <= row['end_date']:
-            return row['president_name']
-    return None
-
-all_states_df['president'] = all_states_df['Date'].apply(get_president)
+    exit(1)
+
+run = EngineRun('house_state_idx', conn)
+
+# All 50 state series are fetched concurrently through the rate limited pool
+with run.stage('fetch'):
+    state_series = fred.get_many([f'{state}STHPI' for state in states])
+    run.rows_fetched += sum(len(state_data) for state_data in state_series.values())
+run.add_bytes(fred.bytes_downloaded)
+
+with run.stage('transform'):
+    state_frames = []
+
+    for state in states:
+        series_id = f'{state}STHPI'
+        try:
+            if series_id not in state_series:
+                raise ValueError("series could not be fetched from FRED API")
+            state_data = state_series[series_id]
+            state_df = pd.DataFrame(state_data, columns=['House_Price'])
+            state_df.index.name = 'Date'
+            state_df['State'] = state
+            state_df['Quarter'] = state_df.index.to_period('Q').strftime('Q%q-%Y')
+            state_df.reset_index(inplace=True)
+        
 
-def calculate_president_changes(df):
-    for state in df['State'].unique():
-        state_df = df[df['State'] == state]
+            state_df['4_years'] = state_df['House_Price'] - state_df['House_Price'].shift(4*4)  # Approx 4*4 quarters = 4 years
+            state_df['4_years_percent'] = (state_df['4_years'] / state_df['House_Price'].shift(4*4)) * 100
         
-        for president in state_df['president'].unique():
-            pres_df = state_df[state_df['president'] == president]
-            
-            if not pres_df.empty:
-                start_date = pres_df['Date'].min()
-                end_date = pres_df['Date'].max()
-
-                if pd.notna(start_date) and pd.notna(end_date):
-                    start_price = pres_df[pres_df['Date'] == start_date]['House_Price'].values[0]
-                    end_price = pres_df[pres_df['Date'] == end_date]['House_Price'].values[0]
-
-                    amt_change = end_price - start_price
-                    percent_change = (amt_change / start_price) * 100
-
-                    df.loc[
-                        (df['State'] == state) &
-                        (df['president'] == president) &
-                        (df['Date'] >= start_date) &
-                        (df['Date'] <= end_date),
-                        'president_amt'
-                    ] = amt_change
-
-                    df.loc[
-                        (df['State'] == state) &
-                        (df['president'] == president) &
-                        (df['Date'] >= start_date) &
-                        (df['Date'] <= end_date),
-                        'president_percent'
-                    ] = percent_change
-
-calculate_president_changes(all_states_df)
-
-insert_query = sql.SQL("""
-    INSERT INTO state_house_prices (Date, State, House_Price, Quarter, "4_years", "4_years_percent", "10_years", "10_years_percent", "25_years", "25_years_percent", "all_time", "all_time_percent", president, president_amt, president_percent, when_updated)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (Date, State) DO UPDATE 
-    SET House_Price = EXCLUDED.House_Price,
-        Quarter = EXCLUDED.Quarter,
-        "4_years" = EXCLUDED."4_years",
-        "4_years_percent" = EXCLUDED."4_years_percent",
-        "10_years" = EXCLUDED."10_years",
-        "10_years_percent" = EXCLUDED."10_years_percent",
-        "25_years" = EXCLUDED."25_years",
-        "25_years_percent" = EXCLUDED."25_years_percent",
-        "all_time" = EXCLUDED."all_time",
-        "all_time_percent" = EXCLUDED."all_time_percent",
-        president = EXCLUDED.president,
-        president_amt = EXCLUDED.president_amt,
-        president_percent = EXCLUDED.president_percent,
-        when_updated = EXCLUDED.when_updated
-""")
-engine_status = 'Success'
-current_timestamp = datetime.now()
+            state_df['10_years'] = state_df['House_Price'] - state_df['House_Price'].shift(10*4)  # Approx 10*4 quarters = 10 years
+            state_df['10_years_percent'] = (state_df['10_years'] / state_df['House_Price'].shift(10*4)) * 100
+        
+            state_df['25_years'] = state_df['House_Price'] - state_df['House_Price'].shift(25*4)  # Approx 25*4 quarters = 25 years
+            state_df['25_years_percent'] = (state_df['25_years'] / state_df['House_Price'].shift(25*4)) * 100
+        
+            state_df['all_time'] = state_df['House_Price'] - state_df['House_Price'].iloc[0]  # Difference from first available value
+            state_df['all_time_percent'] = (state_df['all_time'] / state_df['House_Price'].iloc[0]) * 100
+        
+            state_frames.append(state_df)
+        except Exception as e:
+            print(f"Error fetching data for {state}: {e}")
+
+    if state_frames:
+        all_states_df = pd.concat(state_frames, ignore_index=True)
 
-for index, row in all_states_df.iterrows():
-    cur.execute(insert_query, (
-        row['Date'], row['State'], row['House_Price'], row['Quarter'], 
-        row['4_years'], row['4_years_percent'],
-        row['10_years'], row['10_years_percent'],
-        row['25_years'], row['25_years_percent'],
-        row['all_time'], row['all_time_percent'],
-        row['president'],
-        row['president_amt'],
-        row['president_percent'],
-        current_timestamp
-    ))
+        # One vectorized lookup against presidential_terms instead of scanning every term per row
+        all_states_df['president'] = tag_presidents(all_states_df['Date'], conn)
 
+        # Start/end price of each president's term per state, computed for all states in one grouped pass
+        president_changes = calculate_president_changes(all_states_df, 'House_Price', 'Date', ['State'])
+        all_states_df['president_amt'] = president_changes['amt_change']
+        all_states_df['president_percent'] = president_changes['percent_change']
 
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -183,11 +112,50 @@ update_engine_query = sql.SQL("""
         last_checkin = %s
     WHERE engine = %s
 """)
+
+# Every state failed: nothing to load, record the run and the engine as failed
+if not state_frames:
+    print("Error: no state house price series could be fetched or processed.")
+    engine_status = 'Error'
+    run.record(cur, engine_status, "No state house price series could be fetched or processed.")
+    cur.execute(update_engine_query, (engine_status, datetime.now(), 'house_state_idx'))
+    conn.commit()
+    cur.close()
+    release_connection(conn)
+    exit(1)
+
+# The states that did load are still written, but a run missing any is not a success
+engine_status = 'Success'
+if len(state_frames) < len(states):
+    print(f"{len(states) - len(state_frames)} of {len(states)} state series could not be fetched or processed.")
+    engine_status = 'Error'
+current_timestamp = datetime.now()
+
+all_states_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    run.rows_upserted += bulk_upsert(cur, all_states_df[[
+        'Date', 'State', 'House_Price', 'Quarter',
+        '4_years', '4_years_percent',
+        '10_years', '10_years_percent',
+        '25_years', '25_years_percent',
+        'all_time', 'all_time_percent',
+        'president', 'president_amt', 'president_percent',
+        'when_updated'
+    ]], 'state_house_prices', ['Date', 'State'], only_changed=True)
+
+    # Refreshed in the upsert's transaction, so the app never sees new rows without their views.
+    # CONCURRENTLY keeps the views readable meanwhile, nothing to do when no row changed.
+    if run.rows_upserted:
+        for view in house_price_views:
+            cur.execute(sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view)))
+        print(f"Refreshed {', '.join(house_price_views)}.")
+run.record(cur, engine_status)
+
 cur.execute(update_engine_query, (engine_status, current_timestamp, 'house_state_idx'))
 
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
 
 print("Data insertion and engine update completed successfully.")
@@ -1,86 +1,130 @@
 import pandas as pd
-import requests
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.engine_runs import EngineRun
+from common.bulk_loader import bulk_upsert
+from common.eia_fetcher import EiaFetcher, EIA_BASE_URL, EIA_PAGE_SIZE
+from common.fred_incremental import parse_refresh_args
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 eia_api_key = os.getenv('EIA_API_KEY')
+eia_base_url = os.getenv('EIA_BASE_URL', EIA_BASE_URL)
+eia_page_size = int(os.getenv('EIA_PAGE_SIZE', EIA_PAGE_SIZE))
+# EIA revises the latest months of the monthly survey, re-read this many months before the newest stored one
+eia_revision_months = int(os.getenv("EIA_REVISION_MONTHS", 2))
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
-# EIA API settings
-#EIA_SERIES_ID = 'PET.MCRFPUS1.M'  # Series ID for US Monthly Crude Oil Production
-EIA_SERIES_ID = 'MCRFPUS2'  # Series ID for US Monthly Crude Oil Production
+# EIA v2 series loaded into eia_observations, add entries to load more series in the same run.
+# legacy_table / legacy_column additionally keep the table the series had before eia_observations up to date.
+EIA_SERIES = [
+    {
+        'series_id': 'MCRFPUS2',
+        'description': 'U.S. Field Production of Crude Oil (MBBL/D)',
+        'route': 'petroleum/sum/snd',
+        'frequency': 'monthly',
+        'facets': {'series': ['MCRFPUS2']},
+        'legacy_table': 'us_oil_production_monthly_mil_bar_pd',
+        'legacy_column': 'Production',
+    },
+    {
+        'series_id': 'MCRIMUS2',
+        'description': 'U.S. Imports of Crude Oil (MBBL/D)',
+        'route': 'petroleum/sum/snd',
+        'frequency': 'monthly',
+        'facets': {'series': ['MCRIMUS2']},
+    },
+    {
+        'series_id': 'MCRSTUS1',
+        'description': 'U.S. Ending Stocks of Crude Oil (MBBL)',
+        'route': 'petroleum/sum/snd',
+        'frequency': 'monthly',
+        'facets': {'series': ['MCRSTUS1']},
+    },
+    {
+        'series_id': 'MCRRIUS2',
+        'description': 'U.S. Refiner Net Input of Crude Oil (MBBL/D)',
+        'route': 'petroleum/sum/snd',
+        'frequency': 'monthly',
+        'facets': {'series': ['MCRRIUS2']},
+    },
+]
 
-# Fetch oil production data from EIA API
-try:
-    url = f'https://api.eia.gov/v2/petroleum/sum/snd/data/?frequency=monthly&data[0]=value&facets[series][]={EIA_SERIES_ID}&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=5000&api_key={eia_api_key}'
-    response = requests.get(url)
-    response.raise_for_status()  # Check if the request was successful
-    data = response.json()
-    
-    # Print the entire JSON response to understand its structure
-    #print("API Response:", data)
-    
-    # Extract monthly
-    series_data = data.get('response', {}).get('data', [])
-    
-    if not series_data:
-        raise ValueError("No data found in the API response.")
-    
-    oil_df = pd.DataFrame(series_data)
-    oil_df['period'] = pd.to_datetime(oil_df['period'], format='%Y-%m')
-    oil_df['value'] = pd.to_numeric(oil_df['value'], errors='coerce')
-    
-    # Rename columns for consistency
-    oil_df.rename(columns={'period': 'Date', 'value': 'Production'}, inplace=True)
-    
-    # Drop rows where 'Production' is NaN
-    oil_df = oil_df.dropna(subset=['Production'])
-    
-    print("Successfully fetched and processed data from EIA API.")
-    engine_status = 'Success'
-except Exception as e:
-    print(f"Error fetching or processing data from EIA API: {e}")
-    engine_status = 'Error'
-    exit()
+# Newest stored period per series, one query for all of them
+max_date_query = sql.SQL("""
+    SELECT series_id, MAX(date)
+    FROM eia_observations
+    WHERE series_id = ANY(%s)
+    GROUP BY series_id
+""")
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
+    conn = get_connection()
     cur = conn.cursor()
     print("Successfully connected to the database.")
 except Exception as e:
     print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
+run = EngineRun('us_oil_production_by_month', conn)
 current_timestamp = datetime.now()
 
-insert_query = sql.SQL("""
-    INSERT INTO us_oil_production_monthly_mil_bar_pd  (Date, Production, when_updated)
-    VALUES (%s, %s, %s)
-    ON CONFLICT (Date) DO UPDATE 
-    SET Production = EXCLUDED.Production,
-        when_updated = EXCLUDED.when_updated
-""")
+starts = {}
+if not full_refresh:
+    cur.execute(max_date_query, ([spec['series_id'] for spec in EIA_SERIES],))
+    starts = {series_id: pd.Timestamp(max_date) - pd.DateOffset(months=eia_revision_months)
+              for series_id, max_date in cur.fetchall()}
+
+# Fetch every series concurrently, each only from its start period on
+try:
+    fetcher = EiaFetcher(eia_api_key, base_url=eia_base_url, page_size=eia_page_size)
+    with run.stage('fetch'):
+        fetched = fetcher.get_many(EIA_SERIES, starts)
+    run.add_bytes(fetcher.bytes_downloaded)
+    for spec in EIA_SERIES:
+        series_id = spec['series_id']
+        if series_id in fetched:
+            since = f"since {starts[series_id].date()}" if series_id in starts else "full history"
+            print(f"Fetched {len(fetched[series_id])} observations of {series_id} ({since}).")
+            run.rows_fetched += len(fetched[series_id])
+
+    if not fetched:
+        raise ValueError("No EIA series could be fetched.")
+    engine_status = 'Success' if len(fetched) == len(EIA_SERIES) else 'Error'
+
+    with run.stage('transform'):
+        frames = [df.assign(series_id=series_id) for series_id, df in fetched.items() if not df.empty]
+        observations = (pd.concat(frames, ignore_index=True) if frames
+                        else pd.DataFrame(columns=['series_id', 'Date', 'value', 'units']))
+        observations = observations.rename(columns={'Date': 'date'})[['series_id', 'date', 'value', 'units']]
+        observations['when_updated'] = current_timestamp
+
+    print("Successfully fetched and processed data from EIA API.")
+except Exception as e:
+    print(f"Error fetching or processing data from EIA API: {e}")
+    engine_status = 'Error'
+    exit(1)
+
+with run.stage('load'):
+    if not observations.empty:
+        run.rows_upserted += bulk_upsert(cur, observations, 'eia_observations', ['series_id', 'date'], only_changed=True)
 
-for index, row in oil_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['Production'], current_timestamp))
+    # Tables that predate eia_observations (read by the analyses) get their series too
+    for spec in EIA_SERIES:
+        if spec.get('legacy_table') and not fetched.get(spec['series_id'], pd.DataFrame()).empty:
+            legacy_df = fetched[spec['series_id']].rename(columns={'value': spec['legacy_column']})[['Date', spec['legacy_column']]]
+            legacy_df['when_updated'] = current_timestamp
+            run.rows_upserted += bulk_upsert(cur, legacy_df, spec['legacy_table'], ['Date'], only_changed=True)
+run.record(cur, engine_status)
 
 # Update the status of the 'us_oil_productio_by_monthn' engine in the engines table
 update_engine_query = sql.SQL("""
@@ -94,4 +138,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'us_oil_prod
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
@@ -1,38 +1,54 @@
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.fred_incremental import fetch_series_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 FULL_TIME_SERIES_ID = 'LNS12500000' 
 PART_TIME_SERIES_ID = 'LNS12600000' 
+# Seasonal factors are revised every January for the previous 5 years
+EMPLOYMENT_REVISION_WINDOW = pd.DateOffset(years=5)
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 # Initialize Fred API client
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
+
+try:
+    conn = get_connection()
+    cur = conn.cursor()
+except Exception as e:
+    print(f"Error connecting to the database: {e}")
+    engine_status = 'Error'
+    exit(1)
+
+run = EngineRun('employment', conn)
 
 # Fetch full-time job data
 try:
-    full_time_data = fred.get_series(FULL_TIME_SERIES_ID)
+    with run.stage('fetch'):
+        full_time_data, full_time_vintage, full_time_start = fetch_series_incremental(fred, cur, FULL_TIME_SERIES_ID, EMPLOYMENT_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(full_time_data)
     print("Successfully fetched full-time job data.")
     full_time_df = pd.DataFrame(full_time_data, columns=['Job_Count'])
     full_time_df['Job_Count'] *= 1000  # Scale job counts
@@ -43,11 +59,13 @@ try:
 except Exception as e:
     print(f"Error fetching full-time job data: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 # Fetch part-time job data
 try:
-    part_time_data = fred.get_series(PART_TIME_SERIES_ID)
+    with run.stage('fetch'):
+        part_time_data, part_time_vintage, part_time_start = fetch_series_incremental(fred, cur, PART_TIME_SERIES_ID, EMPLOYMENT_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(part_time_data)
     print("Successfully fetched part-time job data.")
     part_time_df = pd.DataFrame(part_time_data, columns=['Job_Count'])
     part_time_df['Job_Count'] *= 1000  # Scale job counts
@@ -58,43 +76,34 @@ try:
 except Exception as e:
     print(f"Error fetching part-time job data: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
-# Combine full-time and part-time job data
-combined_df = pd.concat([full_time_df, part_time_df])
+with run.stage('transform'):
+    # Combine full-time and part-time job data
+    combined_df = pd.concat([full_time_df, part_time_df])
 
-# Calculate monthly difference
-combined_df['monthly_difference'] = combined_df.groupby('Job_Type')['Job_Count'].diff().fillna(0)
+    # Calculate monthly difference
+    combined_df['monthly_difference'] = combined_df.groupby('Job_Type')['Job_Count'].diff()
 
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    engine_status = 'Error'
-    exit()
+    # On incremental fetches the first month of a type has no prior month in the window, its stored difference is kept
+    incremental_types = [job_type for job_type, start in (('full_time', full_time_start), ('part_time', part_time_start)) if start is not None]
+    combined_df = combined_df[~(combined_df['Job_Type'].isin(incremental_types) & combined_df['monthly_difference'].isna())]
+    combined_df['monthly_difference'] = combined_df['monthly_difference'].fillna(0)
 
 current_timestamp = datetime.now()
 
-insert_query = sql.SQL("""
-    INSERT INTO employment_jobs (Date, Job_Type, Job_Count, monthly_difference, when_updated)
-    VALUES (%s, %s, %s, %s, %s)
-    ON CONFLICT (Date, Job_Type) DO UPDATE 
-    SET Job_Count = EXCLUDED.Job_Count,
-        monthly_difference = EXCLUDED.monthly_difference,
-        when_updated = EXCLUDED.when_updated
-""")
-for index, row in combined_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['Job_Type'], row['Job_Count'], row['monthly_difference'], current_timestamp))
+# COPY is strict about integer columns, so cast the scaled float counts back to integers
+combined_df['Job_Count'] = combined_df['Job_Count'].round().astype('Int64')
+combined_df['monthly_difference'] = combined_df['monthly_difference'].round().astype('Int64')
+combined_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    run.rows_upserted += bulk_upsert(cur, combined_df[['Date', 'Job_Type', 'Job_Count', 'monthly_difference', 'when_updated']], 'employment_jobs', ['Date', 'Job_Type'], only_changed=True)
+    update_watermark(cur, FULL_TIME_SERIES_ID, full_time_data, full_time_vintage)
+    update_watermark(cur, PART_TIME_SERIES_ID, part_time_data, part_time_vintage)
 
 # Update the status of the 'employment' engine in the engines table
 engine_status = 'Success'
+run.record(cur, engine_status)
 update_engine_query = sql.SQL("""
     UPDATE engines
     SET status = %s,
@@ -106,6 +115,6 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'employment'
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
 
 print("Full-time and part-time job data saved and merged successfully.")
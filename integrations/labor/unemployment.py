@@ -1,73 +1,77 @@
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.observations import observations_store_enabled, upsert_observations
+from common.fred_incremental import fetch_series_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fred = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 UNEMPLOYMENT_SERIES_ID = 'UNRATE'  # FRED series ID for unemployment rate
+# Seasonal factors are revised every January for the previous 5 years
+UNEMPLOYMENT_REVISION_WINDOW = pd.DateOffset(years=5)
 
 try:
-    fred = Fred(api_key=fred)
+    fred = FredFetcher(fred)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 try:
-    unemployment_data = fred.get_series(UNEMPLOYMENT_SERIES_ID)
-    print("Successfully fetched data from FRED API.")
-    # Convert to DataFrame
-    unemployment_df = pd.DataFrame(unemployment_data, columns=['Unemployment Rate'])
-    unemployment_df.index.name = 'Date'
-    unemployment_df.reset_index(inplace=True)
-    engine_status = 'Success'
-
+    conn = get_connection()
+    cur = conn.cursor()
 except Exception as e:
-    print(f"Error fetching unemployment data: {e}")
+    print(f"Error connecting to the database: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
+
+run = EngineRun('unemployment', conn)
 
 try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
+    with run.stage('fetch'):
+        unemployment_data, unemployment_vintage, _ = fetch_series_incremental(fred, cur, UNEMPLOYMENT_SERIES_ID, UNEMPLOYMENT_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(unemployment_data)
+    print("Successfully fetched data from FRED API.")
+    with run.stage('transform'):
+        # Convert to DataFrame
+        unemployment_df = pd.DataFrame(unemployment_data, columns=['Unemployment Rate'])
+        unemployment_df.index.name = 'Date'
+        unemployment_df.reset_index(inplace=True)
+    engine_status = 'Success'
+
 except Exception as e:
-    print(f"Error connecting to the database: {e}")
+    print(f"Error fetching unemployment data: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 
 current_timestamp = datetime.now()
-insert_query = sql.SQL("""
-    INSERT INTO unemployment_data (Date, Unemployment_Rate, when_updated)
-    VALUES (%s, %s, %s)
-    ON CONFLICT (Date) DO UPDATE 
-    SET Unemployment_Rate = EXCLUDED.Unemployment_Rate,
-        when_updated = EXCLUDED.when_updated
-""")
-for index, row in unemployment_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['Unemployment Rate'], current_timestamp))
-    
+unemployment_df = unemployment_df.rename(columns={'Unemployment Rate': 'Unemployment_Rate'})
+unemployment_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    if observations_store_enabled():
+        run.rows_upserted += upsert_observations(cur, UNEMPLOYMENT_SERIES_ID, unemployment_df, 'Unemployment_Rate', unemployment_vintage)
+    else:
+        run.rows_upserted += bulk_upsert(cur, unemployment_df[['Date', 'Unemployment_Rate', 'when_updated']], 'unemployment_data', ['Date'], only_changed=True)
+    update_watermark(cur, UNEMPLOYMENT_SERIES_ID, unemployment_data, unemployment_vintage)
+run.record(cur, engine_status)
+
 # Update the status of the 'unemployment' engine in the engines table
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -80,4 +84,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'unemploymen
 conn.commit()
 
 cur.close()
-conn.close()
\ No newline at end of file
+release_connection(conn)
\ No newline at end of file
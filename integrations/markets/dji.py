@@ -1,82 +1,83 @@
 # Series is DJIA
 
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.observations import observations_store_enabled, upsert_observations
+from common.fred_incremental import fetch_series_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 DJI_SERIES_ID = 'DJIA'  # FRED series ID for Dow Jones Industrial Average
+DJI_REVISION_WINDOW = pd.DateOffset(days=14)
 
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 try:
-    dji_data = fred.get_series(DJI_SERIES_ID)
+    conn = get_connection()
+    cur = conn.cursor()
+except Exception as e:
+    print(f"Error connecting to the database: {e}")
+    engine_status = 'Error'
+    exit(1)
+
+run = EngineRun('dji', conn)
+
+try:
+    with run.stage('fetch'):
+        dji_data, dji_vintage, _ = fetch_series_incremental(fred, cur, DJI_SERIES_ID, DJI_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(dji_data)
     print("Successfully fetched data from FRED API.")
     
-    # Convert to DataFrame
-    dji_df = pd.DataFrame(dji_data, columns=['DJI'])
-    dji_df.index.name = 'Date'
-    dji_df.reset_index(inplace=True)
+    with run.stage('transform'):
+        # Convert to DataFrame
+        dji_df = pd.DataFrame(dji_data, columns=['DJI'])
+        dji_df.index.name = 'Date'
+        dji_df.reset_index(inplace=True)
     
-    # Drop rows where 'DJI' is NaN
-    dji_df = dji_df.dropna(subset=['DJI'])
+        # Drop rows where 'DJI' is NaN
+        dji_df = dji_df.dropna(subset=['DJI'])
     
-    # Add quarter column
-    dji_df['Quarter'] = dji_df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
+        # Add quarter column
+        dji_df['Quarter'] = dji_df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
     engine_status = 'Success'
 except Exception as e:
     print(f"Error fetching DJI data: {e}")
     engine_status = 'Error'
-    exit()
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    engine_status = 'Error'
-    exit()
+    exit(1)
 
 current_timestamp = datetime.now()
 
-insert_query = sql.SQL("""
-    INSERT INTO dji (Date, DJI, Quarter, when_updated)
-    VALUES (%s, %s, %s, %s)
-    ON CONFLICT (Date) DO UPDATE 
-    SET DJI = EXCLUDED.DJI,
-        Quarter = EXCLUDED.Quarter,
-        when_updated = EXCLUDED.when_updated
-""")
-for index, row in dji_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['DJI'], row['Quarter'], current_timestamp))
-    
+dji_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    if observations_store_enabled():
+        run.rows_upserted += upsert_observations(cur, DJI_SERIES_ID, dji_df, 'DJI', dji_vintage)
+    else:
+        run.rows_upserted += bulk_upsert(cur, dji_df[['Date', 'DJI', 'Quarter', 'when_updated']], 'dji', ['Date'], only_changed=True)
+    update_watermark(cur, DJI_SERIES_ID, dji_data, dji_vintage)
+run.record(cur, engine_status)
+
 # Update the status of the 'dji' engine in the engines table
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -89,4 +90,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 'dji'))
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
@@ -1,80 +1,82 @@
 # Series SP500
 
 import pandas as pd
-from fredapi import Fred
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.bulk_loader import bulk_upsert
+from common.fred_fetcher import FredFetcher
+from common.observations import observations_store_enabled, upsert_observations
+from common.fred_incremental import fetch_series_incremental, update_watermark, parse_refresh_args
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
 fredk = os.getenv('FREDK')
 
 engine_status = 'In Progress'
+full_refresh = parse_refresh_args()
 
 SP500_SERIES_ID = 'SP500'  # FRED series ID for S&P 500
+SP500_REVISION_WINDOW = pd.DateOffset(days=14)
 
 try:
-    fred = Fred(api_key=fredk)
+    fred = FredFetcher(fredk)
     print("Successfully connected to FRED API client.")
     engine_status = 'Success'
 except Exception as e:
     print(f"Error initializing Fred API client: {e}")
     engine_status = 'Error'
-    exit()
+    exit(1)
 
 try:
-    sp500_data = fred.get_series(SP500_SERIES_ID)
+    conn = get_connection()
+    cur = conn.cursor()
+except Exception as e:
+    print(f"Error connecting to the database: {e}")
+    engine_status = 'Error'
+    exit(1)
+
+run = EngineRun('s&p500', conn)
+
+try:
+    with run.stage('fetch'):
+        sp500_data, sp500_vintage, _ = fetch_series_incremental(fred, cur, SP500_SERIES_ID, SP500_REVISION_WINDOW, full_refresh)
+        run.rows_fetched += len(sp500_data)
     print("Successfully fetched data from FRED API.")
     
-    sp500_df = pd.DataFrame(sp500_data, columns=['S&P 500'])
-    sp500_df.index.name = 'Date'
-    sp500_df.reset_index(inplace=True)
+    with run.stage('transform'):
+        sp500_df = pd.DataFrame(sp500_data, columns=['S&P 500'])
+        sp500_df.index.name = 'Date'
+        sp500_df.reset_index(inplace=True)
     
-    sp500_df = sp500_df.dropna(subset=['S&P 500'])
+        sp500_df = sp500_df.dropna(subset=['S&P 500'])
     
-    # Add quarter column
-    sp500_df['Quarter'] = sp500_df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
+        # Add quarter column
+        sp500_df['Quarter'] = sp500_df['Date'].dt.to_period('Q').dt.strftime('Q%q-%Y')
     engine_status = 'Success'
 except Exception as e:
     print(f"Error fetching S&P 500 data: {e}")
     engine_status = 'Error'
-    exit()
-
-try:
-    conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    cur = conn.cursor()
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    engine_status = 'Error'
-    exit()
+    exit(1)
 
 current_timestamp = datetime.now()
 
-insert_query = sql.SQL("""
-    INSERT INTO sp500 (Date, SP500, Quarter, when_updated)
-    VALUES (%s, %s, %s, %s)
-    ON CONFLICT (Date) DO UPDATE 
-    SET SP500 = EXCLUDED.SP500,
-        Quarter = EXCLUDED.Quarter,
-        when_updated = EXCLUDED.when_updated
-""")
-for index, row in sp500_df.iterrows():
-    cur.execute(insert_query, (row['Date'], row['S&P 500'], row['Quarter'], current_timestamp))
-    
+sp500_df = sp500_df.rename(columns={'S&P 500': 'SP500'})
+sp500_df['when_updated'] = current_timestamp
+with run.stage('load'):
+    if observations_store_enabled():
+        run.rows_upserted += upsert_observations(cur, SP500_SERIES_ID, sp500_df, 'SP500', sp500_vintage)
+    else:
+        run.rows_upserted += bulk_upsert(cur, sp500_df[['Date', 'SP500', 'Quarter', 'when_updated']], 'sp500', ['Date'], only_changed=True)
+    update_watermark(cur, SP500_SERIES_ID, sp500_data, sp500_vintage)
+run.record(cur, engine_status)
+
 # Update the status of the 'sp500' engine in the engines table
 update_engine_query = sql.SQL("""
     UPDATE engines
@@ -87,4 +89,4 @@ cur.execute(update_engine_query, (engine_status, current_timestamp, 's&p500'))
 conn.commit()
 
 cur.close()
-conn.close()
+release_connection(conn)
@@ -1,19 +1,22 @@
 import pandas as pd
-import yfinance as yf
-import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 import time
+import argparse
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from common.engine_runs import EngineRun
+from common.bar_cache import BarCache
+from common.trailing_returns import trailing_returns
+from common.data_source import get_connection, release_connection
 
 load_dotenv()
 
-dbname = os.getenv("DB_NAME")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-host = os.getenv("DB_HOST")
-port = os.getenv("DB_PORT")
+# Seconds between iterations in --daemon mode
+default_interval = int(os.getenv("YFINANCE_INTERVAL", 60))
 
 engine_status = 'In Progress'
 
@@ -32,96 +35,39 @@ tickers = {
     'Gold': 'GC=F'
 }
 
-def fetch_data(ticker):
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period='2y')  # Fetch the last 2 years of data for various thresholds
-        if len(hist) < 2:
-            return None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None
-
-        # Convert index to timezone-naive datetime
-        hist.index = hist.index.tz_localize(None)
-        
-        # Get the most recent data
-        today = hist.iloc[-1]
-        current_price = today['Close']
-        
-        # Calculate the start of the current year for YTD
-        start_of_year = datetime(datetime.now().year, 1, 1)
-        
-        thresholds = {
-            '1w': pd.DateOffset(weeks=1),
-            '1m': pd.DateOffset(months=1),
-            '3m': pd.DateOffset(months=3),
-            '6m': pd.DateOffset(months=6),
-            '1y': pd.DateOffset(years=1),
-            '18m': pd.DateOffset(months=18),
-            '2y': pd.DateOffset(years=2),
-            'ytd': start_of_year
-        }
-        
-        changes = {}
-        for key, offset in thresholds.items():
-            if key == 'ytd':
-                date_threshold = start_of_year
-            else:
-                date_threshold = datetime.now() - offset
-            
-            threshold_data = hist[hist.index >= date_threshold]
-            if not threshold_data.empty:
-                threshold_close = threshold_data.iloc[0]['Close']
-                change = current_price - threshold_close
-                change_pct = (change / threshold_close) * 100
-                changes[f'{key}_price'] = f"{change:.2f}"
-                changes[f'{key}_pct'] = f"{change_pct:.2f}%"
-            else:
-                changes[f'{key}_price'] = 'N/A'
-                changes[f'{key}_pct'] = 'N/A'
-        
-        # Calculate daily change and percentage change
-        yesterday = hist.iloc[-2]
-        previous_close = yesterday['Close']
-        change = current_price - previous_close
-        change_pct = (change / previous_close) * 100
-        
-        return (current_price, 
-                f"{change:.2f}", 
-                f"{change_pct:.2f}%", 
-                changes['1w_price'], 
-                changes['1w_pct'], 
-                changes['1m_price'], 
-                changes['1m_pct'], 
-                changes['3m_price'], 
-                changes['3m_pct'], 
-                changes['6m_price'], 
-                changes['6m_pct'], 
-                changes['1y_price'], 
-                changes['1y_pct'], 
-                changes['18m_price'], 
-                changes['18m_pct'], 
-                changes['2y_price'], 
-                changes['2y_pct'], 
-                changes['ytd_price'], 
-                changes['ytd_pct'])
-    except Exception as e:
-        print(f"Error fetching data for {ticker}: {e}")
-        return None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None
+# trailing_returns columns in app_home_page insert order, after TICKER
+HOME_PAGE_COLUMNS = [
+    'last', 'chg', 'chg_pct',
+    '1w_price', '1w_pct',
+    '1m_price', '1m_pct',
+    '3m_price', '3m_pct',
+    '6m_price', '6m_pct',
+    '1y_price', '1y_pct',
+    '18m_price', '18m_pct',
+    '2y_price', '2y_pct',
+    'ytd_price', 'ytd_pct'
+]
 
 
-def update_database():
+def home_page_row(values):
+    """One trailing_returns row as app_home_page values (NULL where missing), None when the ticker has no data."""
+    if pd.isna(values['last']):
+        return None
+    return [None if pd.isna(values[column]) else float(values[column]) for column in HOME_PAGE_COLUMNS]
+
+
+def connect():
     try:
-        conn = psycopg2.connect(
-            dbname=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
-        )
-        cur = conn.cursor()
+        return get_connection()
     except Exception as e:
         print(f"Error connecting to the database: {e}")
-        return 'Error'
+        return None
+
+
+def update_database(conn, bar_cache):
+    cur = conn.cursor()
 
+    run = EngineRun('yfinance_main', conn)
     current_timestamp = datetime.now()
 
     insert_query = sql.SQL("""
@@ -169,16 +115,33 @@ def update_database():
 
     
 
-    for label, ticker in tickers.items():
-        data = fetch_data(ticker)
-        # Ensure the number of values matches the number of placeholders
-        if data[0] is not None:
-            cur.execute(insert_query, (label, *data, 'Y'))
-            engine_status = 'Success'
-        else:
-            cur.execute(insert_query, (label, *['N/A'] * 18, 'N'))
+    engine_status = 'Success'
+
+    # One batched download for all tickers, only the bars since the last cached date once the cache is warm
+    with run.stage('fetch'):
+        try:
+            bars = bar_cache.refresh(tickers.values())
+        except Exception as e:
+            print(f"Error downloading bars from Yahoo Finance, using cached bars: {e}")
+            bars = bar_cache.bars.reindex(columns=list(tickers.values()))
             engine_status = 'Error'
 
+    # Every horizon for every ticker in one pass over the (dates x tickers) matrix
+    with run.stage('transform'):
+        returns = trailing_returns(bars[list(tickers.values())])
+        rows = {label: home_page_row(returns.loc[ticker]) for label, ticker in tickers.items()}
+
+    with run.stage('load'):
+        for label, data in rows.items():
+            if data is not None:
+                run.rows_fetched += 1
+                cur.execute(insert_query, (label, *data, 'Y'))
+            else:
+                cur.execute(insert_query, (label, *[None] * len(HOME_PAGE_COLUMNS), 'N'))
+                engine_status = 'Error'
+            run.rows_upserted += cur.rowcount
+    run.record(cur, engine_status)
+
     # Update the status of the 'yfinance_main' engine in the engines table
     update_engine_query = sql.SQL("""
         UPDATE engines
@@ -189,22 +152,58 @@ def update_database():
     cur.execute(update_engine_query, (engine_status, current_timestamp, 'yfinance_main'))
     print('Engine iteration complete.')
 
-    # Commit and close
     conn.commit()
     cur.close()
-    conn.close()
-    
+
     return engine_status
 
-# Run the script in a loop
-#while True:
-#    status = update_database()
-#    if status == 'Error':
-#        print("An error occurred. The script will retry.")
-#    time.sleep(2)  # Pause execution for 2 seconds
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Update the home page market table from Yahoo Finance.')
+    parser.add_argument('--daemon', action='store_true', help='Keep running, one iteration every --interval seconds.')
+    parser.add_argument('--interval', type=int, default=default_interval, help='Seconds between iterations in --daemon mode.')
+    return parser.parse_args()
+
+
+def run_daemon(interval):
+    """Runs update_database in a loop on one connection and one in-memory bar cache, reconnecting if the connection drops."""
+    conn = None
+    bar_cache = BarCache('yfinance_main')
+    while True:
+        started = time.monotonic()
+        try:
+            if conn is not None and conn.closed:
+                release_connection(conn, close=True)
+            if conn is None or conn.closed:
+                conn = connect()
+            if conn is None:
+                status = 'Error'
+            else:
+                status = update_database(conn, bar_cache)
+        except Exception as e:
+            print(f"Error in engine iteration: {e}")
+            status = 'Error'
+            if conn is not None and not conn.closed:
+                conn.rollback()
+        if status == 'Error':
+            print("An error occurred. The script will retry.")
+        time.sleep(max(0, interval - (time.monotonic() - started)))
 
 
-# Run the script once
 if __name__ == "__main__":
-    status = update_database()
-    print(f"Script execution completed. Status: {status}")
\ No newline at end of file
+    args = parse_args()
+    if args.daemon:
+        try:
+            run_daemon(args.interval)
+        except KeyboardInterrupt:
+            print("Stopped yfinance_main daemon.")
+    else:
+        # Run the script once
+        conn = connect()
+        if conn is None:
+            exit(1)
+        status = update_database(conn, BarCache('yfinance_main'))
+        release_connection(conn)
+        print(f"Script execution completed. Status: {status}")
+        if status == 'Error':
+            exit(1)
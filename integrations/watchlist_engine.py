@@ -1,2 +1,299 @@
-# async - CODE REMOVED FOR GITHUB
+import asyncio
+import math
+import time
+import os
+import sys
+import argparse
+import numpy as np
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from collections import deque
+from dotenv import load_dotenv
+from datetime import datetime
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.engine_runs import EngineRun
+from common.data_source import get_connection, release_connection
+
+load_dotenv()
+
+# Seconds between polls in --daemon mode
+default_interval = int(os.getenv("WATCHLIST_INTERVAL", 15))
+# Quotes requested at once, and how long one quote may take before it counts as failed
+default_concurrency = int(os.getenv("WATCHLIST_CONCURRENCY", 8))
+default_quote_timeout = float(os.getenv("WATCHLIST_QUOTE_TIMEOUT", 10))
+
+select_watchlist = sql.SQL("""
+    SELECT ticker, open, close, percent_chg, status
+    FROM watchlist
+""")
+
+# All changed tickers in one statement, the values list is sent as a single page.
+# A failed quote only changes the status, COALESCE keeps the stored date then.
+update_changed = """
+    UPDATE watchlist AS w
+    SET open = v.open,
+        close = v.close,
+        percent_chg = v.percent_chg,
+        date = COALESCE(v.date, w.date),
+        status = v.status,
+        last_checkin = v.last_checkin
+    FROM (VALUES %s) AS v (ticker, open, close, percent_chg, date, status, last_checkin)
+    WHERE w.ticker = v.ticker
+"""
+update_changed_template = "(%s, %s::double precision, %s::double precision, %s::double precision, %s, %s, %s::timestamp)"
+
+update_engine_query = sql.SQL("""
+    UPDATE engines
+    SET status = %s,
+        last_checkin = %s
+    WHERE engine = %s
+""")
+
+
+class YahooQuoteProvider:
+    """Latest daily bar per ticker from Yahoo Finance. yfinance is blocking, so each quote runs in a worker thread."""
+
+    async def get_quote(self, ticker):
+        return await asyncio.to_thread(self._get_quote, ticker)
+
+    def _get_quote(self, ticker):
+        import yfinance as yf
+
+        history = yf.Ticker(ticker).history(period='5d', interval='1d', auto_adjust=False)
+        if history.empty:
+            raise ValueError(f"No bars returned for {ticker}")
+        last = history.iloc[-1]
+        previous_close = history['Close'].iloc[-2] if len(history) > 1 else np.nan
+        return {
+            'open': last['Open'],
+            'close': last['Close'],
+            'percent_chg': (last['Close'] - previous_close) / previous_close * 100,
+            'date': history.index[-1].strftime('%Y-%m-%d'),
+        }
+
+
+class FakeQuoteProvider:
+    """
+    Quotes from a dict (ticker -> quote dict, or an exception to raise), answered after latency seconds.
+    Stands in for YahooQuoteProvider in benchmarks/watchlist_cycle.py, no network needed.
+    """
+
+    def __init__(self, quotes, latency=0.0):
+        self.quotes = quotes
+        self.latency = latency
+        self.requests = 0
+
+    async def get_quote(self, ticker):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        quote = self.quotes.get(ticker, KeyError(ticker))
+        if isinstance(quote, Exception):
+            raise quote
+        return quote
+
+
+def clean_value(value):
+    """Quote values as stored in WATCHLIST: a float rounded to 4 places, None for missing / NaN."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else round(value, 4)
+
+
+async def fetch_quote(provider, ticker, semaphore, timeout):
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            quote = await asyncio.wait_for(provider.get_quote(ticker), timeout)
+            error = None
+        except Exception as e:
+            quote = None
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        return ticker, quote, time.perf_counter() - started, error
+
+
+async def poll_quotes(provider, tickers, concurrency=default_concurrency, timeout=default_quote_timeout):
+    """
+    Requests one quote per distinct ticker, at most concurrency at a time.
+    Returns (quotes, latencies, errors), each a dict keyed by ticker. A failed or timed out quote is in errors only.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(
+        fetch_quote(provider, ticker, semaphore, timeout) for ticker in dict.fromkeys(tickers)
+    ))
+
+    quotes, latencies, errors = {}, {}, {}
+    for ticker, quote, latency, error in results:
+        latencies[ticker] = latency
+        if error is None:
+            quotes[ticker] = quote
+        else:
+            errors[ticker] = error
+    return quotes, latencies, errors
+
+
+def changed_rows(current, quotes, errors, checkin_time):
+    """
+    Rows for update_changed: only tickers whose open/close/percent_chg or status differ from current
+    (ticker -> (open, close, percent_chg, status) as read from WATCHLIST). A failed quote keeps the old values
+    and only flips the status to 'Error'.
+    """
+    rows = []
+    for ticker, (open_, close, percent_chg, status) in current.items():
+        if ticker in quotes:
+            quote = quotes[ticker]
+            values = (clean_value(quote.get('open')), clean_value(quote.get('close')),
+                      clean_value(quote.get('percent_chg')), 'Success')
+            date = quote.get('date')
+        elif ticker in errors:
+            values = (open_, close, percent_chg, 'Error')
+            date = None
+        else:
+            continue
+
+        if values != (open_, close, percent_chg, status):
+            rows.append((ticker, *values[:3], date, values[3], checkin_time))
+    return rows
+
+
+def write_changes(cur, rows):
+    if not rows:
+        return 0
+    execute_values(cur, update_changed, rows, template=update_changed_template, page_size=len(rows))
+    return cur.rowcount
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+class WatchlistEngine:
+    """
+    Polls quotes for every WATCHLIST ticker and writes only the rows that changed, one statement per cycle.
+    provider is anything with an async get_quote(ticker) returning open, close, percent_chg and date
+    (YahooQuoteProvider in production, FakeQuoteProvider in benchmarks/watchlist_cycle.py).
+    Per-cycle metrics are printed, recorded in engine_runs and kept in self.metrics (most recent last).
+    """
+
+    def __init__(self, conn, provider, concurrency=default_concurrency, quote_timeout=default_quote_timeout,
+                 metrics_history=100):
+        self.conn = conn
+        self.provider = provider
+        self.concurrency = concurrency
+        self.quote_timeout = quote_timeout
+        self.metrics = deque(maxlen=metrics_history)
+
+    async def run_cycle(self):
+        cur = self.conn.cursor()
+        run = EngineRun('watchlist', self.conn)
+        cycle_started = datetime.now()
+
+        with run.stage('fetch'):
+            cur.execute(select_watchlist)
+            current = {ticker: (open_, close, percent_chg, status)
+                       for ticker, open_, close, percent_chg, status in cur.fetchall()}
+            # Release the snapshot before the network wait, the write below runs in its own short transaction
+            self.conn.commit()
+            quotes, latencies, errors = await poll_quotes(self.provider, current, self.concurrency, self.quote_timeout)
+            run.rows_fetched += len(quotes)
+
+        with run.stage('transform'):
+            rows = changed_rows(current, quotes, errors, cycle_started)
+
+        with run.stage('load'):
+            run.rows_upserted += write_changes(cur, rows)
+
+        for ticker, error in errors.items():
+            print(f"Error fetching quote for {ticker}: {error}")
+        engine_status = 'Error' if errors else 'Success'
+
+        run.record(cur, engine_status, '; '.join(f"{ticker}: {error}" for ticker, error in errors.items()) or None)
+        cur.execute(update_engine_query, (engine_status, cycle_started, 'watchlist'))
+        self.conn.commit()
+        cur.close()
+
+        latency_values = list(latencies.values())
+        metrics = {
+            'cycle_started': cycle_started,
+            'tickers': len(current),
+            'quotes': len(quotes),
+            'failed': len(errors),
+            'changed': len(rows),
+            'fetch_seconds': run.stage_seconds.get('fetch', 0.0),
+            'transform_seconds': run.stage_seconds.get('transform', 0.0),
+            'load_seconds': run.stage_seconds.get('load', 0.0),
+            'cycle_seconds': sum(run.stage_seconds.values()),
+            'quote_p50_seconds': percentile(latency_values, 50),
+            'quote_p95_seconds': percentile(latency_values, 95),
+            'quote_max_seconds': max(latency_values) if latency_values else None,
+        }
+        self.metrics.append(metrics)
+        print(format_metrics(metrics))
+        return engine_status
+
+
+def format_metrics(metrics):
+    latency = (f"quote p50 {metrics['quote_p50_seconds']:.3f}s / p95 {metrics['quote_p95_seconds']:.3f}s / "
+               f"max {metrics['quote_max_seconds']:.3f}s" if metrics['quote_max_seconds'] is not None else "no quotes")
+    return (f"Watchlist cycle: {metrics['tickers']} tickers, {metrics['quotes']} quotes, {metrics['failed']} failed, "
+            f"{metrics['changed']} changed in {metrics['cycle_seconds']:.3f}s "
+            f"(fetch {metrics['fetch_seconds']:.3f}s, write {metrics['load_seconds']:.3f}s), {latency}.")
+
+
+def connect():
+    try:
+        return get_connection()
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        return None
+
+
+async def run_daemon(engine, interval):
+    """
+    Runs a cycle every interval seconds on one connection, reconnecting if it drops. A cycle that overruns the
+    interval is followed by the next one right away rather than queueing the missed ticks, so updates never pile up.
+    """
+    while True:
+        started = time.monotonic()
+        try:
+            if engine.conn is not None and engine.conn.closed:
+                release_connection(engine.conn, close=True)
+            if engine.conn is None or engine.conn.closed:
+                engine.conn = connect()
+            if engine.conn is not None:
+                await engine.run_cycle()
+        except psycopg2.Error as e:
+            print(f"Database error in watchlist cycle, reconnecting: {e}")
+            if engine.conn is not None:
+                release_connection(engine.conn, close=True)
+            engine.conn = None
+        await asyncio.sleep(max(0, interval - (time.monotonic() - started)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Poll quotes for the WATCHLIST tickers and write the ones that changed.')
+    parser.add_argument('--daemon', action='store_true', help='Keep polling, one cycle every --interval seconds.')
+    parser.add_argument('--interval', type=int, default=default_interval, help='Seconds between cycles in --daemon mode.')
+    parser.add_argument('--concurrency', type=int, default=default_concurrency, help='Quotes requested at once.')
+    parser.add_argument('--quote-timeout', type=float, default=default_quote_timeout, help='Seconds before a quote counts as failed.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    engine = WatchlistEngine(connect(), YahooQuoteProvider(), args.concurrency, args.quote_timeout)
+    if args.daemon:
+        try:
+            asyncio.run(run_daemon(engine, args.interval))
+        except KeyboardInterrupt:
+            print("Stopped watchlist daemon.")
+    else:
+        if engine.conn is None:
+            exit(1)
+        status = asyncio.run(engine.run_cycle())
+        release_connection(engine.conn)
+        print(f"Script execution completed. Status: {status}")
+        if status == 'Error':
+            exit(1)
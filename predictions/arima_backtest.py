@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.arima_backtest import HORIZONS, BACKTEST_FOLDS, BACKTEST_STEP_MONTHS, order_grid, run_backtest
+from common.bulk_loader import bulk_upsert
+from common.data_source import connection, get_series
+from common.forecasts import WINDOWS
+
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Backtest a grid of ARIMA orders and windows with rolling-origin cross-validation '
+                    'and store the leaderboard the forecasts pick their order from.')
+    parser.add_argument('--table', default='unemployment_data')
+    parser.add_argument('--column', default='unemployment_rate')
+    parser.add_argument('--p', type=int, nargs='+', default=[0, 1, 2, 3, 4, 5], help='AR orders to try.')
+    parser.add_argument('--d', type=int, nargs='+', default=[0, 1, 2], help='Differencing orders to try.')
+    parser.add_argument('--q', type=int, nargs='+', default=[0, 1, 2], help='MA orders to try.')
+    parser.add_argument('--window', action='append', choices=list(WINDOWS),
+                        help='Only backtest this window (repeatable), every window by default.')
+    parser.add_argument('--horizon', type=int, nargs='+', default=list(HORIZONS), help='Horizons in months to score.')
+    parser.add_argument('--folds', type=int, default=BACKTEST_FOLDS, help='Rolling origins per config.')
+    parser.add_argument('--step', type=int, default=BACKTEST_STEP_MONTHS, help='Months between rolling origins.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes, 1 runs serially.')
+    parser.add_argument('--dry-run', action='store_true', help='Print the leaderboard without storing it.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    series = f"{args.table}.{args.column}"
+    windows = args.window or list(WINDOWS)
+    orders = order_grid(args.p, args.d, args.q)
+
+    history = get_series(args.table, args.column).reset_index()
+    last_obs_date = history['date'].iloc[-1].date()
+    print(f"Backtesting {len(orders)} orders x {len(windows)} windows of {series} ({len(history)} observations "
+          f"through {last_obs_date}) on {args.folds} folds with {args.workers} workers.")
+
+    started = time.perf_counter()
+    leaderboard = run_backtest(history, args.column, orders, windows, args.horizon, args.folds, args.step, args.workers)
+    print(f"Backtested {len(orders) * len(windows)} configs in {time.perf_counter() - started:.1f}s.")
+
+    for (window, horizon), board in leaderboard.groupby(['window_name', 'horizon']):
+        print(f"\nBest {window} orders at {horizon} months:")
+        print(board.head(5)[['arima_order', 'mae', 'rmse', 'folds', 'failed_folds']].to_string(index=False))
+
+    if args.dry_run:
+        exit(0)
+
+    leaderboard['series'] = series
+    leaderboard['last_obs_date'] = last_obs_date
+    leaderboard['when_updated'] = datetime.now()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            bulk_upsert(cur, leaderboard, 'arima_leaderboard', ['series', 'window_name', 'arima_order', 'horizon'])
+        conn.commit()
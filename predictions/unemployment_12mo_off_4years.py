@@ -1,44 +1,14 @@
 import os
 import pandas as pd
-import psycopg2
+import sys
 import plotly.graph_objs as go
-from statsmodels.tsa.arima.model import ARIMA
-from dotenv import load_dotenv
 
-load_dotenv()
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.forecasts import forecast_series
 
-def get_db_connection():
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    return conn
-
-def fetch_unemployment_data():
-    conn = get_db_connection()
-    query = """
-    SELECT date, unemployment_rate
-    FROM unemployment_data
-    WHERE date >= CURRENT_DATE - INTERVAL '4 years'
-    ORDER BY date
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
-
-df = fetch_unemployment_data()
-
-# Fit ARIMA model
-model = ARIMA(df['unemployment_rate'], order=(5, 1, 0))  # Adjust order as needed
-model_fit = model.fit()
-
-# Forecast next 12 months
-forecast = model_fit.forecast(steps=12)
-forecast_dates = pd.date_range(start=df['date'].iloc[-1], periods=13, freq='M')[1:]
-forecast_df = pd.DataFrame({'date': forecast_dates, 'unemployment_rate': forecast})
+# Forecast next 12 months: fitted params and the forecast are kept in arima_models / forecasts,
+# so runs on unchanged data don't refit the model
+df, forecast_df = forecast_series('unemployment_data', 'unemployment_rate', '4_years', steps=12)
 
 # Concatenate historical and forecast data
 full_df = pd.concat([df, forecast_df])
@@ -1,35 +1,16 @@
 import os
 import pandas as pd
-import psycopg2
+import sys
 import plotly.graph_objs as go
-from statsmodels.tsa.arima.model import ARIMA
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from dotenv import load_dotenv
 
-load_dotenv()
-
-def get_db_connection():
-    conn = psycopg2.connect(
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT")
-    )
-    return conn
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.data_source import get_series
+from common.forecasts import forecast_series
 
 def fetch_unemployment_data():
-    conn = get_db_connection()
-    query = """
-    SELECT date, unemployment_rate
-    FROM unemployment_data
-    WHERE date >= CURRENT_DATE - INTERVAL '4 years'
-    ORDER BY date
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    return get_series('unemployment_data', 'unemployment_rate', start=pd.Timestamp.today().normalize() - pd.DateOffset(years=4)).reset_index()
 
 df = fetch_unemployment_data()
 
@@ -46,14 +27,10 @@ def prepare_data(df):
     df = df.dropna().reset_index(drop=True)
     return df
 
-# ARIMA model forecasting
-def arima_forecast(df, periods=36):
-    model = ARIMA(df['unemployment_rate'], order=(5, 1, 0))  # Adjust order as needed
-    model_fit = model.fit()
-    forecast = model_fit.forecast(steps=periods)
-    forecast_dates = pd.date_range(start=df['date'].iloc[-1], periods=periods + 1, freq='M')[1:]
-    forecast_df = pd.DataFrame({'date': forecast_dates, 'unemployment_rate': forecast})
-    return forecast_df
+# ARIMA model forecasting, fitted params and forecasts are kept in arima_models / forecasts
+def arima_forecast(periods=36):
+    _, forecast_df = forecast_series('unemployment_data', 'unemployment_rate', '4_years', steps=periods)
+    return forecast_df[['date', 'unemployment_rate']]
 
 # RandomForest forecasting
 # def random_forest_forecast(df, periods=36):
@@ -80,7 +57,7 @@ def arima_forecast(df, periods=36):
 #     return forecast_df
 
 # Generate forecasts
-arima_forecast_df = arima_forecast(df, periods=36)
+arima_forecast_df = arima_forecast(periods=36)
 # rf_forecast_df = random_forest_forecast(df, periods=36)
 
 # Create the Plotly graph for ARIMA forecast
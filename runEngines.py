@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import logging
+from collections import deque
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+
+# Runs every enabled engine that is due, each in its own process.
+# Meant to be called from a single cron tick, e.g. every 5 minutes:
+#   python runEngines.py
+#   python runEngines.py --engine cpi --engine gdp --force --full-refresh
+
+logging.basicConfig(filename='engineRunner.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+from common.data_source import get_connection, release_connection
+from common.fred_fetcher import FRED_REQUESTS_PER_MINUTE
+
+load_dotenv()
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_FOLDER = os.getenv("ENGINE_LOG_FOLDER") or os.path.join(ROOT_DIR, 'logs')
+
+# engine name in the engines table -> (script relative to the repo root, upstream, default timeout in seconds)
+ENGINE_SCRIPTS = {
+    'initEngine': ('initializeEngine.py', 'POSTGRES', 120),
+    'unemployment': ('integrations/labor/unemployment.py', 'FRED', 600),
+    'employment': ('integrations/labor/employment.py', 'FRED', 600),
+    'house_prices': ('integrations/economic_activity/house_prices.py', 'FRED', 600),
+    'business_inventories': ('integrations/economic_activity/business_inventories.py', 'FRED', 1200),
+    'gdp': ('integrations/economic_activity/gdp.py', 'FRED', 1200),
+    'cpi': ('integrations/inflation/cpi.py', 'FRED', 600),
+    's&p500': ('integrations/markets/s&p500.py', 'FRED', 600),
+    'dji': ('integrations/markets/dji.py', 'FRED', 600),
+    'house_state_idx': ('integrations/economic_activity/house_prices_state_idx.py', 'FRED', 1800),
+    'federal_debt_gdp': ('integrations/economic_activity/federal_debt_pct_gdp.py', 'FRED', 600),
+    'export_president_pcnt_fed_debt_to_gdp': ('export/president_pcnt_fed_debt_to_gdp.py', 'POSTGRES', 300),
+    'yfinance_main': ('integrations/markets/yfinance_main.py', 'YAHOO', 600),
+    'watchlist': ('integrations/watchlist_engine.py', 'YAHOO', 600),
+    'coingather': ('integrations/crypto/coin_volume.py', 'COINGECKO', 900),
+    'coin_volume_rollup': ('integrations/crypto/coin_volume_rollup.py', 'POSTGRES', 1800),
+    'us_oil_production_by_month': ('integrations/energy/us_oil_by_month.py', 'EIA', 600),
+    'parquet_snapshots': ('export/parquet_snapshots.py', 'POSTGRES', 1800),
+}
+
+# How many engines may hit the same upstream at once. Concurrent FRED engines split one key's 120 requests/minute,
+# see engine_env.
+UPSTREAM_LIMITS = {
+    'FRED': 2,
+    'EIA': 1,
+    'COINGECKO': 1,
+    'YAHOO': 2,
+    'POSTGRES': 4,
+}
+
+# Keep in step with expected_interval in the engine_health view
+SCHEDULE_INTERVALS = {
+    'NRT': timedelta(0),
+    'Infinite': timedelta(0),
+    'Hourly': timedelta(hours=1),
+    'Daily': timedelta(days=1),
+    'Weekly': timedelta(weeks=1),
+    'Monthly': timedelta(days=30),
+}
+
+# Engines check in slightly after the tick that started them, don't let that push them to the next tick
+DUE_TOLERANCE = timedelta(minutes=5)
+
+# Engines that take --full-refresh (FRED watermark engines and the incremental EIA engine)
+FULL_REFRESH_UPSTREAMS = {'FRED', 'EIA'}
+
+# A tick in which an engine of these upstreams succeeded ends with a parquet_snapshots run,
+# it only rewrites the tables whose max(when_updated) moved
+SNAPSHOT_ENGINE = 'parquet_snapshots'
+SNAPSHOT_AFTER_UPSTREAMS = {'FRED', 'EIA'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run all enabled engines that are due, in parallel.')
+    parser.add_argument('--engine', action='append', help='Only consider this engine (repeatable).')
+    parser.add_argument('--force', action='store_true', help='Run the selected engines even if they are not due.')
+    parser.add_argument('--full-refresh', action='store_true', help='Pass --full-refresh to the FRED engines.')
+    parser.add_argument('--max-workers', type=int, default=int(os.getenv("ENGINE_MAX_WORKERS", 6)),
+                        help='Maximum number of engine processes running at once.')
+    return parser.parse_args()
+
+
+def get_due_engines(cur, current_time, only_engines=None, force=False):
+    cur.execute("""
+        SELECT engine, planned_schedule, status, last_checkin, last_run_started, timeout_seconds, source
+        FROM engines
+        WHERE enabled = 'YES'
+        ORDER BY engine
+    """)
+
+    due_engines = []
+    for engine, planned_schedule, status, last_checkin, last_run_started, timeout_seconds, source in cur.fetchall():
+        if only_engines and engine not in only_engines:
+            continue
+        if engine not in ENGINE_SCRIPTS:
+            print(f"Skipping {engine}: no script registered for it.")
+            continue
+
+        script, upstream, default_timeout = ENGINE_SCRIPTS[engine]
+        timeout = timeout_seconds or default_timeout
+        upstream = (source or upstream).upper()
+        if upstream not in UPSTREAM_LIMITS:
+            upstream = ENGINE_SCRIPTS[engine][1]
+
+        # Still running from an earlier tick
+        if status == 'Running' and last_run_started and current_time - last_run_started < timedelta(seconds=timeout):
+            print(f"Skipping {engine}: still running since {last_run_started}.")
+            continue
+
+        if not force:
+            interval = SCHEDULE_INTERVALS.get(planned_schedule)
+            if interval is None:
+                print(f"Skipping {engine}: unknown planned_schedule '{planned_schedule}'.")
+                continue
+            if last_checkin and current_time - last_checkin < interval - DUE_TOLERANCE:
+                continue
+
+        due_engines.append({'engine': engine, 'script': script, 'upstream': upstream, 'timeout': timeout})
+
+    return due_engines
+
+
+def engine_env(job):
+    """Environment of an engine process. Each FRED engine's limiter gets its share of the key's requests/minute."""
+    env = dict(os.environ)
+    if job['upstream'] == 'FRED':
+        env['FRED_REQUESTS_PER_MINUTE'] = str(FRED_REQUESTS_PER_MINUTE // UPSTREAM_LIMITS['FRED'])
+    return env
+
+
+def start_engine(cur, conn, job, full_refresh):
+    os.makedirs(LOG_FOLDER, exist_ok=True)
+    log_path = os.path.join(LOG_FOLDER, f"{job['engine'].replace('&', 'and')}.log")
+    log_file = open(log_path, 'a')
+    log_file.write(f"\n===== {datetime.now()} =====\n")
+    log_file.flush()
+
+    command = [sys.executable, os.path.join(ROOT_DIR, job['script'])]
+    if full_refresh and job['upstream'] in FULL_REFRESH_UPSTREAMS:
+        command.append('--full-refresh')
+
+    job['started'] = datetime.now()
+    job['log_file'] = log_file
+    job['process'] = subprocess.Popen(command, cwd=ROOT_DIR, env=engine_env(job), stdout=log_file,
+                                      stderr=subprocess.STDOUT)
+
+    cur.execute("""
+        UPDATE engines
+        SET status = 'Running',
+            last_run_started = %s
+        WHERE engine = %s
+    """, (job['started'], job['engine']))
+    conn.commit()
+    print(f"Started {job['engine']} ({job['upstream']}), logging to {log_path}.")
+
+
+def finish_engine(cur, conn, job, result, error_message=None):
+    job['log_file'].close()
+    duration = datetime.now() - job['started']
+
+    # On a clean exit keep whatever status the engine wrote itself (some record 'Error' for partial failures)
+    cur.execute("""
+        UPDATE engines
+        SET status = CASE WHEN %s = 'Success' AND status <> 'Running' THEN status ELSE %s END,
+            last_duration = %s
+        WHERE engine = %s
+    """, (result, result, duration, job['engine']))
+
+    # Engines write their own engine_runs row, unless they were killed or died before they could
+    if result != 'Success':
+        cur.execute("""
+            INSERT INTO engine_runs (engine, run_started, run_finished, status, duration_seconds, error_message)
+            SELECT %s, %s, %s, %s, %s, %s
+            WHERE NOT EXISTS (SELECT 1 FROM engine_runs WHERE engine = %s AND run_started >= %s)
+        """, (job['engine'], job['started'], datetime.now(), result, duration.total_seconds(), error_message,
+              job['engine'], job['started']))
+    conn.commit()
+
+    message = f"{job['engine']} finished with {result} in {duration.total_seconds():.1f}s."
+    print(message)
+    if result == 'Success':
+        logging.info(message)
+    else:
+        logging.error(message)
+
+
+def run_engines(cur, conn, due_engines, max_workers, full_refresh):
+    pending = deque(due_engines)
+    running = []
+    upstream_counts = {upstream: 0 for upstream in UPSTREAM_LIMITS}
+    results = {}
+
+    while pending or running:
+        # Launch whatever fits under the global and per-upstream limits, keeping the queue order otherwise
+        for job in list(pending):
+            if len(running) >= max_workers:
+                break
+            if upstream_counts[job['upstream']] >= UPSTREAM_LIMITS[job['upstream']]:
+                continue
+            pending.remove(job)
+            start_engine(cur, conn, job, full_refresh)
+            upstream_counts[job['upstream']] += 1
+            running.append(job)
+
+        time.sleep(0.5)
+
+        for job in list(running):
+            return_code = job['process'].poll()
+            if return_code is None:
+                if datetime.now() - job['started'] < timedelta(seconds=job['timeout']):
+                    continue
+                job['process'].kill()
+                job['process'].wait()
+                result = 'Timeout'
+                error_message = f"Killed by runEngines.py after {job['timeout']}s"
+            else:
+                result = 'Success' if return_code == 0 else 'Error'
+                error_message = f"Exited with status {return_code}" if return_code else None
+
+            finish_engine(cur, conn, job, result, error_message)
+            upstream_counts[job['upstream']] -= 1
+            running.remove(job)
+            results[job['engine']] = (job['upstream'], result)
+
+    return results
+
+
+def snapshot_job(results):
+    """The parquet_snapshots job to run after this tick, or None."""
+    if os.getenv("PARQUET_SNAPSHOT_AFTER_RUN", "Y").upper() == 'N' or SNAPSHOT_ENGINE in results:
+        return None
+    if not any(result == 'Success' and upstream in SNAPSHOT_AFTER_UPSTREAMS for upstream, result in results.values()):
+        return None
+    script, upstream, timeout = ENGINE_SCRIPTS[SNAPSHOT_ENGINE]
+    return {'engine': SNAPSHOT_ENGINE, 'script': script, 'upstream': upstream, 'timeout': timeout}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+    except Exception as e:
+        error_message = f"Error connecting to the database: {e}"
+        print(error_message)
+        logging.error(error_message)
+        exit(1)
+
+    current_time = datetime.now()
+    due_engines = get_due_engines(cur, current_time, args.engine, args.force)
+    print(f"{len(due_engines)} engine(s) due: {', '.join(job['engine'] for job in due_engines) or 'none'}.")
+
+    results = run_engines(cur, conn, due_engines, args.max_workers, args.full_refresh)
+
+    job = snapshot_job(results)
+    if job is not None:
+        run_engines(cur, conn, [job], args.max_workers, False)
+
+    cur.close()
+    release_connection(conn)